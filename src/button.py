@@ -33,13 +33,15 @@ _BUTTON_EVENT_LONG_PRESS = const(2)
 class Button():
     '''button handling class; initiated by ui.__init__'''
 
-    def __init__(self, pin_number: int, long_press: bool = False) -> None:
+    def __init__(self, pin_number: int, long_press: bool = False, input_pending: bytearray|None = None) -> None:
         self.pin_number = pin_number
+        self.input_pending = bytearray(1) if input_pending is None else input_pending # flag set on change to wake up the main loop
         self.long_press = long_press
         self.state = _IDLE_STATE
         self.prev_state = _IDLE_STATE
         self.last_time = _IDLE_STATE
         self.prev_time = time.ticks_ms()
+        self.ignore_release = False
         self.pin = (_pin := Pin(pin_number, Pin.IN, Pin.PULL_UP))
         _pin.irq(self._callback, _IRQ_RISING_FALLING)
 
@@ -60,11 +62,23 @@ class Button():
         released = state == _IDLE_STATE
         if self.long_press:
             if released:
+                if self.ignore_release:
+                    self.ignore_release = False
+                    return _BUTTON_EVENT_NONE
                 delta = time.ticks_diff(current_time, prev_time)
                 return _BUTTON_EVENT_LONG_PRESS if delta > _LONG_PRESS_DELAY else _BUTTON_EVENT_PRESS
             return _BUTTON_EVENT_NONE
         return _BUTTON_EVENT_NONE if released else _BUTTON_EVENT_PRESS
 
+    def held(self) -> bool:
+        '''return True if button is currently pressed down and ignore its next release (used for button combinations); called by
+        ui.process_user_input'''
+        if self.state == _IDLE_STATE:
+            return False
+        self.ignore_release = True
+        return True
+
     def _callback(self, pin):
-        '''callback for pin irq: stores state'''
-        self.state = pin()
\ No newline at end of file
+        '''callback for pin irq: stores state and flags input as pending'''
+        self.state = pin()
+        self.input_pending[0] = 1
\ No newline at end of file
@@ -10,7 +10,7 @@
 
     You should have received a copy of the GNU General Public License along with this program. If not, see https://www.gnu.org/licenses/.'''
 
-from data_types import ChainMapTuple, GenOptions
+from data_types import IndexedChainMapTuple, GenOptions
 
 NOTES                = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
 
@@ -47,6 +47,7 @@ CONTEXT_MENU_ITEMS    = ('rename', 'move backward', 'move forward', 'move to...'
 
 _NR_IN_PORTS          = const(6)
 _NR_OUT_PORTS         = const(6)
+_MAX_POLYPHONY        = const(16)
 _LAYOUT_COLS          = const(4)
 _CHORDS_COLS          = const(3)
 
@@ -241,27 +242,33 @@ MULTI_CHORDS = (
     'M7#5', 'major 7th sharp 5', (0, 4, 8, 11),
     'm7#5', 'minor 7th sharp 5', (0, 3, 8, 10))
 
-BANK_OPTIONS          = GenOptions(129, 0, EMPTY_OPTIONS_3, func=str)
-CC_OPTIONS            = GenOptions(129, 1, EMPTY_OPTIONS_3, func=str)
-CC_VALUE_OPTIONS      = GenOptions(128, func=str)
+BANK_OPTIONS          = GenOptions(129, 0, EMPTY_OPTIONS_3, func=str, memoize=True)
+CC_OPTIONS            = GenOptions(129, 1, EMPTY_OPTIONS_3, func=str, memoize=True)
+CC_VALUE_OPTIONS      = GenOptions(128, func=str, memoize=True)
+CC_DEADBAND_OPTIONS   = GenOptions(17, func=str)
+CC_INTERVAL_OPTIONS   = GenOptions(101, func=str, suffix=' ms', memoize=True)
 CHANNEL_OPTIONS       = GenOptions(17, 1, EMPTY_OPTIONS_2, func=str)
+CHOKE_GROUP_OPTIONS   = GenOptions(17, 1, EMPTY_OPTIONS_2, func=str)
 CURVE_OPTIONS         = (_ICON_NEGATIVE_3, _ICON_NEGATIVE_2, _ICON_NEGATIVE_1, _ICON_LINEAR_CURVE,
                          _ICON_POSITIVE_1, _ICON_POSITIVE_2, _ICON_POSITIVE_3)
 INVERSION_OPTIONS     = ('root position', '1st inversion', '2nd inversion', '3rd inversion')
 INPUT_PORT_OPTIONS    = GenOptions(_NR_IN_PORTS + 1, 1, EMPTY_OPTIONS_1, func=str)
-KEY_OPTIONS           = ChainMapTuple(EMPTY_OPTIONS_2, NOTES)
+KEY_OPTIONS           = IndexedChainMapTuple(EMPTY_OPTIONS_2, NOTES)
 LAYER_OPTIONS_W       = ('all', 'low', 'high')
 LAYER_OPTIONS_WO      = ('low', 'high')
 LAYOUT_OPTIONS        = GenOptions(len(MULTI_LAYOUTS) // _LAYOUT_COLS, func=lambda i: MULTI_LAYOUTS[_LAYOUT_COLS * i])
+MASK_TIME_OPTIONS     = GenOptions(101, 1, ('off',), func=str, suffix=' ms', memoize=True)
+MASK_VELOCITY_OPTIONS = GenOptions(101, func=str, suffix='%', memoize=True)
 MODE_OPTIONS          = ('____', 'note', 'chord')
-NOTE_OFF_OPTIONS_W    = GenOptions(925, 80, ('____', 'off', 'pulse', 'toggle'), func=str, suffix=' ms')
-NOTE_OFF_OPTIONS_WO   = GenOptions(924, 80, ('off', 'pulse', 'toggle'), func=str, suffix=' ms')
-NOTE_OPTIONS          = GenOptions(129, first_options=EMPTY_OPTIONS_3, func=mt.number_to_note)
+NOTE_OFF_OPTIONS_W    = GenOptions(925, 80, ('____', 'off', 'pulse', 'toggle'), func=str, suffix=' ms', memoize=True)
+NOTE_OFF_OPTIONS_WO   = GenOptions(924, 80, ('off', 'pulse', 'toggle'), func=str, suffix=' ms', memoize=True)
+NOTE_OPTIONS          = GenOptions(129, first_options=EMPTY_OPTIONS_3, func=mt.number_to_note, memoize=True)
 OCTAVE_OPTIONS        = GenOptions(12, -1, EMPTY_OPTIONS_2, func=str)
 OUTPUT_PORT_OPTIONS   = GenOptions(_NR_OUT_PORTS + 1, 1, EMPTY_OPTIONS_1, func=str)
 PATTERN_OPTIONS       = (('__', _ICON_UP_RIGHT, _ICON_RIGHT_UP),
                          ('select assignment pattern', 'assign notes up and then rigt', 'assign notes right and than up'))
-PC_OPTIONS            = GenOptions(129, 0, EMPTY_OPTIONS_3, func=str)
+PC_OPTIONS            = GenOptions(129, 0, EMPTY_OPTIONS_3, func=str, memoize=True)
+POLYPHONY_OPTIONS     = GenOptions(_MAX_POLYPHONY + 1, 1, ('off',), func=str)
 QUALITY_OPTIONS_LONG  = GenOptions(len(MULTI_CHORDS) // _CHORDS_COLS + 1, first_options=EMPTY_OPTIONS_4,
                                   func=lambda i: MULTI_CHORDS[_CHORDS_COLS * i + 1])
 QUALITY_OPTIONS_SHORT = GenOptions(len(MULTI_CHORDS) // _CHORDS_COLS + 1, first_options=EMPTY_OPTIONS_BLANK,
@@ -269,9 +276,9 @@ QUALITY_OPTIONS_SHORT = GenOptions(len(MULTI_CHORDS) // _CHORDS_COLS + 1, first_
 SCALE_OPTIONS         = GenOptions(len(MULTI_SCALES) // 2 + 1, first_options=EMPTY_OPTIONS_4, func=lambda i: MULTI_SCALES[2 * i])
 TRANSIENT_OPTIONS     = (('__', _ICON_HARD, _ICON_SMOOTH_1, _ICON_SMOOTH_2, _ICON_LINEAR_TRANS),
                          ('transient off', 'hard transient', 'smooth transient 1', 'smooth transient 2', 'linear transient'))
-TRIGGER_OPTIONS_LONG  = ChainMapTuple(EMPTY_OPTIONS_4, TRIGGERS_LONG)
-TRIGGER_OPTIONS_SHORT = ChainMapTuple(EMPTY_OPTIONS_BLANK, TRIGGERS_SHORT)
-VELOCITY_OPTIONS      = GenOptions(128, func=str)
+TRIGGER_OPTIONS_LONG  = IndexedChainMapTuple(EMPTY_OPTIONS_4, TRIGGERS_LONG)
+TRIGGER_OPTIONS_SHORT = IndexedChainMapTuple(EMPTY_OPTIONS_BLANK, TRIGGERS_SHORT)
+VELOCITY_OPTIONS      = GenOptions(128, func=str, memoize=True)
 
 TEXT_ROWS_PROGRAM = (( # _SUB_PAGE_MAPPING
     'active program', # _NAME
@@ -297,6 +304,18 @@ TEXT_ROWS_INPUT = (( # _SUB_PAGE_PORTS
 ), ( # _SUB_PAGE_NOTES
     'selected input trigger', # _NOTE_INPUT_TRIGGER
     'input port/device assigned to '# _NOTE_DEVICE
+), ( # _SUB_PAGE_MASKS
+    'selected input trigger', # _MASK_INPUT_TRIGGER
+), ( # _SUB_PAGE_FILTERS
+    'input port to set message filters for', # _FILTER_PORT
+    'ignore active sensing', # _FILTER_FIRST
+    'ignore clock/start/continue/stop', # _FILTER_FIRST + 1
+    'ignore polyphonic aftertouch', # _FILTER_FIRST + 2
+    'ignore channel pressure', # _FILTER_FIRST + 3
+    'ignore pitch bend', # _FILTER_FIRST + 4
+    'ignore control change', # _FILTER_FIRST + 5
+    'ignore program change', # _FILTER_FIRST + 6
+    'ignore song position/select/tune', # _FILTER_FIRST + 7
 ))
 
 TEXT_ROWS_OUTPUT = (( # _SUB_PAGE_PORTS
@@ -311,6 +330,7 @@ TEXT_ROWS_OUTPUT = (( # _SUB_PAGE_PORTS
     'midi channel to use', # _DEVICE_CHANNEL
     'use 0 velocity for note off', # _DEVICE_0_NOTE_OFF
     'enable running status', # _DEVICE_RUNNING_STATUS
+    'max notes at once (steals oldest)', # _DEVICE_MAX_POLYPHONY
 ), ( # _SUB_PAGE_VOICE
     'selected output port/device', # _VOICE_DEVICE
     '', # _VOICE_VOICE
@@ -321,6 +341,9 @@ TEXT_ROWS_OUTPUT = (( # _SUB_PAGE_PORTS
     'velocity response curve', # _VOICE_CURVE
     'minimum output velocity', # _VOICE_MIN_VELOCITY
     'maximum output velocity', # _VOICE_MAX_VELOCITY
+    'ignore pedal cc changes up to', # _VOICE_CC_DEADBAND
+    'min time between pedal cc messages', # _VOICE_CC_INTERVAL
+    'playing it stops others in group', # _VOICE_CHOKE_GROUP
 ))
 
 TEXT_ROWS_TOOLS = (( # _SUB_PAGE_TOMS
@@ -360,17 +383,31 @@ TEXT_ROWS_TOOLS = (( # _SUB_PAGE_TOMS
     'shift all notes down one octave', # _MULTI_OCTAVE_DOWN
 ))
 
-TEXT_ROWS_SETTINGS = (
-'enable midi thru', # _MIDI_THRU
-'midi thru input port', # _MIDI_THRU_INPUT_PORT
-'midi thru input channel', # _MIDI_THRU_INPUT_CHANNEL
-'midi thru output port', # _MIDI_THRU_OUTPUT_PORT
-'midi thru output channel', # _MIDI_THRU_OUTPUT_CHANNEL
-'enable midi learn', # _MIDI_LEARN
-'input port to use for midi learn', # _MIDI_LEARN_PORT
-'default volume for output voices', # _DEFAULT_VELOCITY
-'back up settings and programs', # _STORE_BACK_UP
-'restore backed up data', # _RESTORE_BACK_UP
-'clear user settings to defaults', # _FACTORY_RESET
-'show cybo-drummer version number', # _OTHER_ABOUT
-)
\ No newline at end of file
+TEXT_ROWS_SETTINGS = (( # _SUB_PAGE_SETTINGS
+    'enable midi thru', # _MIDI_THRU
+    'midi thru input port', # _MIDI_THRU_INPUT_PORT
+    'midi thru input channel', # _MIDI_THRU_INPUT_CHANNEL
+    'midi thru output port', # _MIDI_THRU_OUTPUT_PORT
+    'midi thru output channel', # _MIDI_THRU_OUTPUT_CHANNEL
+    'enable midi learn', # _MIDI_LEARN
+    'input port to use for midi learn', # _MIDI_LEARN_PORT
+    'default volume for output voices', # _DEFAULT_VELOCITY
+    'back up settings and programs', # _STORE_BACK_UP
+    'restore backed up data', # _RESTORE_BACK_UP
+    'clear user settings to defaults', # _FACTORY_RESET
+    'show cybo-drummer version number', # _OTHER_ABOUT
+), ( # _SUB_PAGE_CLOCK
+    'input port to receive midi clock from', # _CLOCK_INPUT_PORT
+    'send midi clock to output port 1', # _CLOCK_FIRST_OUTPUT_PORT
+    'send midi clock to output port 2', # _CLOCK_FIRST_OUTPUT_PORT + 1
+    'send midi clock to output port 3', # _CLOCK_FIRST_OUTPUT_PORT + 2
+    'send midi clock to output port 4', # _CLOCK_FIRST_OUTPUT_PORT + 3
+    'send midi clock to output port 5', # _CLOCK_FIRST_OUTPUT_PORT + 4
+    'send midi clock to output port 6', # _CLOCK_FIRST_OUTPUT_PORT + 5
+    'send sysex from input port 1 to', # _SYSEX_FIRST_INPUT_PORT
+    'send sysex from input port 2 to', # _SYSEX_FIRST_INPUT_PORT + 1
+    'send sysex from input port 3 to', # _SYSEX_FIRST_INPUT_PORT + 2
+    'send sysex from input port 4 to', # _SYSEX_FIRST_INPUT_PORT + 3
+    'send sysex from input port 5 to', # _SYSEX_FIRST_INPUT_PORT + 4
+    'send sysex from input port 6 to', # _SYSEX_FIRST_INPUT_PORT + 5
+))
\ No newline at end of file
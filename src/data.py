@@ -24,6 +24,12 @@ _MAX_PROGRAMS = const(99)
 
 _ASCII_A      = const(65)
 
+# keys added after the first release, with the values to use if missing from an older data.json file
+_SETTINGS_DEFAULTS = (('clock_input_port', _NONE), ('clock_output_ports', 0), ('sysex_output_ports', (_NONE,) * 6))
+_DEVICE_DEFAULTS   = (('max_polyphony', _NONE),)
+_ZONE_DEFAULTS     = (('mask_time', 0), ('mask_velocity', 50))
+_VOICE_DEFAULTS    = (('cc_deadband', 0), ('cc_interval', 10), ('choke_group', _NONE))
+
 class Data:
     '''overall data class for routing, definitions and settings; initiated once in main_loops.py: init'''
 
@@ -37,7 +43,7 @@ class Data:
                                [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE],
                                [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE],
                                [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE]],
-        self.input_port_mapping = [['', _NONE] for _ in range(_NR_IN_PORTS)]
+        self.input_port_mapping = [['', _NONE, 0] for _ in range(_NR_IN_PORTS)]
         self.input_triggers = {}
         self.output_mapping = []
         self.settings = {}
@@ -178,7 +184,10 @@ class Data:
                                       'midi_thru_output_channel': _NONE,
                                       'midi_learn': False,
                                       'midi_learn_port': _NONE,
-                                      'default_output_velocity': 64},
+                                      'default_output_velocity': 64,
+                                      'clock_input_port': _NONE,
+                                      'clock_output_ports': 0,
+                                      'sysex_output_ports': [_NONE] * 6},
                          'trigger_matrix': [[_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE],
                                             [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE],
                                             [_NONE, _NONE,    23,    25, _NONE, _NONE, _NONE, _NONE],
@@ -187,14 +196,21 @@ class Data:
                                             [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE],
                                             [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE],
                                             [_NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE, _NONE]],
-                         'input_port_mapping': [['', _NONE], ['', _NONE], ['', _NONE], ['', _NONE], ['', _NONE], ['', _NONE]],
+                         'input_port_mapping': [['', _NONE, 0], ['', _NONE, 0], ['', _NONE, 0], ['', _NONE, 0], ['', _NONE, 0],
+                                                ['', _NONE, 0]],
                          'input_triggers': {},
-                         'output_mapping':['', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'mapping': []},
-                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'mapping': []},
-                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'mapping': []},
-                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'mapping': []},
-                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'mapping': []},
-                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'mapping': []}]}
+                         'output_mapping':['', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'max_polyphony': _NONE,
+                                                'mapping': []},
+                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'max_polyphony': _NONE,
+                                                'mapping': []},
+                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'max_polyphony': _NONE,
+                                                'mapping': []},
+                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'max_polyphony': _NONE,
+                                                'mapping': []},
+                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'max_polyphony': _NONE,
+                                                'mapping': []},
+                                           '', {'channel': 9, 'vel_0_note_off': True, 'running_status': True, 'max_polyphony': _NONE,
+                                                'mapping': []}]}
             with open(f'/data_files/data.json', 'w') as file:
                 json.dump(self.data, file)
         self.load()
@@ -202,11 +218,33 @@ class Data:
     def load(self) -> None:
         '''load definitions from data set (self.data); called by self.load_data_json_file, router._save and router.save_program'''
         with ml.thread_lock:
-            self.settings = self.data['settings']
+            self.settings = (settings := self.data['settings'])
+            for key, value in _SETTINGS_DEFAULTS:
+                if key not in settings:
+                    settings[key] = list(value) if type(value) is tuple else value
             self.trigger_matrix = self.data['trigger_matrix']
-            self.input_port_mapping = self.data['input_port_mapping']
-            self.input_triggers = self.data['input_triggers']
-            self.output_mapping = self.data['output_mapping']
+            self.input_port_mapping = (input_port_mapping := self.data['input_port_mapping'])
+            for port in input_port_mapping:
+                if len(port) == 2:
+                    port.append(0) # message filter (bitmask of message classes to discard)
+            self.input_triggers = (input_triggers := self.data['input_triggers'])
+            for trigger in input_triggers.values():
+                for zone in trigger['mapping']:
+                    for key, value in _ZONE_DEFAULTS:
+                        if key not in zone:
+                            zone[key] = value
+            self.output_mapping = (output_mapping := self.data['output_mapping'])
+            for i in range(1, len(output_mapping), 2):
+                device = output_mapping[i]
+                for key, value in _DEVICE_DEFAULTS:
+                    if key not in device:
+                        device[key] = value
+                voices = device['mapping']
+                for j in range(1, len(voices), 2):
+                    voice = voices[j]
+                    for key, value in _VOICE_DEFAULTS:
+                        if key not in voice:
+                            voice[key] = value
             try:
                 files = os.listdir('/data_files/programs')
             except:
@@ -17,9 +17,12 @@
     SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.'''
 
 from math import tanh
+from array import array
 
 _NONE                  = const(-1)
 
+_MEMO_SIZE             = const(16) # number of generated options memoized by GenOptions (a window around the latest selections)
+
 _TRANSIENT_HARD        = const(0)
 _TRANSIENT_SMOOTH_1    = const(1)
 _TRANSIENT_SMOOTH_2    = const(2)
@@ -69,11 +72,42 @@ class ChainMapTuple:
                 k += 1
         raise KeyError(v)
 
+class IndexedChainMapTuple(ChainMapTuple):
+    '''tuple-based chain map data type class with direct item access through the offsets of the maps and a value to index dictionary
+    (built on first use)'''
+
+    def __init__(self, *maps):
+        super().__init__(*maps)
+        offsets = []
+        n = 0
+        for m in self._maps:
+            offsets.append(n)
+            n += len(m)
+        self._offsets = tuple(offsets)
+        self._index = None
+
+    def __getitem__(self, i):
+        if i >= self._len:
+            raise StopIteration
+        offsets = self._offsets
+        k = len(offsets) - 1
+        while i < (offset := offsets[k]) and k > 0:
+            k -= 1
+        return self._maps[k][i - offset]
+
+    def index(self, v):
+        if (index := self._index) is None:
+            self._index = (index := {})
+            for i, vv in enumerate(self):
+                if vv not in index:
+                    index[vv] = i
+        return index[v]
+
 class GenOptions:
-    '''options generator'''
+    '''options generator, optionally memoizing generated options (only for functions which always return the same for the same input)'''
 
     def __init__(self, length: int, offset: int = 0, first_options: tuple = (), additional_options: tuple = (), func = None,
-                 argument = None, suffix: str = ''):
+                 argument = None, suffix: str = '', memoize: bool = False):
         self._len = length
         offset -= len(first_options)
         self._offset = offset
@@ -82,6 +116,11 @@ class GenOptions:
         self._func = func
         self.argument = argument
         self.suffix = suffix
+        if memoize:
+            self._memo_keys = array('i', (_NONE for _ in range(_MEMO_SIZE)))
+            self._memo_values = [None] * _MEMO_SIZE
+        else:
+            self._memo_keys = None
 
     def __getitem__(self, i):
         l = self._len
@@ -92,6 +131,9 @@ class GenOptions:
         n = len(additional_options := self._additional_options)
         if i >= l - n:
             return additional_options[i + n - l]
+        if (memo_keys := self._memo_keys) is not None and memo_keys[(slot := i % _MEMO_SIZE)] == i:
+            return self._memo_values[slot]
+        key = i
         i += self._offset
         _func = self._func
         argument = self.argument
@@ -103,6 +145,9 @@ class GenOptions:
             ret = _func(i, argument)
         if (suffix := self.suffix) != '':
             ret = f'{ret}{suffix}'
+        if memo_keys is not None: # key and value are only stored together, so a failing _func leaves no key without value behind
+            self._memo_values[slot] = ret
+            memo_keys[slot] = key
         return ret
 
     def __iter__(self):
@@ -112,6 +157,33 @@ class GenOptions:
     def __len__(self):
         return self._len
 
+class LazyList:
+    '''list-like data type class building its items on first access, so they can be unloaded again to free memory (iterating only
+    yields items already built)'''
+
+    def __init__(self, constructors: tuple):
+        self._constructors = constructors
+        self.items = [None] * len(constructors)
+        self.loaded = False # to be set once built items have been loaded, after which newly built items get program_change(False)
+
+    def __getitem__(self, i):
+        if (item := self.items[i]) is None:
+            self.items[i] = (item := self._constructors[i]())
+            if self.loaded:
+                item.program_change(False)
+        return item
+
+    def __iter__(self):
+        for item in self.items:
+            if item is not None:
+                yield item
+
+    def __len__(self):
+        return len(self.items)
+
+    def unload(self, i):
+        self.items[i] = None
+
 class GenCurves():
     '''curve/transition generator based on hyperboles / hyperbolic tangent sigmoid functions'''
 
@@ -139,7 +211,7 @@ class GenCurves():
             self._b = a / (1 + a)
             self._c = 1 + a
 
-    def __getitem__(self, i: int, recursive: bool=False) -> int:
+    def __getitem__(self, i: int, recursive: bool=False, max_value: int = _NONE) -> int:
         if i < self.threshold:
             return 0
         scale = self.scale
@@ -169,10 +241,8 @@ class GenCurves():
             t = 1 - t
         if recursive or not scale:
             return int(t * value + 0.5)
-        max_value = 0
-        for k in range(128):
-            if (y:= self.__getitem__(k, True)) > max_value:
-                max_value = y
+        if max_value == _NONE:
+            max_value = self._max_value()
         if max_value == 0:
             return int(t * value + 0.5)
         return int(t * 127 / max_value * value + 0.5)
@@ -182,4 +252,18 @@ class GenCurves():
             yield self.__getitem__(i)
 
     def __len__(self):
-        return 128
\ No newline at end of file
+        return 128
+
+    def to_bytes(self) -> bytes:
+        '''return all 128 values as lookup table, so looking up a value doesn't allocate any memory (calculating the maximum for
+        scaling only once); called by router.update'''
+        max_value = self._max_value() if self.transient != _NONE and self.scale else _NONE
+        return bytes(self.__getitem__(i, max_value=max_value) for i in range(128))
+
+    def _max_value(self) -> int:
+        '''return maximum unscaled value; called by self.__getitem__ and self.to_bytes'''
+        max_value = 0
+        for k in range(128):
+            if (y:= self.__getitem__(k, True)) > max_value:
+                max_value = y
+        return max_value
\ No newline at end of file
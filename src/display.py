@@ -23,16 +23,26 @@
         https://github.com/easytarget/microPyEZfonts/blob/main/ezFBfont.py, which in turn is a reworked version of the class ‘Writer’,
         copyright (c) 2019-2021 Peter Hinch, https://github.com/peterhinch/micropython-font-to-py'''
 
+PRINT_SPI_RATE        = const(False) # set to True to print the number of bytes sent to the screen once every second (while drawing)
+
 import micropython
 import time
 import framebuf
-from machine import Pin, SPI
+from array import array
+try:
+    from machine import Pin, SPI
+except ImportError: # micropython unix port, using display_host.HostDisplay
+    Pin = SPI = None
 import os
 
 _DISPLAY_WIDTH        = const(220)
 _DISPLAY_HEIGHT       = const(176)
 
 _MAX_BUFFER_SIZE      = const(77440) # _DISPLAY_WIDTH * _DISPLAY_HEIGHT * 2
+_ROW_SIZE             = const(440) # _DISPLAY_WIDTH * 2
+
+_MAX_DIRTY_RECTS      = const(8)
+_LABEL_CACHE_SIZE     = const(16_384) # bytes: maximum memory used by cached label bitmaps
 
 # _TOP_DOWN_L2R         = const(7)
 
@@ -83,8 +93,24 @@ _ALIGN_LEFT           = const(0)
 _ALIGN_CENTRE         = const(1)
 # _ALIGN_RIGHT          = const(2)
 
+_NONE                 = const(-1)
+
+# frame buffer draw functions wrapped by Display to keep track of dirty rectangles
+_FB_BLIT              = framebuf.FrameBuffer.blit
+_FB_FILL              = framebuf.FrameBuffer.fill
+_FB_LINE              = framebuf.FrameBuffer.line
+_FB_RECT              = framebuf.FrameBuffer.rect
+_FB_FILL_RECT         = framebuf.FrameBuffer.fill_rect
+_FB_PIXEL             = framebuf.FrameBuffer.pixel
+_FB_HLINE             = framebuf.FrameBuffer.hline
+_FB_VLINE             = framebuf.FrameBuffer.vline
+_FB_TEXT              = framebuf.FrameBuffer.text
+_FB_ELLIPSE           = framebuf.FrameBuffer.ellipse
+_FB_SCROLL            = framebuf.FrameBuffer.scroll
+
 class Display(framebuf.FrameBuffer):
-    '''class providing diplay buffer and draw functions; initiated once by ui.__init__'''
+    '''class providing diplay buffer and draw functions; initiated once by ui.__init__; the draw functions mark what they draw as dirty,
+    except blit and poly (the frame buffer api doesn't tell their size), after which mark_dirty needs to be called'''
 
     def __init__(self, spi_id: int, baudrate: int, dc_pin: Pin, rst_pin: Pin, backlight_pin: Pin, font) -> None:
         self.spi = SPI(spi_id, baudrate=baudrate)
@@ -95,12 +121,10 @@ class Display(framebuf.FrameBuffer):
         backlight_pin.off()
         rst_pin.init(rst_pin.OUT, value=0)
         dc_pin.init(dc_pin.OUT, value=0)
-        self.byte_buffer = (byte_buffer := memoryview(bytearray(_MAX_BUFFER_SIZE)))
-        super().__init__(byte_buffer, _DISPLAY_WIDTH, _DISPLAY_HEIGHT, (RGB565 := framebuf.RGB565))
+        self._init_buffer()
         self._reset()
         self._setup()
         self._clear()
-        self._palette = framebuf.FrameBuffer(bytearray(4), 2, 1, RGB565)
         backlight_pin.on()
 
     @micropython.viper
@@ -135,18 +159,170 @@ class Display(framebuf.FrameBuffer):
         elif align != _ALIGN_LEFT:
             x += w - tw
         y += (h - _FONT_HEIGHT) // 2
+        self.mark_dirty(x, y, tw, _FONT_HEIGHT)
         _palette = self._palette
         _palette.pixel(0, 0, back_color)
         _palette.pixel(1, 0, fore_color)
-        _FrameBuffer = framebuf.FrameBuffer
-        _get_ch = self.font.get_ch
-        MONO_HLSB = framebuf.MONO_HLSB
-        _blit = self.blit
+        _get_glyph = self.font.get_glyph
         for char in text:
-            ch_buffer = _FrameBuffer(bytearray(_get_ch(ord(char))), _FONT_WIDTH, _FONT_HEIGHT, MONO_HLSB)
-            _blit(ch_buffer, x, y, back_color, _palette)
+            _FB_BLIT(self, _get_glyph(ord(char)), x, y, back_color, _palette)
             x += _FONT_WIDTH
 
+    def label_box(self, x: int, y: int, w: int, h: int, text, back_color: int, fore_color: int):
+        '''draw filled box with centred text, blitting a cached bitmap if the same label has been drawn before (the cache is cleared when
+        it would grow beyond _LABEL_CACHE_SIZE); called by ui_blocks: *.draw'''
+        if (bitmap := (label_cache := self.label_cache).get(key := (text, w, h, back_color, fore_color))) is not None:
+            self.mark_dirty(x, y, w, h)
+            _FB_BLIT(self, bitmap, x, y)
+            return
+        self.rect(x, y, w, h, back_color, True)
+        self.text_box(x, y, w, h, text, back_color, fore_color, _ALIGN_CENTRE)
+        if x < 0 or y < 0 or x + w > _DISPLAY_WIDTH or y + h > _DISPLAY_HEIGHT:
+            return
+        row_size = 2 * w
+        if self.label_cache_size + row_size * h > _LABEL_CACHE_SIZE:
+            self.clear_label_cache()
+        self.label_cache_size += row_size * h
+        # copy the rendered box from the display buffer
+        bitmap_buffer = bytearray(row_size * h)
+        byte_buffer = self.byte_buffer
+        start = y * _ROW_SIZE + 2 * x
+        i = 0
+        for _ in range(h):
+            bitmap_buffer[i:i + row_size] = byte_buffer[start:start + row_size]
+            start += _ROW_SIZE
+            i += row_size
+        label_cache[key] = framebuf.FrameBuffer(bitmap_buffer, w, h, framebuf.RGB565)
+
+    def clear_label_cache(self):
+        '''free the memory used by cached label bitmaps; called by ui.free_memory'''
+        self.label_cache.clear()
+        self.label_cache_size = 0
+
+    @micropython.native
+    def rect(self, x: int, y: int, w: int, h: int, c: int, f: bool = False):
+        '''draw rectangle to frame buffer, marking it as dirty; called by ui_blocks: *.draw and others'''
+        self.mark_dirty(x, y, w, h)
+        _FB_RECT(self, x, y, w, h, c, f)
+
+    @micropython.native
+    def line(self, x0: int, y0: int, x1: int, y1: int, c: int):
+        '''draw line to frame buffer, marking its bounding box as dirty; called by TriggerSelect.draw'''
+        self.mark_dirty(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1)
+        _FB_LINE(self, x0, y0, x1, y1, c)
+
+    @micropython.native
+    def fill(self, c: int):
+        '''fill frame buffer, marking the whole screen as dirty; called by self._clear'''
+        self.mark_dirty(0, 0, _DISPLAY_WIDTH, _DISPLAY_HEIGHT)
+        _FB_FILL(self, c)
+
+    @micropython.native
+    def fill_rect(self, x: int, y: int, w: int, h: int, c: int):
+        '''draw filled rectangle to frame buffer, marking it as dirty'''
+        self.mark_dirty(x, y, w, h)
+        _FB_FILL_RECT(self, x, y, w, h, c)
+
+    @micropython.native
+    def pixel(self, x: int, y: int, c: int = _NONE):
+        '''return color of pixel if c is not given, otherwise draw pixel to frame buffer, marking it as dirty'''
+        if c == _NONE:
+            return _FB_PIXEL(self, x, y)
+        self.mark_dirty(x, y, 1, 1)
+        _FB_PIXEL(self, x, y, c)
+
+    @micropython.native
+    def hline(self, x: int, y: int, w: int, c: int):
+        '''draw horizontal line to frame buffer, marking it as dirty'''
+        self.mark_dirty(x, y, w, 1)
+        _FB_HLINE(self, x, y, w, c)
+
+    @micropython.native
+    def vline(self, x: int, y: int, h: int, c: int):
+        '''draw vertical line to frame buffer, marking it as dirty'''
+        self.mark_dirty(x, y, 1, h)
+        _FB_VLINE(self, x, y, h, c)
+
+    @micropython.native
+    def text(self, s, x: int, y: int, c: int = 1):
+        '''draw text in the built-in 8x8 font to frame buffer, marking its bounding box as dirty'''
+        self.mark_dirty(x, y, 8 * len(s), 8)
+        _FB_TEXT(self, s, x, y, c)
+
+    @micropython.native
+    def ellipse(self, x: int, y: int, xr: int, yr: int, c: int, f: bool = False, m: int = 0b1111):
+        '''draw ellipse to frame buffer, marking its bounding box as dirty'''
+        self.mark_dirty(x - xr, y - yr, 2 * xr + 1, 2 * yr + 1)
+        _FB_ELLIPSE(self, x, y, xr, yr, c, f, m)
+
+    @micropython.native
+    def scroll(self, xstep: int, ystep: int):
+        '''shift frame buffer contents, marking the whole screen as dirty'''
+        self.mark_dirty(0, 0, _DISPLAY_WIDTH, _DISPLAY_HEIGHT)
+        _FB_SCROLL(self, xstep, ystep)
+
+    @micropython.viper
+    def mark_dirty(self, x: int, y: int, w: int, h: int):
+        '''add rectangle to the regions to be sent to the screen by self.draw_screen, merging it with overlapping or adjacent ones (or all
+        into one if the maximum number of rectangles is reached); to be called after drawing to the display buffer directly (like
+        through a frame buffer sharing its memory, or by blit or poly); called by self.text_box, self.label_box, the draw functions and
+        PageMonitor.add_to_monitor'''
+        x1 = x + w - 1
+        y1 = y + h - 1
+        if x < 0:
+            x = 0
+        if y < 0:
+            y = 0
+        if x1 >= _DISPLAY_WIDTH:
+            x1 = _DISPLAY_WIDTH - 1
+        if y1 >= _DISPLAY_HEIGHT:
+            y1 = _DISPLAY_HEIGHT - 1
+        if x > x1 or y > y1:
+            return
+        dirty = ptr16(self.dirty)
+        count = int(self.dirty_count)
+        i = 0
+        while i < count:
+            j = i << 2
+            if x <= dirty[j + 2] + 1 and dirty[j] <= x1 + 1 and y <= dirty[j + 3] + 1 and dirty[j + 1] <= y1 + 1:
+                # absorb overlapping or adjacent rectangle, move the last one into its place and start over, as the grown rectangle might
+                # now touch rectangles checked before
+                if dirty[j] < x:
+                    x = dirty[j]
+                if dirty[j + 1] < y:
+                    y = dirty[j + 1]
+                if dirty[j + 2] > x1:
+                    x1 = dirty[j + 2]
+                if dirty[j + 3] > y1:
+                    y1 = dirty[j + 3]
+                count -= 1
+                last = count << 2
+                dirty[j] = dirty[last]
+                dirty[j + 1] = dirty[last + 1]
+                dirty[j + 2] = dirty[last + 2]
+                dirty[j + 3] = dirty[last + 3]
+                i = 0
+                continue
+            i += 1
+        if count == _MAX_DIRTY_RECTS:
+            for i in range(count):
+                j = i << 2
+                if dirty[j] < x:
+                    x = dirty[j]
+                if dirty[j + 1] < y:
+                    y = dirty[j + 1]
+                if dirty[j + 2] > x1:
+                    x1 = dirty[j + 2]
+                if dirty[j + 3] > y1:
+                    y1 = dirty[j + 3]
+            count = 0
+        j = count << 2
+        dirty[j] = x
+        dirty[j + 1] = y
+        dirty[j + 2] = x1
+        dirty[j + 3] = y1
+        self.dirty_count = count + 1
+
     @micropython.viper
     def get_text_bounds(self, text):
         '''return width and height of text (without drawing it); called by TextEdit._draw_input_text'''
@@ -168,9 +344,34 @@ class Display(framebuf.FrameBuffer):
 
     @micropython.native
     def draw_screen(self):
-        '''draw display buffer to screen; called by main'''
-        self._set_window(0, 0, _DISPLAY_WIDTH - 1, _DISPLAY_HEIGHT - 1)
-        self.dc.high(); self.spi.write(self.byte_buffer[0:(_DISPLAY_WIDTH * _DISPLAY_HEIGHT * 2)])
+        '''send dirty regions of display buffer to screen (full width regions in one go, others row by row); called by main'''
+        if (count := self.dirty_count) == 0:
+            return
+        dirty = self.dirty
+        byte_buffer = self.byte_buffer
+        _write = self.spi.write
+        _dc_high = self.dc.high
+        sent = 0
+        for i in range(count):
+            j = i << 2
+            x0 = dirty[j]
+            y0 = dirty[j + 1]
+            x1 = dirty[j + 2]
+            y1 = dirty[j + 3]
+            self._set_window(x0, y0, x1, y1)
+            _dc_high()
+            if x0 == 0 and x1 == _DISPLAY_WIDTH - 1:
+                _write(byte_buffer[y0 * _ROW_SIZE:(y1 + 1) * _ROW_SIZE])
+            else:
+                start = y0 * _ROW_SIZE + 2 * x0
+                end = start + 2 * (x1 - x0 + 1)
+                for _ in range(y1 - y0 + 1):
+                    _write(byte_buffer[start:end])
+                    start += _ROW_SIZE
+                    end += _ROW_SIZE
+            sent += 2 * (x1 - x0 + 1) * (y1 - y0 + 1)
+        self.dirty_count = 0
+        self._count_spi_bytes(sent)
 
     def save_screen_dump(self) -> None:
         '''save dump of current screen buffer to json file; called by ui.process_user_input'''
@@ -189,6 +390,25 @@ class Display(framebuf.FrameBuffer):
         self.spi.deinit()
         del self.byte_buffer
 
+    def _init_buffer(self) -> None:
+        '''set up display buffer and drawing state; called by self.__init__ and HostDisplay.__init__'''
+        self.byte_buffer = (byte_buffer := memoryview(bytearray(_MAX_BUFFER_SIZE)))
+        super().__init__(byte_buffer, _DISPLAY_WIDTH, _DISPLAY_HEIGHT, (RGB565 := framebuf.RGB565))
+        # regions of the display buffer changed since the last draw_screen (x0, y0, x1, y1 per rectangle, inclusive), so only those are
+        # sent to the screen
+        self.dirty = array('H', (0 for _ in range(4 * _MAX_DIRTY_RECTS)))
+        self.dirty_count = 0
+        self.spi_bytes = 0 # bytes sent to the screen since self.spi_time
+        self.spi_time = time.ticks_ms()
+        self.spi_bytes_per_second = 0 # bytes sent to the screen during the last full second in which something was drawn
+        # rendered label bitmaps (frame buffers) by (text, w, h, back color, fore color), so static labels are blitted when redrawn
+        self.label_cache = {}
+        self.label_cache_size = 0 # bytes
+        # register and data buffers for self._set_window (called for each dirty rectangle)
+        self._reg_buf = bytearray(2)
+        self._data_buf = bytearray(2)
+        self._palette = framebuf.FrameBuffer(bytearray(4), 2, 1, RGB565)
+
     @micropython.viper
     def _setup(self):
         '''screen set up routine; called by self.__init__'''
@@ -266,6 +486,17 @@ class Display(framebuf.FrameBuffer):
         _sleep_ms(50)
         reg_buf[1] = _DISP_CTRL1; data_buf[0] = 0x10; data_buf[1] = 0x17; _dc_low(); _write(reg_buf); _dc_high(); _write(data_buf)
 
+    def _count_spi_bytes(self, sent: int) -> None:
+        '''keep track of the number of bytes sent to the screen per second; called by self.draw_screen'''
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.spi_time) >= 1000:
+            self.spi_bytes_per_second = self.spi_bytes
+            if PRINT_SPI_RATE:
+                print(f'display: {self.spi_bytes} bytes/s')
+            self.spi_bytes = 0
+            self.spi_time = now
+        self.spi_bytes += sent
+
     @micropython.viper
     def _clear(self):
         '''clear screen; called by self.__init__'''
@@ -286,7 +517,7 @@ class Display(framebuf.FrameBuffer):
     @micropython.viper
     def _set_window(self, x0: int, y0: int, x1: int, y1: int):
         '''set draw window; called by self.draw_screen'''
-        reg_buf = bytearray(2); data_buf = bytearray(2)
+        reg_buf = self._reg_buf; data_buf = self._data_buf
         _write = self.spi.write; _dc = self.dc; _dc_low = _dc.low; _dc_high = _dc.high
         data = 0x1038 # 0x1000 | (_TOP_DOWN_L2R << 3) # BGR | I/D | AM
         reg_buf[1] = _ENTRY_MODE; data_buf[0] = data >> 8; data_buf[1] = data & 0xFF
@@ -0,0 +1,178 @@
+''' Host display library for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Display backend for running the ui on a computer with the micropython unix port instead of on the Cybo-Drummer hardware: it keeps the
+    frame buffer api of display.Display, but instead of sending the dirty regions to the screen it counts the bytes which would have been
+    sent over spi and saves every drawn frame as image file (ppm, or png if the deflate or zlib module is available).'''
+
+import micropython
+import time
+import struct
+
+try:
+    import deflate
+except ImportError:
+    deflate = None
+    try:
+        import zlib
+    except ImportError:
+        zlib = None
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+from display import Display
+
+_DISPLAY_WIDTH   = const(220)
+_DISPLAY_HEIGHT  = const(176)
+
+_MAX_BUFFER_SIZE = const(77440) # _DISPLAY_WIDTH * _DISPLAY_HEIGHT * 2
+
+_FORMAT_PPM      = 'ppm'
+_FORMAT_PNG      = 'png'
+
+class _SPICounter():
+    '''stand-in for machine.SPI counting the bytes written to it; initiated by HostDisplay.__init__'''
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def write(self, buffer) -> None:
+        self.count += len(buffer)
+
+    def deinit(self) -> None:
+        pass
+
+class _PinStub():
+    '''stand-in for the data/command, reset and backlight machine.Pin objects; initiated by HostDisplay.__init__'''
+
+    def high(self) -> None:
+        pass
+
+    def low(self) -> None:
+        pass
+
+    def on(self) -> None:
+        pass
+
+    def off(self) -> None:
+        pass
+
+class HostDisplay(Display):
+    '''class providing display buffer and draw functions of display.Display, saving each frame drawn by self.draw_screen as image file
+    named <path>_<frame number>.<image format> (or not saving them if path is None) and keeping a log of (frame number, number of spi
+    bytes including window commands, number of dirty rectangles, time in µs needed to prepare the spi data) per frame; to be initiated
+    instead of Display on a computer'''
+
+    def __init__(self, font, path: str|None = 'frame', image_format: str = _FORMAT_PPM) -> None:
+        if image_format == _FORMAT_PNG and ((deflate is None and zlib is None) or crc32 is None):
+            raise ValueError('png requires the deflate (or zlib) and binascii modules')
+        if image_format != _FORMAT_PNG and image_format != _FORMAT_PPM:
+            raise ValueError(f'unsupported image format: {image_format}')
+        self.spi = _SPICounter()
+        self.dc = (pin := _PinStub())
+        self.rst = pin
+        self.backlight = pin
+        self.font = font
+        self.path = path
+        self.image_format = image_format
+        self._init_buffer()
+        self.frame_count = 0
+        self.frame_log = []
+        self._clear()
+
+    def set_display(self, flag: bool) -> None:
+        '''turn display on or off; called by ui.check_sleep_time_out and ui._wake_up'''
+        pass
+
+    def draw_screen(self) -> None:
+        '''count the spi bytes needed to send the dirty regions of the display buffer to the screen and save the frame as image file;
+        called by main'''
+        if (dirty_count := self.dirty_count) == 0:
+            return
+        _spi = self.spi
+        _spi.count = 0
+        start_time = time.ticks_us()
+        super().draw_screen()
+        spi_time = time.ticks_diff(time.ticks_us(), start_time)
+        self.frame_log.append((frame := self.frame_count, _spi.count, dirty_count, spi_time))
+        self.frame_count = frame + 1
+        if (path := self.path) is not None:
+            self.save_image(f'{path}_{frame:04}.{self.image_format}')
+
+    def save_screen_dump(self) -> None:
+        '''save current screen buffer as image file; called by ui.process_user_input'''
+        self.save_image(f'screen dump {self.frame_count}.{self.image_format}')
+
+    def save_image(self, file_name: str) -> None:
+        '''save display buffer as ppm or png file (depending on self.image_format); called by self.draw_screen and
+        self.save_screen_dump'''
+        pixels = self._rgb_rows()
+        with open(file_name, 'wb') as file:
+            if self.image_format == _FORMAT_PPM:
+                file.write(f'P6 {_DISPLAY_WIDTH} {_DISPLAY_HEIGHT} 255\n'.encode())
+                file.write(pixels)
+                return
+            file.write(b'\x89PNG\r\n\x1a\n')
+            self._write_png_chunk(file, b'IHDR', struct.pack('>IIBBBBB', _DISPLAY_WIDTH, _DISPLAY_HEIGHT, 8, 2, 0, 0, 0))
+            # every row starts with filter type 0 (none)
+            rows = bytearray((3 * _DISPLAY_WIDTH + 1) * _DISPLAY_HEIGHT)
+            i = 0
+            j = 0
+            for _ in range(_DISPLAY_HEIGHT):
+                rows[i + 1:i + 1 + 3 * _DISPLAY_WIDTH] = pixels[j:j + 3 * _DISPLAY_WIDTH]
+                i += 3 * _DISPLAY_WIDTH + 1
+                j += 3 * _DISPLAY_WIDTH
+            self._write_png_chunk(file, b'IDAT', self._compress(rows))
+            self._write_png_chunk(file, b'IEND', b'')
+
+    def delete(self) -> None:
+        del self.byte_buffer
+
+    @micropython.native
+    def _rgb_rows(self) -> bytearray:
+        '''return display buffer converted to 8-bit rgb (the display buffer holds byte swapped rgb565 colours); called by
+        self.save_image'''
+        byte_buffer = self.byte_buffer
+        pixels = bytearray(3 * _DISPLAY_WIDTH * _DISPLAY_HEIGHT)
+        j = 0
+        for i in range(0, _MAX_BUFFER_SIZE, 2):
+            color = byte_buffer[i] << 8 | byte_buffer[i + 1]
+            pixels[j] = (color >> 11) * 255 // 31
+            pixels[j + 1] = (color >> 5 & 0b111111) * 255 // 63
+            pixels[j + 2] = (color & 0b11111) * 255 // 31
+            j += 3
+        return pixels
+
+    def _compress(self, data) -> bytes:
+        '''return data compressed to zlib stream; called by self.save_image'''
+        if deflate is None:
+            return zlib.compress(data)
+        import io
+        stream = io.BytesIO()
+        with deflate.DeflateIO(stream, deflate.ZLIB) as compressor:
+            compressor.write(data)
+        return stream.getvalue()
+
+    def _write_png_chunk(self, file, chunk_type: bytes, data) -> None:
+        '''write png chunk with length and checksum; called by self.save_image'''
+        file.write(struct.pack('>I', len(data)))
+        file.write(chunk_type)
+        file.write(data)
+        file.write(struct.pack('>I', crc32(data, crc32(chunk_type)) & 0xFFFFFFFF))
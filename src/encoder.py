@@ -43,8 +43,9 @@ _PROCESS_DELAY      = const(150) # ms
 class Encoder:
     '''rotary encoder handling class; initiated by ui.__init__'''
 
-    def __init__(self, pin_num_a, pin_num_b, value=0, div=1, max_val=_NONE):
+    def __init__(self, pin_num_a, pin_num_b, value=0, div=1, max_val=_NONE, input_pending=None):
         self.div = div
+        self.input_pending = bytearray(1) if input_pending is None else input_pending # flag set on movement to wake up the main loop
         self.max_val = max_val
         self.val = value * div
         self.multiplier = (max_val + 1) // _RANGE_DIVIDER
@@ -121,6 +122,7 @@ class Encoder:
             return
         self.a = a
         self.val -= 1 if a ^ self._pin_b() else -1
+        self.input_pending[0] = 1
 
     def _callback_b(self, pin_b):
         '''callback for rotary b pin irq; called (assigned) by self.__init__'''
@@ -128,6 +130,7 @@ class Encoder:
             return
         self.b = b
         self.val += 1 if b ^ self._pin_a() else -1
+        self.input_pending[0] = 1
 
     @micropython.viper
     def _step(self) -> int:
@@ -10,7 +10,12 @@
 
     You should have received a copy of the GNU General Public License along with this program. If not, see https://www.gnu.org/licenses/.'''
 
-_MIN_CH  = const(32)
+import framebuf
+
+_MIN_CH      = const(32)
+_FONT_WIDTH  = const(6)
+_FONT_HEIGHT = const(8)
+_CH_SIZE     = const(8) # bytes per character
 
 _g = (
 b'\x00\x00\x00\x00\x00\x00\x00\x00', # 032: space
@@ -165,6 +170,19 @@ b'\x00\x3C\x00\x00\x3C\x00\x00\x3C', # 180: right up (right)
 b'\x20\xF0\x20\x00\xF0\x00\x00\xF0', # 181: right up (right)
 )
 
+# all characters in a single contiguous (writable) buffer, so frame buffers can be built over it without copying character data
+_buffer = memoryview(bytearray(b''.join(_g)))
+del _g
+_glyphs = [None] * (len(_buffer) // _CH_SIZE)
+
 def get_ch(n: int) -> memoryview:
-    '''get reference to character data; called by Display.text_box'''
-    return memoryview(_g[n - _MIN_CH])
\ No newline at end of file
+    '''get reference to character data'''
+    return _buffer[(i := n - _MIN_CH) * _CH_SIZE:(i + 1) * _CH_SIZE]
+
+def get_glyph(n: int) -> framebuf.FrameBuffer:
+    '''get frame buffer of character to blit (built once on first use); called by Display.text_box, PageMonitor.add_to_monitor and
+    PageMonitor._reset_monitor'''
+    if (glyph := _glyphs[i := n - _MIN_CH]) is None:
+        glyph = framebuf.FrameBuffer(_buffer[i * _CH_SIZE:(i + 1) * _CH_SIZE], _FONT_WIDTH, _FONT_HEIGHT, framebuf.MONO_HLSB)
+        _glyphs[i] = glyph
+    return glyph
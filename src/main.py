@@ -14,10 +14,15 @@ import machine
 from sys import exit
 import time
 
-from main_loops import init, main, shut_down
+from main_loops import FAST_START, init, main, shut_down, boot_time
 
-_AVOID_BOOT_PIN = const(2)
-_BOOTLOADER_PIN = const(3)
+boot_time('imports')
+
+_AVOID_BOOT_PIN       = const(2)
+_BOOTLOADER_PIN       = const(3)
+
+_BOOT_CHECK_TIME      = const(1000) # ms
+_FAST_BOOT_CHECK_TIME = const(100) # ms: in fast start mode the trigger button needs to be held while powering on
 
 # if trigger button is pressed: avoid the main loop to start
 # if both trigger button and page button are pressed: trigger boot loader mode
@@ -26,7 +31,7 @@ led.on()
 boot_pin = machine.Pin(_AVOID_BOOT_PIN, machine.Pin.IN, machine.Pin.PULL_UP)
 boot_loader_pin = machine.Pin(_BOOTLOADER_PIN, machine.Pin.IN, machine.Pin.PULL_UP)
 start_time = time.ticks_ms()
-while time.ticks_diff(time.ticks_ms(), start_time) < 1000:
+while time.ticks_diff(time.ticks_ms(), start_time) < (_FAST_BOOT_CHECK_TIME if FAST_START else _BOOT_CHECK_TIME):
     if not boot_pin.value():
         print('trigger button pressed')
         if not boot_loader_pin.value():
@@ -38,6 +43,7 @@ led.off()
 del led
 del boot_pin
 del boot_loader_pin
+boot_time('boot button check')
 init()
 try:
     main()
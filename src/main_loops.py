@@ -11,12 +11,17 @@
     You should have received a copy of the GNU General Public License along with this program. If not, see https://www.gnu.org/licenses/.'''
 
 _PULSE = False
+HEAP_LOCK        = const(True) # set to False to allow memory allocation on the second core while routing
+DEBUG_HEAP_LOCK  = const(False) # set to True to print where memory allocation was attempted on the second core
+PRINT_BOOT_TIMES = const(False) # set to True to print the time since power-on and free heap at the end of each boot phase
+FAST_START       = const(False) # set to True to build the routes and start routing (without start-up delay) before the display and ui
 
 import micropython
 import _thread
 import machine
 import time
 import gc
+import sys
 from sys import exit
 
 # global variables to store thread lock, ui instance, data instance and router instance
@@ -24,18 +29,20 @@ thread_lock = _thread.allocate_lock()
 ui = None
 data = None
 router = None
+heap_lock_errors = 0 # number of times memory allocation was attempted on the second core while the heap was locked
 
 from router import Router
 import ui as ui_lib
 from data import Data
 
-_NONE                = const(-1)
+_NONE                 = const(-1)
 
-_MAIN_LOOP_DELAY     = const(1) # ms
-_SECOND_THREAD_DELAY = const(1000) # ms
-_PULSE_DELAY         = const(5000) # ms
+_FRAME_TIME           = const(33) # ms: minimum time between two screen redraws (about 30 frames per second)
+_SECOND_THREAD_DELAY  = const(1000) # ms
+_PULSE_DELAY          = const(5000) # ms
+_MAX_HEAP_LOCK_ERRORS = const(8) # the second core stops locking the heap after this many attempted memory allocations
 
-_OVERCLOCK_FREQ      = const(300_000_000) # Hz
+_OVERCLOCK_FREQ       = const(300_000_000) # Hz
 
 def init() -> None:
     '''initiations before starting main loops'''
@@ -51,57 +58,90 @@ def init() -> None:
     _gc_collect()
     _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
     if __debug__: micropython.alloc_emergency_exception_buf(100)
-    ui = ui_lib.UI()
-    _gc_collect()
-    _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
+    if not FAST_START:
+        ui = ui_lib.UI()
+        boot_time('ui')
+        _gc_collect()
+        _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
     data = Data()
     data.load_data_json_file()
+    boot_time('data')
     _gc_collect()
     _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
     router = Router()
+    boot_time('router')
     _gc_collect()
     _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
-    _thread.start_new_thread(second_thread, ())
-    # call update to load data
-    router.update(already_waiting=True)
+    if FAST_START:
+        # build routes and start routing before initiating the display and ui (router.update skips ui.program_change while ui is None);
+        # handshakes are enabled straight away, so anything changing routing state while the ui is built makes the second thread wait
+        router.update(already_waiting=True)
+        boot_time('routes')
+        _thread.start_new_thread(second_thread, ())
+        with thread_lock:
+            router.start_second_thread = True
+        ui = ui_lib.UI()
+        boot_time('ui')
+        ui.program_change(True)
+    else:
+        _thread.start_new_thread(second_thread, ())
+        # call update to load data
+        router.update(already_waiting=True)
+        boot_time('routes')
     _gc_collect()
     _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
     # draw screen
     ui.display.draw_screen()
+    boot_time('first draw')
     with thread_lock:
         router.start_second_thread = True
 
+def boot_time(phase: str) -> None:
+    '''print time since power-on and free heap at the end of a boot phase if PRINT_BOOT_TIMES is set; called by main.py, init,
+    second_thread and ui.__init__'''
+    if PRINT_BOOT_TIMES:
+        print(f'boot: {phase} ready after {time.ticks_ms()} ms, {gc.mem_free()} bytes free, {gc.mem_alloc()} bytes allocated')
+
 def main():
     '''main loop running on fist core, taking care of non time sensitive tasks: ui and processing encoders, user input, midi learn data and
-    monitor data'''
+    monitor data; user input is processed as soon as an encoder or button interrupt wakes it up, everything else once per frame, redrawing
+    the screen at most once per frame'''
     _process_encoder_input = ui.process_encoder_input # type: ignore
     _process_user_input = ui.process_user_input # type: ignore
+    _check_sleep_time_out = ui.check_sleep_time_out # type: ignore
     _read_midi_learn_data = router.read_midi_learn_data # type: ignore
     _process_midi_learn_data = ui.process_midi_learn_data # type: ignore
     _process_monitor = ui.process_monitor # type: ignore
     _process_program_change_break = router.process_program_change_break # type: ignore
     _draw_screen = ui.display.draw_screen # type: ignore
+    input_pending = ui.input_pending # type: ignore
     previous_midi_learn_data = None
     _time = time
     _ticks_ms = _time.ticks_ms
     _ticks_diff = _time.ticks_diff
-    _sleep_ms = _time.sleep_ms
+    _idle = machine.idle
     if _PULSE:
         last_pulse = _ticks_ms()
-    last_loop = _ticks_ms()
+    last_frame = _ticks_ms()
+    redraw = False
     while True:
-        _sleep_ms(_MAIN_LOOP_DELAY)
-        last_loop = _ticks_ms()
-        if _PULSE and _ticks_diff(last_loop, last_pulse) > _PULSE_DELAY:
-            print('main thread pulse')
-            last_pulse = last_loop
-        # limit main loop speed to improve stability
-        time.sleep_ms(_MAIN_LOOP_DELAY)
-        ui.check_sleep_time_out() # type: ignore
+        # wait (halting the core until the next interrupt) for user input or for the next frame to be due
+        while not input_pending[0] and _ticks_diff(_ticks_ms(), last_frame) < _FRAME_TIME:
+            _idle()
+        now = _ticks_ms()
+        input_pending[0] = 0 # clear before processing, so input arriving meanwhile sets it again
         # process encoders
-        redraw = _process_encoder_input()
+        redraw |= _process_encoder_input()
         # process buttons and other input
         redraw |= _process_user_input()
+        if _ticks_diff(now, last_frame) < _FRAME_TIME:
+            continue
+        # once per frame
+        last_frame = now
+        if _PULSE and _ticks_diff(now, last_pulse) > _PULSE_DELAY:
+            print('main thread pulse')
+            last_pulse = now
+        _check_sleep_time_out()
         # process midi learn input
         if (midi_learn_data := _read_midi_learn_data()) is not None:
             if midi_learn_data != previous_midi_learn_data:
@@ -109,35 +149,44 @@ def main():
         if previous_midi_learn_data is not None:
             redraw |= _process_midi_learn_data(previous_midi_learn_data)
             previous_midi_learn_data = None
-        # process router and midi monitor
-        redraw |= _process_monitor()
         # process program change break
         _process_program_change_break()
+        # process all waiting router and midi monitor data in one batch and redraw if anything changed
+        redraw |= _process_monitor()
         if redraw:
+            redraw = False
             _draw_screen()
 
 def second_thread() -> None:
     '''time sensitive loop running on second core, taking care of midi routing'''
+    global heap_lock_errors
     print('second thread: wait')
     _router = router
     while _router is None:
         pass
-    while _router.start_second_thread:
-        pass
+    if not FAST_START: # in fast start mode start_second_thread is set as soon as the thread is started
+        while _router.start_second_thread:
+            pass
     print('second thread: initiate')
-    input_ports = _router.midi_ports.input_ports # type: ignore
+    _process_input = _router.midi_ports.process_input # type: ignore
+    output_ports = _router.midi_ports.output_ports # type: ignore
     _process_timed_note_off_events = _router.process_timed_note_off_events # type: ignore
+    _process_cc_pending = _router.process_cc_pending # type: ignore
     routes = _router.routes # type: ignore
     _trigger_note_on = _router.trigger_note_on # type: ignore
     _led = machine.Pin(25, machine.Pin.OUT)
     _led_on = _led.on
     _led_off = _led.off
     _thread_lock = thread_lock
+    _heap_lock = micropython.heap_lock
+    _heap_unlock = micropython.heap_unlock
     print('second thread: start')
     _time = time
     _ticks_ms = _time.ticks_ms
     _ticks_diff = _time.ticks_diff
-    _time.sleep_ms(_SECOND_THREAD_DELAY)
+    if not FAST_START:
+        _time.sleep_ms(_SECOND_THREAD_DELAY)
+    boot_time('routing')
     while not _router.terminated:
         _led_on()
         # check if first thread asks to wait (handshake)
@@ -148,25 +197,43 @@ def second_thread() -> None:
                 _router.request_wait = False # type: ignore
         if _PULSE:
             last_pulse = _ticks_ms()
-        while _router.running and not _router.request_wait: # type: ignore
-            if _PULSE and _ticks_diff(_ticks_ms(), last_pulse) > _PULSE_DELAY:
-                print('second thread pulse')
-                last_pulse = _ticks_ms()
-            _led_on()
-            # process midi input
-            for port in input_ports:
-                port.process()
-            # process timed note off events
-            _process_timed_note_off_events()
-            # process trigger button input
-            if (trigger := _router.ui_trigger) is not None: # type: ignore
-                with _thread_lock:
-                    _router.ui_trigger = None # type: ignore
-                for route in routes[trigger]:
-                    if (note := route['output_note']) == _NONE:
-                        note = 60 # middle C
-                    note_off = route['note_off']
-                    _trigger_note_on(route['output_port'], route['output_channel'], note, note_off)
+        # the routing loop runs with the heap locked (the print statements of _PULSE allocate memory)
+        heap_lock = HEAP_LOCK and not _PULSE and heap_lock_errors < _MAX_HEAP_LOCK_ERRORS
+        if heap_lock:
+            _heap_lock()
+        try:
+            while _router.running and not _router.request_wait: # type: ignore
+                if _PULSE and _ticks_diff(_ticks_ms(), last_pulse) > _PULSE_DELAY:
+                    print('second thread pulse')
+                    last_pulse = _ticks_ms()
+                _led_on()
+                # process midi input
+                _process_input()
+                # send waiting midi thru messages
+                for port in output_ports:
+                    port.process_thru()
+                # process timed note off events
+                _process_timed_note_off_events()
+                # process held back pedal cc values
+                _process_cc_pending()
+                # process trigger button input
+                if (trigger := _router.ui_trigger) is not None: # type: ignore
+                    with _thread_lock:
+                        _router.ui_trigger = None # type: ignore
+                    for route in routes[trigger]:
+                        if (note := route['output_note']) == _NONE:
+                            note = 60 # middle C
+                        note_off = route['note_off']
+                        _trigger_note_on(route['output_port'], route['output_channel'], note, note_off)
+        except MemoryError as e: # memory allocation attempted while the heap was locked (the traceback uses the emergency exception
+                                 # buffer allocated by init): count it and carry on routing (the message being processed is lost)
+            _heap_unlock()
+            heap_lock = False
+            heap_lock_errors += 1
+            if DEBUG_HEAP_LOCK:
+                sys.print_exception(e)
+        if heap_lock:
+            _heap_unlock()
         _led_off()
     _thread.exit()
     print('second thread: terminated')
@@ -20,21 +20,57 @@
         Simple MIDI Decoder, copyright (c) 2020 diyelectromusic (Kevin), https://github.com/diyelectromusic/, https://diyelectromusic.com/'''
 
 import micropython
+from array import array
 
 import main_loops as ml
 
-_NONE                     = const(-1)
+_NONE                = const(-1)
 
-_MONITOR_MODE_MIDI_IN     = const(0)
+_EVENT_BUFFER_LENGTH = const(16)
+_SYSEX_CHUNK_LENGTH  = const(16)
 
-_COMMAND_NOTE_OFF         = const(0x80)
-_COMMAND_NOTE_ON          = const(0x90)
-_COMMAND_PROGRAM_CHANGE   = const(0xC0)
-_COMMAND_CHANNEL_PRESSURE = const(0xD0)
-_SYS_QUARTER_FRAME        = const(0xF1)
-_SYS_SONG_POSITION        = const(0xF2)
-_SYS_SONG_SELECT          = const(0xF3)
-_SYS_TUNE_REQUEST         = const(0xF6)
+_SYSEX_START         = const(0xF0)
+_SYSEX_END           = const(0xF7)
+_SYS_UNDEFINED       = const(0xF9) # system real-time byte which is not defined (not forwarded by the clock fast path)
+_SYS_STOP            = const(0xFC)
+
+# status byte classes: bits 0-1 hold the number of data bytes
+_CLASS_DATA          = const(0x00)
+_CLASS_CHANNEL       = const(0x04) # channel voice/mode message
+_CLASS_COMMON        = const(0x08) # system common message (cancels running status)
+_CLASS_REAL_TIME     = const(0x10) # system real-time message (may appear in between data bytes)
+_CLASS_SYSEX         = const(0x20) # system exclusive start/end
+_CLASS_UNDEFINED     = const(0x40) # undefined system common message (ignored, cancels running status)
+_CLASS_DISCARD       = const(0x80) # message filtered out for this input port (added to any of the above)
+
+# message filter bits (per input port, stored in data.input_port_mapping) and the status bytes they discard
+_FILTERS             = ((0b00000001, (0xFE,)), # active sensing
+                        (0b00000010, (0xF8, 0xFA, 0xFB, 0xFC)), # clock, start, continue, stop
+                        (0b00000100, range(0xA0, 0xB0)), # polyphonic aftertouch
+                        (0b00001000, range(0xD0, 0xE0)), # channel pressure
+                        (0b00010000, range(0xE0, 0xF0)), # pitch bend
+                        (0b00100000, range(0xB0, 0xC0)), # control change
+                        (0b01000000, range(0xC0, 0xD0)), # program change
+                        (0b10000000, (0xF1, 0xF2, 0xF3, 0xF6))) # system common
+
+def _status_classes(filter_mask: int = 0) -> bytes:
+    '''build 256-entry table with class and number of data bytes for each possible midi byte, marking status bytes filtered out by
+    filter_mask with _CLASS_DISCARD; called once when importing module and by MIDIDecoder.set_filter'''
+    table = bytearray(256) # 0x00 to 0x7F: _CLASS_DATA
+    for status_byte in range(0x80, 0xF0):
+        table[status_byte] = _CLASS_CHANNEL + (1 if 0xC0 <= status_byte <= 0xDF else 2) # program change and channel pressure: 1
+    for status_byte, value in ((0xF0, _CLASS_SYSEX), (0xF1, _CLASS_COMMON + 1), (0xF2, _CLASS_COMMON + 2), (0xF3, _CLASS_COMMON + 1),
+                               (0xF4, _CLASS_UNDEFINED), (0xF5, _CLASS_UNDEFINED), (0xF6, _CLASS_COMMON), (0xF7, _CLASS_SYSEX)):
+        table[status_byte] = value
+    for status_byte in range(0xF8, 0x100):
+        table[status_byte] = _CLASS_REAL_TIME
+    for bit, status_bytes in _FILTERS:
+        if filter_mask & bit:
+            for status_byte in status_bytes:
+                table[status_byte] |= _CLASS_DISCARD
+    return bytes(table)
+
+_STATUS_CLASSES = _status_classes()
 
 @micropython.viper
 class MIDIDecoder:
@@ -42,81 +78,126 @@ class MIDIDecoder:
 
     def __init__(self, id: int):
         self.id = id
-        self.channel = 0
-        self.command = 0
-        self.sys_common_command = 0
+        self.status_byte = 0 # 0 means no (running) status
+        self.data_length = 0
+        self.data_count = 0
         self.data_1 = 0
+        self.arrival_time = 0 # ticks_us time stamp of the byte being read (set by RingBuffer.process in irq input mode, or once per batch
+                              # by _InputPort._process_backend in polled input mode)
+        self.message_time = 0 # arrival time of the status byte (or first data byte if running status applies) of the current message
+        self.status_new = False # True if a status byte was received which hasn't been followed by a completed message yet
+        self.status_classes = _STATUS_CLASSES # own copy with filtered out status bytes marked if a filter is set
+        # completed messages, packed as 24-bit integers, waiting to be passed on to the router in one batch, with their arrival times
+        self.events = array('i', (0 for _ in range(_EVENT_BUFFER_LENGTH)))
+        self.event_times = array('i', (0 for _ in range(_EVENT_BUFFER_LENGTH)))
+        self.event_count = 0
+        # sysex bytes are streamed to the output port set for this input port in fixed-size chunks
+        self.sysex_output = None
+        self.sysex_chunk = bytearray(_SYSEX_CHUNK_LENGTH)
+        self.sysex_count = 0
 
     def read(self, midi_byte: int):
-        '''read, interpret and process midi byte, depending on the data calling router.route_note_on, router_note_off, router_midi_thru and/or
-        router.send_to_monitor; called by _InputPort.read'''
-        id = int(self.id)
-        if 0x80 <= midi_byte <= 0xEF: # voice message
-            self.command = midi_byte & 0xF0
-            self.channel = midi_byte & 0x0F
-            self.data_1 = 0
-            self.data_2 = 0
-            return
-        if midi_byte == 0xF0 or midi_byte == 0xF7: # sysex (filtered out)
-            self.command = 0
-            return
-        out_channel = _NONE
-        out_data_1 = _NONE
-        out_data_2 = _NONE
-        _router = ml.router
-        if 0xF1 <= midi_byte <= 0xF6: # system common message
-            self.command = midi_byte
-            if midi_byte != _SYS_TUNE_REQUEST:
+        '''read and interpret midi byte, adding completed messages to the event buffer (system real-time clock messages are passed
+        on to router.route_clock straight away if received on the midi clock input port); called by _InputPort.process'''
+        status_class = int(ptr8(self.status_classes)[midi_byte])
+        if self.sysex_output is not None and not status_class & _CLASS_REAL_TIME:
+            if status_class == _CLASS_DATA:
+                self._add_sysex(midi_byte)
                 return
-            out_command = midi_byte
-        elif 0xF8 <= midi_byte <= 0xFF: # system real-time message
-            out_command = midi_byte
-        else: # midi data
-            if (command := int(self.command)) == 0: # missing running status
+            self._add_sysex(_SYSEX_END) # any status byte (other than system real-time) ends a sysex message
+            self._end_sysex()
+            if midi_byte == _SYSEX_END:
+                return
+        if status_class & _CLASS_DISCARD:
+            if not status_class & _CLASS_REAL_TIME: # drop running status, so the message's data bytes are discarded as well
+                self.status_byte = 0
+                self.data_count = 0
+            return
+        if status_class == _CLASS_DATA:
+            if (status_byte := int(self.status_byte)) == 0: # missing running status
                 return
-            channel = int(self.channel)
-            data_1 = int(self.data_1)
-            if command == _SYS_QUARTER_FRAME or command == _SYS_SONG_SELECT:
-                out_command = command
-                out_data_1 = midi_byte
-                self.data_1 = 0
-            elif command == _COMMAND_PROGRAM_CHANGE or command == _COMMAND_CHANNEL_PRESSURE:
-                out_channel = channel
-                out_command = command
-                out_data_1 = midi_byte
-                self.data_1 = 0
-            elif data_1 == 0: # first data byte: store
+            if int(self.data_count) == 0 and not bool(self.status_new): # running status: message starts with this data byte
+                self.message_time = self.arrival_time
+            data_length = int(self.data_length)
+            if data_length == 2 and int(self.data_count) == 0: # first of two data bytes: store
                 self.data_1 = midi_byte
+                self.data_count = 1
                 return
-            else: # second data byte: process
-                if command == _COMMAND_NOTE_OFF:
-                    out_channel = channel
-                    out_command = _COMMAND_NOTE_OFF
-                    out_data_1 = data_1
-                    out_data_2 = midi_byte
-                    self.data_1 = 0
-                elif command == _COMMAND_NOTE_ON:
-                    if midi_byte != 0: # velocity != 0
-                        _router.route_note_on(channel, data_1, midi_byte, id)
-                    out_channel = channel
-                    out_command = _COMMAND_NOTE_ON
-                    out_data_1 = data_1
-                    out_data_2 = midi_byte
-                    self.data_1 = 0
-                elif command == _SYS_SONG_POSITION:
-                    out_command = _SYS_SONG_POSITION
-                    out_data_1 = data_1
-                    out_data_2 = midi_byte
-                    self.data_1 = 0
-                    self.data_2 = midi_byte
-                else:
-                    out_channel = channel
-                    out_command = command
-                    out_data_1 = data_1
-                    out_data_2 = midi_byte
-                    self.data_1 = 0
-                    self.data_2 = midi_byte
-        _router.route_midi_thru(out_channel, out_command, out_data_1, out_data_2, id)
-        if out_channel != _NONE:
-            out_channel += 1
-        _router.send_to_monitor(_MONITOR_MODE_MIDI_IN, id, out_channel, command=out_command, data_1=out_data_1, data_2=out_data_2)
\ No newline at end of file
+            self.data_count = 0
+            self.status_new = False
+            if data_length == 2:
+                self._add_event(2, status_byte, int(self.data_1), midi_byte, int(self.message_time))
+            else:
+                self._add_event(1, status_byte, midi_byte, 0, int(self.message_time))
+            if status_byte >= 0xF0: # system common message: no running status
+                self.status_byte = 0
+        elif status_class & _CLASS_CHANNEL:
+            self.status_byte = midi_byte
+            self.data_length = status_class & 0b11
+            self.data_count = 0
+            self.message_time = self.arrival_time
+            self.status_new = True
+        elif status_class & _CLASS_REAL_TIME:
+            if midi_byte <= _SYS_STOP and midi_byte != _SYS_UNDEFINED and \
+                int(self.id) == int(ml.router.clock_input_port): # clock fast path
+                ml.router.route_clock(midi_byte)
+                return
+            self._add_event(0, midi_byte, 0, 0, int(self.arrival_time))
+        elif status_class & _CLASS_COMMON:
+            self.data_count = 0
+            if (data_length := status_class & 0b11) == 0: # tune request
+                self.status_byte = 0
+                self._add_event(0, midi_byte, 0, 0, int(self.arrival_time))
+            else:
+                self.status_byte = midi_byte
+                self.data_length = data_length
+                self.message_time = self.arrival_time
+                self.status_new = True
+        else: # _CLASS_SYSEX or _CLASS_UNDEFINED
+            self.status_byte = 0
+            if midi_byte == _SYSEX_START and (output_port := int(ml.router.sysex_output_ports[self.id])) != _NONE:
+                self.sysex_output = ml.router.midi_ports.output_ports[output_port]
+                self._add_sysex(_SYSEX_START)
+
+    def set_filter(self, filter_mask: int):
+        '''set which message classes to discard (bitmask, see _FILTERS); called by router.update'''
+        self.status_classes = _STATUS_CLASSES if filter_mask == 0 else _status_classes(filter_mask)
+
+    def flush(self):
+        '''pass on buffered events to router.route_events in one batch and buffered sysex bytes to the sysex output port; called by
+        self._add_event and _InputPort.process'''
+        if (sysex_count := int(self.sysex_count)) > 0:
+            self.sysex_count = 0
+            self.sysex_output.queue_sysex(self.sysex_chunk, sysex_count)
+        if (event_count := int(self.event_count)) == 0:
+            return
+        self.event_count = 0
+        ml.router.route_events(self.events, self.event_times, event_count, self.id)
+
+    def _add_sysex(self, midi_byte: int):
+        '''add sysex byte to the sysex chunk, passing the chunk on to the sysex output port if full; called by self.read'''
+        sysex_count = int(self.sysex_count)
+        ptr8(self.sysex_chunk)[sysex_count] = midi_byte
+        if (sysex_count := sysex_count + 1) == _SYSEX_CHUNK_LENGTH:
+            sysex_count = 0
+            self.sysex_output.queue_sysex(self.sysex_chunk, _SYSEX_CHUNK_LENGTH)
+        self.sysex_count = sysex_count
+
+    def _end_sysex(self):
+        '''pass on the remaining sysex bytes and stop streaming sysex; called by self.read'''
+        if (sysex_count := int(self.sysex_count)) > 0:
+            self.sysex_count = 0
+            self.sysex_output.queue_sysex(self.sysex_chunk, sysex_count)
+        self.sysex_output = None
+
+    def _add_event(self, data_length: int, status_byte: int, data_1: int, data_2: int, event_time: int):
+        '''add completed message and its arrival time to event buffer, passing the buffer on to the router if full; called by self.read'''
+        #             2       8        7       7
+        # 00000000|11|11111111|1111111|1111111
+        #         |dl| status |   d1  |   d2
+        event_count = int(self.event_count)
+        ptr32(self.events)[event_count] = (data_length << 22) + (status_byte << 14) + (data_1 << 7) + data_2
+        ptr32(self.event_times)[event_count] = event_time
+        self.event_count = event_count + 1
+        if event_count + 1 == _EVENT_BUFFER_LENGTH:
+            self.flush()
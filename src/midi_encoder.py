@@ -26,6 +26,10 @@ _MONITOR_MODE_MIDI_OUT = const(1)
 
 _COMMAND_NOTE_OFF      = const(0x80)
 _COMMAND_NOTE_ON       = const(0x90)
+_COMMAND_CC            = const(0xB0)
+
+_CC_ALL_SOUND_OFF      = const(120)
+_CC_ALL_NOTES_OFF      = const(123)
 
 _NOTE_OFF_VELOCITY     = const(64)
 
@@ -39,11 +43,13 @@ class MIDIEncoder:
         self.vel_0_note_off = True
         self.running_status = True
         self.status_byte = -1
+        self.active_channels = 0 # bitmap of channels note on messages have been sent to since the last panic
 
     def set(self, vel_0_note_off: bool, running_status: bool):
         '''set device settings; called by router.update'''
         self.vel_0_note_off = vel_0_note_off
         self.running_status = running_status
+        self.status_byte = _NONE
 
     def note_on(self, channel: int, note: int, velocity: int):
         '''generate note on message and send it to midi and monitor; called by router.route_note_on'''
@@ -61,16 +67,40 @@ class MIDIEncoder:
             ml.router.send_to_monitor(_MONITOR_MODE_MIDI_OUT, self.id, channel,
                                       command=_COMMAND_NOTE_OFF, data_1=note, data_2=_NOTE_OFF_VELOCITY)
 
+    def panic_note_off(self, channel: int, note: int):
+        '''generate note off message and send it to midi only (not to monitor, so a panic doesn't flood it); called by
+        router._all_notes_off'''
+        if bool(self.vel_0_note_off):
+            self.midi_send(_COMMAND_NOTE_ON, channel, note, 0)
+        else:
+            self.midi_send(_COMMAND_NOTE_OFF, channel, note, _NOTE_OFF_VELOCITY)
+
+    def panic(self):
+        '''send all notes off and all sound off messages to each channel note on messages have been sent to since the last panic (not
+        sent to monitor); called by router.panic'''
+        if (active_channels := int(self.active_channels)) == 0:
+            return
+        self.active_channels = 0
+        channel = 0
+        while active_channels:
+            if active_channels & 1:
+                self.midi_send(_COMMAND_CC, channel, _CC_ALL_NOTES_OFF, 0)
+                self.midi_send(_COMMAND_CC, channel, _CC_ALL_SOUND_OFF, 0)
+            active_channels >>= 1
+            channel += 1
+
     def midi_send(self, command: int, channel: int, data_1: int, data_2: int):
-        '''send midi message, applying running status (unless disabled); called by note_on, note_off, router.update and
+        '''send midi message, applying running status (unless disabled); called by note_on, note_off, panic, router.update and
         router.route_midi_thru'''
-        status_byte = command if command == _NONE else command + channel
+        if command == _COMMAND_NOTE_ON:
+            self.active_channels = int(self.active_channels) | 1 << channel
+        status_byte = command if command == _NONE or channel == _NONE else command + channel
         if not bool(self.running_status):
             running_status = False
         elif 0x80 <= status_byte <= 0xEF:
             running_status = status_byte == int(self.status_byte)
             if not running_status:
-                self.status_byte = running_status
+                self.status_byte = status_byte
         elif 0xF0 <= status_byte <= 0xF7:
             running_status = False
             self.status_byte = _NONE
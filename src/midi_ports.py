@@ -23,18 +23,39 @@
         https://github.com/micropython/micropython/blob/master/examples/rp2/pio_uart_rx.py
         https://github.com/micropython/micropython/blob/master/examples/rp2/pio_uart_tx.py'''
 
+IRQ_INPUT      = const(True)  # True: pio input ports are read by interrupt handlers into ring buffers; False: all input ports are polled
+IRQ_UART_INPUT = const(False) # set to True to read the hardware uart input ports by (soft) interrupt handlers too (latency unmeasured)
+
 import micropython
 import machine
 import rp2
-import struct
+from array import array
+from time import ticks_us, ticks_ms, ticks_diff
 
 from midi_decoder import MIDIDecoder
 from midi_encoder import MIDIEncoder
+from midi_ring_buffer import RingBuffer
 
 _NONE         = const(-1)
 
+_NR_IN_PORTS  = const(6)
+
 _UART_BAUD    = const(31_250)
 
+_THRU_BACKLOG_LENGTH = const(32)
+_RX_BUFFER_LENGTH    = const(32)
+_SYSEX_BUFFER_LENGTH = const(128)
+_UART_SYSEX_CHUNK    = const(16) # bytes passed on to an idle uart at once (about 5 ms at midi speed)
+_SYSEX_TIME_OUT      = const(500) # ms: an open sysex message is closed if no sysex bytes have been sent for this long
+_PIO_TX_FIFO_LENGTH  = const(4)
+
+_SYSEX_START         = const(0xF0)
+_SYSEX_END           = const(0xF7)
+_REAL_TIME_START     = const(0xF8) # system real-time messages may be sent in the middle of a sysex message
+
+_COMMAND_CC         = const(0xB0)
+_COMMAND_PITCH_BEND = const(0xE0)
+
 _PORT_IS_PIO  = const(0)
 _PORT_ID      = const(1)
 _PORT_PIN     = const(2)
@@ -61,6 +82,8 @@ class MIDIPorts:
         self.hardware_uarts = {}
         self.input_ports = []
         self.output_ports = []
+        self.rx_pending = bytearray(_NR_IN_PORTS) # flag per input port with data waiting in its ring buffer (irq input mode)
+        self.polled_ports = [] # input ports without interrupt handler
 
     def load(self) -> None:
         '''load and initiate all midi input and output ports; called by router.__init__'''
@@ -74,10 +97,27 @@ class MIDIPorts:
         for port in set(ports):
             self.hardware_uarts[port] = machine.UART(port, _UART_BAUD) # type: ignore (temporary)
         for i, port in enumerate(_INPUT_PORTS):
-            self.input_ports.append(_InputPort(i, port[_PORT_IS_PIO], port[_PORT_ID], port[_PORT_PIN], self.hardware_uarts)) # type: ignore
+            self.input_ports.append(input_port := _InputPort(i, port[_PORT_IS_PIO], port[_PORT_ID], port[_PORT_PIN], self.hardware_uarts,
+                                                             self.rx_pending)) # type: ignore
+            if input_port.ring_buffer is None:
+                self.polled_ports.append(input_port)
         for i, port in enumerate(_OUTPUT_PORTS):
             self.output_ports.append(_OutputPort(i, port[_PORT_IS_PIO], port[_PORT_ID], port[_PORT_PIN], self.hardware_uarts)) # type: ignore
 
+    @micropython.viper
+    def process_input(self):
+        '''pass on received midi data to the midi decoders of input ports with data waiting (irq input mode) and of all polled input
+        ports; called by main.py: second_thread'''
+        if IRQ_INPUT:
+            input_ports = self.input_ports
+            rx_pending = ptr8(self.rx_pending)
+            for i in range(_NR_IN_PORTS):
+                if rx_pending[i]:
+                    rx_pending[i] = 0 # clear before processing, so data arriving meanwhile sets it again
+                    input_ports[i].process()
+        for port in self.polled_ports:
+            port.process()
+
     def delete(self) -> None:
         for port in self.input_ports:
             port.delete()
@@ -85,43 +125,103 @@ class MIDIPorts:
             port.delete()
         del self.hardware_uarts
         del self.input_ports
+        del self.polled_ports
         del self.output_ports
 
 class _InputPort:
     '''input port handling class; initiated by MidiPorts.load'''
 
-    def __init__(self, id: int, is_pio: bool, uart_id: int, pin: int, hardware_uarts) -> None:
-        self.is_pio = is_pio
-        if is_pio:
-            _Pin = machine.Pin
-            _pio_pin = _Pin(pin, _Pin.IN)
-            self.pio_uart = rp2.StateMachine(uart_id, uart_rx, freq=8 * _UART_BAUD, in_base=_pio_pin, jmp_pin=_pio_pin) # type: ignore (temporary)
-            self.pio_uart.active(1)
-            self.process = self._process_pio
-        else:
-            self.hardware_uart = hardware_uarts[uart_id]
-            self.process = self._process_uart
+    def __init__(self, id: int, is_pio: bool, uart_id: int, pin: int, hardware_uarts, rx_pending) -> None:
+        self.backend = (backend := _PIOBackend(uart_id, pin) if is_pio else _UARTBackend(hardware_uarts[uart_id]))
         self.midi_decoder = MIDIDecoder(id)
+        if IRQ_INPUT and (is_pio or IRQ_UART_INPUT):
+            self.ring_buffer = (ring_buffer := RingBuffer(backend, rx_pending, id))
+            backend.set_irq(ring_buffer.irq)
+            self.process = self._process_ring_buffer
+        else:
+            self.ring_buffer = None
+            self.rx_buffer = bytearray(_RX_BUFFER_LENGTH)
+            self.process = self._process_backend
+
+    def _process_ring_buffer(self) -> None:
+        '''read data waiting in ring buffer into midi decoder and pass decoded messages on to the router in one batch (irq input mode);
+        called by MIDIPorts.process_input'''
+        self.ring_buffer.process(self.midi_decoder)
+
+    @micropython.viper
+    def _process_backend(self):
+        '''read all available data into midi decoder and pass decoded messages on to the router in one batch (polled input mode); called
+        by MIDIPorts.process_input'''
+        rx_buffer = self.rx_buffer
+        if (n := int(self.backend.read_into(rx_buffer, _RX_BUFFER_LENGTH))) == 0:
+            return
+        midi_decoder = self.midi_decoder
+        midi_decoder.arrival_time = int(ticks_us()) # bytes read in one batch share the same arrival time
+        buffer = ptr8(rx_buffer)
+        for i in range(n):
+            midi_decoder.read(buffer[i])
+        midi_decoder.flush()
+
+    def delete(self):
+        if self.ring_buffer is not None:
+            self.backend.set_irq(None)
+        self.backend.delete()
+
+class _PIOBackend:
+    '''pio uart input port backend (see midi_ring_buffer.py for the backend interface); initiated by _InputPort.__init__'''
+
+    def __init__(self, state_machine_id: int, pin: int) -> None:
+        _Pin = machine.Pin
+        _pio_pin = _Pin(pin, _Pin.IN)
+        self.pio_uart = rp2.StateMachine(state_machine_id, uart_rx, freq=8 * _UART_BAUD, in_base=_pio_pin, jmp_pin=_pio_pin) # type: ignore (temporary)
+        self.pio_uart.active(1)
 
     @micropython.viper
-    def _process_pio(self):
-        '''read data and send it to midi decoder if new data is available (for pio port); called by main.py: second_thread'''
+    def read_into(self, buffer, length: int) -> int:
+        '''read up to length bytes from the rx fifo into buffer and return number of bytes read; called by RingBuffer.irq and
+        _InputPort._process_backend'''
         _uart = self.pio_uart
-        if bool(_uart.rx_fifo()):
-            self.midi_decoder.read(uint(_uart.get()) >> 24) # type: ignore
+        target = ptr8(buffer)
+        n = 0
+        while n < length and bool(_uart.rx_fifo()):
+            target[n] = int(_uart.get(None, 24)) # shift to small int, so no allocation inside interrupt handler
+            n += 1
+        return n
+
+    def set_irq(self, handler) -> None:
+        '''set (hard) interrupt handler, called each time uart_rx pushed a byte (None to stop); called by _InputPort.__init__ and
+        _InputPort.delete'''
+        self.pio_uart.irq(handler, hard=True)
+
+    def delete(self) -> None:
+        self.pio_uart.active(0)
+
+class _UARTBackend:
+    '''hardware uart input port backend (see midi_ring_buffer.py for the backend interface); initiated by _InputPort.__init__'''
+
+    def __init__(self, hardware_uart) -> None:
+        self.hardware_uart = hardware_uart
 
     @micropython.viper
-    def _process_uart(self):
-        '''read data and send it to midi decoder if new data is available (for uart port); called by main.py: second_thread'''
+    def read_into(self, buffer, length: int) -> int:
+        '''read up to length bytes from the uart into buffer and return number of bytes read; called by RingBuffer.irq and
+        _InputPort._process_backend'''
         _uart = self.hardware_uart
-        if _uart.any():
-            self.midi_decoder.read(uint(_uart.read(1)[0])) # type: ignore
+        if (n := int(_uart.any())) == 0:
+            return 0
+        return int(_uart.readinto(buffer, n if n < length else length))
 
-    def delete(self):
-        if self.is_pio:
-            self.pio_uart.active(0)
+    def set_irq(self, handler) -> None:
+        '''set (soft) interrupt handler, called when the uart receive line goes idle after receiving data (None to stop); a soft handler
+        is used because reading the uart takes a lock; called by _InputPort.__init__ and _InputPort.delete'''
+        _uart = self.hardware_uart
+        if handler is None:
+            _uart.irq(None)
         else:
-            self.hardware_uart.deinit()
+            _uart.irq(handler, _uart.IRQ_RXIDLE)
+
+    def delete(self) -> None:
+        self.hardware_uart.deinit()
 
 class _OutputPort:
     '''output port handling class; initiated by MidiPorts.load'''
@@ -133,21 +233,219 @@ class _OutputPort:
             self.pio_uart = rp2.StateMachine(uart_id, uart_tx, freq=8 * _UART_BAUD, sideset_base=_pin, out_base=_pin) # type: ignore (temporary)
             self.pio_uart.active(1)
             self.midi_encoder = MIDIEncoder(id, self.pio_midi_send)
+            self.tx_idle = self._tx_idle_pio
+            self.tx_room = self._tx_room_pio
+            self.send_real_time = self._send_real_time_pio
         else:
             self.hardware_uart = hardware_uarts[uart_id]
             self.midi_encoder = MIDIEncoder(id, self.hardware_midi_send)
+            self.tx_idle = self._tx_idle_uart
+            self.tx_room = self._tx_room_uart
+            self.send_real_time = self._send_real_time_uart
+            self.real_time_buffer = bytearray(1)
+            # preallocated buffers for two and three byte messages, so sending doesn't allocate memory on the second core
+            self.message_buffer_2 = bytearray(2)
+            self.message_buffer_3 = bytearray(3)
+        # merge stage: midi thru messages are only sent while the transmitter is idle, so routed notes (sent straight to the midi
+        # encoder) always go first; waiting thru messages are stored as packed 24-bit integers in a ring buffer (oldest first)
+        self.thru_backlog = array('i', (0 for _ in range(_THRU_BACKLOG_LENGTH)))
+        self.thru_head = 0
+        self.thru_count = 0
+        # sysex streaming: bytes from MidiDecoder chunks wait in a fixed-size ring buffer until the transmitter can take them and are
+        # passed on in small chunks; midi only allows system real-time bytes within a sysex message, so a routed note or other message
+        # sent while a sysex message is open (sysex_open) closes it early with _SYSEX_END and the rest of the sysex message is dropped
+        # (notes always have priority)
+        self.sysex_buffer = bytearray(_SYSEX_BUFFER_LENGTH)
+        self.sysex_head = 0
+        self.sysex_count = 0
+        self.sysex_open = False
+        self.sysex_time = 0 # ticks_ms time the last sysex byte was passed on to the transmitter
+        self.sysex_dropping = False # True if the rest of the sysex message coming in is to be dropped (closed early)
+
+    @micropython.viper
+    def queue_sysex(self, chunk, chunk_length: int):
+        '''add chunk of sysex bytes to the sysex buffer; if it doesn't fit, the rest of the sysex message is dropped and the message
+        is closed early; called by MidiDecoder.flush and MidiDecoder._add_sysex'''
+        source = ptr8(chunk)
+        buffer = ptr8(self.sysex_buffer)
+        head = int(self.sysex_head)
+        count = int(self.sysex_count)
+        for i in range(chunk_length):
+            midi_byte = source[i]
+            if bool(self.sysex_dropping):
+                if midi_byte == _SYSEX_END:
+                    self.sysex_dropping = False
+                continue
+            if count == _SYSEX_BUFFER_LENGTH: # buffer full: drop (rest of) message
+                self.sysex_dropping = midi_byte != _SYSEX_END
+                continue
+            if count == _SYSEX_BUFFER_LENGTH - 1 and midi_byte != _SYSEX_END: # keep last position free to close the message
+                self.sysex_dropping = True
+                if midi_byte == _SYSEX_START:
+                    continue
+                midi_byte = _SYSEX_END
+            buffer[(head + count) % _SYSEX_BUFFER_LENGTH] = midi_byte
+            count += 1
+        self.sysex_count = count
+
+    @micropython.viper
+    def queue_thru(self, command: int, channel: int, data_1: int, data_2: int):
+        '''send midi thru message if the transmitter is idle and nothing is waiting, otherwise add it to the thru backlog, replacing a
+        waiting value for the same control change or pitch bend (latest value wins) or dropping the oldest message if the backlog is full;
+        called by router.route_midi_thru'''
+        count = int(self.thru_count)
+        if count == 0 and not bool(self.sysex_open) and bool(self.tx_idle()):
+            self.midi_encoder.midi_send(command, channel, data_1, data_2)
+            return
+        #               8        8        8
+        # 00000000|11111111|11111111|11111111
+        #         | status |   d1   |   d2
+        #         |  byte  | (0xFF = _NONE)
+        message = ((command if channel == _NONE else command + channel) << 16) + ((data_1 & 0xFF) << 8) + (data_2 & 0xFF)
+        thru_backlog = self.thru_backlog
+        head = int(self.thru_head)
+        if command == _COMMAND_CC or command == _COMMAND_PITCH_BEND:
+            mask = 0xFFFF00 if command == _COMMAND_CC else 0xFF0000
+            for i in range(count):
+                slot = (head + i) % _THRU_BACKLOG_LENGTH
+                if int(thru_backlog[slot]) & mask == message & mask:
+                    thru_backlog[slot] = message
+                    return
+        if count == _THRU_BACKLOG_LENGTH:
+            head = (head + 1) % _THRU_BACKLOG_LENGTH
+            self.thru_head = head
+            count -= 1
+        thru_backlog[(head + count) % _THRU_BACKLOG_LENGTH] = message
+        self.thru_count = count + 1
+
+    @micropython.viper
+    def process_thru(self):
+        '''send waiting sysex bytes as far as the transmitter can take them, or else the oldest waiting midi thru message if the
+        transmitter is idle; called by main.py: second_thread'''
+        if int(self.sysex_count) > 0:
+            self._process_sysex()
+        elif bool(self.sysex_open) and int(ticks_diff(int(ticks_ms()), int(self.sysex_time))) > _SYSEX_TIME_OUT: # source stalled
+            self._close_sysex()
+        if (count := int(self.thru_count)) == 0 or bool(self.sysex_open) or not bool(self.tx_idle()):
+            return
+        message = int(self.thru_backlog[head := int(self.thru_head)])
+        self.thru_head = (head + 1) % _THRU_BACKLOG_LENGTH
+        self.thru_count = count - 1
+        status_byte = message >> 16
+        if (data_1 := (message >> 8) & 0xFF) == 0xFF:
+            data_1 = _NONE
+        if (data_2 := message & 0xFF) == 0xFF:
+            data_2 = _NONE
+        if status_byte < 0xF0:
+            self.midi_encoder.midi_send(status_byte & 0xF0, status_byte & 0x0F, data_1, data_2)
+        else:
+            self.midi_encoder.midi_send(status_byte, _NONE, data_1, data_2)
+
+    def _send_real_time_pio(self, midi_byte: int) -> None:
+        '''send single byte straight to the pio state machine, bypassing midi encoder and thru backlog (for pio port); called by
+        router.route_clock, self._process_sysex and self._close_sysex'''
+        self.pio_uart.put(midi_byte)
+
+    def _send_real_time_uart(self, midi_byte: int) -> None:
+        '''send single byte straight to the uart, bypassing midi encoder and thru backlog (for uart port); called by router.route_clock,
+        self._process_sysex, self._close_sysex and self.hardware_midi_send'''
+        self.real_time_buffer[0] = midi_byte
+        self.hardware_uart.write(self.real_time_buffer)
+
+    def clear_thru(self) -> None:
+        '''drop all waiting midi thru messages and sysex bytes, closing a sysex message being sent; called by router.panic'''
+        self.thru_count = 0
+        self._close_sysex()
+        self.sysex_count = 0
+
+    @micropython.viper
+    def _process_sysex(self):
+        '''pass on waiting sysex bytes to the transmitter as far as it can take them; called by self.process_thru'''
+        buffer = ptr8(self.sysex_buffer)
+        head = int(self.sysex_head)
+        count = int(self.sysex_count)
+        if (room := int(self.tx_room())) == 0:
+            return
+        _send = self.send_real_time
+        while count > 0 and room > 0:
+            midi_byte = buffer[head]
+            head = (head + 1) % _SYSEX_BUFFER_LENGTH
+            count -= 1
+            room -= 1
+            if midi_byte == _SYSEX_START:
+                self.sysex_open = True
+                self.midi_encoder.status_byte = _NONE # sysex cancels running status
+            _send(midi_byte)
+            if midi_byte == _SYSEX_END:
+                self.sysex_open = False
+        self.sysex_head = head
+        self.sysex_count = count
+        self.sysex_time = ticks_ms()
+
+    @micropython.viper
+    def _close_sysex(self):
+        '''close sysex message being sent early with _SYSEX_END, dropping the rest of the message (waiting in the sysex buffer or still
+        coming in); called by self.process_thru (time-out), self.clear_thru, self.hardware_midi_send and self.pio_midi_send'''
+        if not bool(self.sysex_open):
+            return
+        self.sysex_open = False
+        self.send_real_time(_SYSEX_END)
+        buffer = ptr8(self.sysex_buffer)
+        head = int(self.sysex_head)
+        count = int(self.sysex_count)
+        ended = False
+        while count > 0 and not ended:
+            ended = buffer[head] == _SYSEX_END
+            head = (head + 1) % _SYSEX_BUFFER_LENGTH
+            count -= 1
+        if not ended: # end of message not received yet
+            self.sysex_dropping = True
+        self.sysex_head = head
+        self.sysex_count = count
+
+    def _tx_room_pio(self) -> int:
+        '''return number of bytes which can be passed on to the pio state machine without waiting (for pio port); called by
+        self._process_sysex'''
+        return _PIO_TX_FIFO_LENGTH - self.pio_uart.tx_fifo()
+
+    def _tx_room_uart(self) -> int:
+        '''return number of bytes which can be passed on to the uart without waiting (one small chunk once everything sent before has
+        gone out, so routed notes never wait behind more than one chunk; for uart port); called by self._process_sysex'''
+        return _UART_SYSEX_CHUNK if self.hardware_uart.txdone() else 0
+
+    def _tx_idle_pio(self) -> bool:
+        '''return True if all midi data has been passed on to the pio state machine (for pio port); called by self.queue_thru and
+        self.process_thru'''
+        return self.pio_uart.tx_fifo() == 0
+
+    def _tx_idle_uart(self) -> bool:
+        '''return True if all midi data has been sent (for uart port); called by self.queue_thru and self.process_thru'''
+        return self.hardware_uart.txdone()
 
     def hardware_midi_send(self, byte_0: int, byte_1: int, byte_2: int) -> None:
-        '''send midi data to hardware uart port; called by MidiEncoder.midi_send (callback_midi_send)'''
+        '''send midi data to hardware uart port (closing a sysex message being sent, unless sending a system real-time message); called
+        by MidiEncoder.midi_send (callback_midi_send)'''
+        if self.sysex_open and byte_0 < _REAL_TIME_START:
+            self._close_sysex()
         if byte_1 == _NONE:
-            self.hardware_uart.write(struct.pack('b', byte_0))
+            self._send_real_time_uart(byte_0)
         elif byte_2 == _NONE:
-            self.hardware_uart.write(struct.pack('bb', byte_0, byte_1))
+            buffer = self.message_buffer_2
+            buffer[0] = byte_0
+            buffer[1] = byte_1
+            self.hardware_uart.write(buffer)
         else:
-            self.hardware_uart.write(struct.pack('bbb', byte_0, byte_1, byte_2))
+            buffer = self.message_buffer_3
+            buffer[0] = byte_0
+            buffer[1] = byte_1
+            buffer[2] = byte_2
+            self.hardware_uart.write(buffer)
 
     def pio_midi_send(self, byte_0: int, byte_1: int, byte_2: int) -> None:
-        '''send midi data to pio uart port; called by MidiEncoder.midi_send (callback_midi_send)'''
+        '''send midi data to pio uart port (closing a sysex message being sent, unless sending a system real-time message); called by
+        MidiEncoder.midi_send (callback_midi_send)'''
+        if self.sysex_open and byte_0 < _REAL_TIME_START:
+            self._close_sysex()
         self.pio_uart.put(byte_0)
         if byte_1 != _NONE:
             self.pio_uart.put(byte_1)
@@ -174,6 +472,7 @@ def uart_rx():
     jmp("start")               # type: ignore
     label("good_stop")         # type: ignore
     push(block)                # type: ignore
+    irq(rel(0))                # type: ignore (raise interrupt for IRQ_INPUT mode)
 
 @rp2.asm_pio(sideset_init=rp2.PIO.OUT_HIGH, out_init=rp2.PIO.OUT_HIGH, out_shiftdir=rp2.PIO.SHIFT_RIGHT)
 def uart_tx():
@@ -0,0 +1,138 @@
+''' MIDI input ring buffer library for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Input port backends (see midi_ports.py for the pio and uart backends) provide:
+        read_into(buffer, length: int) -> int: read up to length received bytes into buffer without waiting and return number of bytes read
+        set_irq(handler): call handler (with one argument) each time data is received (None to stop)
+        delete(): release hardware
+    This module only depends on micropython, array and time, so the ring buffer can be tested and benchmarked with the unix port of
+    MicroPython, using LoopbackBackend instead of a hardware backend.'''
+
+import micropython
+from array import array
+from time import ticks_us
+
+_RING_LENGTH   = const(64) # needs to be a power of 2
+_RING_MASK     = const(_RING_LENGTH - 1)
+_CHUNK_LENGTH  = const(16)
+
+class RingBuffer:
+    '''single-producer, single-consumer ring buffer storing received midi bytes with their arrival time (ticks_us); the interrupt handler
+    (self.irq) only writes write_index and the consumer (self.process) only writes read_index, so no lock is needed, even if the interrupt
+    is handled on the other core; initiated by _InputPort.__init__'''
+
+    def __init__(self, backend, rx_pending, id: int) -> None:
+        self.backend = backend
+        self.rx_pending = rx_pending # flag per input port, set by self.irq and cleared by MIDIPorts.process_input
+        self.id = id
+        self.data = bytearray(_RING_LENGTH)
+        self.times = array('i', (0 for _ in range(_RING_LENGTH)))
+        self.write_index = 0
+        self.read_index = 0
+        self.dropped = 0 # number of bytes dropped because the ring buffer was full
+        self.chunk = bytearray(_CHUNK_LENGTH)
+
+    @micropython.viper
+    def irq(self, _):
+        '''copy received bytes into the ring buffer, stamped with the current time (allocation free, so it can run as hard interrupt
+        handler); called by the backend's interrupt'''
+        chunk = self.chunk
+        backend = self.backend # method calls on backend don't allocate (binding read_into to a local name would)
+        if (n := int(backend.read_into(chunk, _CHUNK_LENGTH))) == 0:
+            return
+        now = int(ticks_us())
+        source = ptr8(chunk)
+        data = ptr8(self.data)
+        times = ptr32(self.times)
+        read_index = int(self.read_index)
+        write_index = int(self.write_index)
+        while n > 0:
+            for i in range(n):
+                if (next_index := (write_index + 1) & _RING_MASK) == read_index: # full: drop byte
+                    self.dropped = int(self.dropped) + 1
+                    continue
+                data[write_index] = source[i]
+                times[write_index] = now
+                write_index = next_index
+            n = int(backend.read_into(chunk, _CHUNK_LENGTH))
+        self.write_index = write_index
+        ptr8(self.rx_pending)[int(self.id)] = 1
+
+    @micropython.viper
+    def process(self, midi_decoder):
+        '''read waiting bytes into midi decoder (setting its arrival_time per byte) and pass decoded messages on to the router in one
+        batch; called by _InputPort._process_ring_buffer'''
+        read_index = int(self.read_index)
+        if read_index == (write_index := int(self.write_index)):
+            return
+        data = ptr8(self.data)
+        times = ptr32(self.times)
+        while read_index != write_index:
+            midi_decoder.arrival_time = times[read_index]
+            midi_decoder.read(data[read_index])
+            read_index = (read_index + 1) & _RING_MASK
+        self.read_index = read_index
+        midi_decoder.flush()
+
+class LoopbackBackend:
+    '''host loopback input port backend: bytes passed to self.write are read back as if received by a midi input port, calling the
+    interrupt handler (if set) straight away; for testing and benchmarking on a host computer'''
+
+    def __init__(self, length: int = 256) -> None:
+        self.buffer = bytearray(length)
+        self.length = length
+        self.head = 0
+        self.count = 0
+        self.handler = None
+
+    def write(self, data) -> int:
+        '''add bytes to the loopback buffer (as far as they fit) and return number of bytes added'''
+        buffer = self.buffer
+        length = self.length
+        head = self.head
+        count = self.count
+        n = 0
+        for midi_byte in data:
+            if count == length:
+                break
+            buffer[(head + count) % length] = midi_byte
+            count += 1
+            n += 1
+        self.count = count
+        if self.handler is not None:
+            self.handler(self)
+        return n
+
+    def read_into(self, buffer, length: int) -> int:
+        '''read up to length waiting bytes into buffer and return number of bytes read; called by RingBuffer.irq and _InputPort.process'''
+        source = self.buffer
+        head = self.head
+        n = min(self.count, length)
+        for i in range(n):
+            buffer[i] = source[head]
+            head = (head + 1) % self.length
+        self.head = head
+        self.count -= n
+        return n
+
+    def set_irq(self, handler) -> None:
+        '''set handler to be called each time data is written (None to stop); called by _InputPort.__init__'''
+        self.handler = handler
+
+    def delete(self) -> None:
+        self.handler = None
@@ -14,9 +14,13 @@
         Simple MIDI Multi-RX-TX Router, copyright (c) 2023 diyelectromusic (Kevin),
         https://github.com/diyelectromusic/, https://diyelectromusic.com/'''
 
+PRINT_PANIC_TIME   = const(False) # set to True to print how long a panic takes
+PRINT_CLOCK_JITTER = const(False) # set to True to print midi clock forwarding jitter once every quarter note
+PRINT_CHOKE_TIME   = const(False) # set to True to print how long choking a choke group takes once every 64 chokes
+
 import micropython
 import builtins
-from collections import deque
+from array import array
 import gc
 import time
 
@@ -31,24 +35,35 @@ _ASCII_A                   = const(65)
 
 _FRAME_INPUT               = const(2)
 
+_NR_IN_PORTS               = const(6)
+_NR_OUT_PORTS              = const(6)
 _MAX_VOICES                = const(64)
+_MAX_POLYPHONY             = const(16)
 _MATRIX_ROWS               = const(8)
 _MATRIX_COLUMNS            = const(8)
+_CC_MAX                    = const(127)
+_CHOKE_GROUPS              = const(16)
+_MAX_CHOKE_MEMBERS         = const(30) # bitmap needs to fit in a small int
+_MAX_ZONES                 = const(4)
 
 _PROGRAM_CHANGE_BLOCK_TIME = const(500) # ms
 _MIDI_LEARN_DELAY          = const(300) # ms
+_CC_INTERVAL               = const(10) # ms (default minimum interval between forwarded pedal cc values)
 
 _ADD_NEW_LABEL             = '[add new]'
 
-_MONITOR_BUFFER_LENGTH     = const(10)
+_MONITOR_BUFFER_LENGTH     = const(32)
 
+_MONITOR_MODE_MIDI_IN      = const(0)
 _MONITOR_MODE_ROUTING      = const(2)
 
-# _COMMAND_NOTE_OFF          = const(0x80)
+_COMMAND_NOTE_OFF          = const(0x80)
 _COMMAND_NOTE_ON           = const(0x90)
+_COMMAND_POLY_PRESSURE     = const(0xA0)
 _COMMAND_CC                = const(0xB0)
 _COMMAND_PROGRAM_CHANGE    = const(0xC0)
 _SYS_CLOCK                 = const(0xF8)
+_CLOCKS_PER_QUARTER_NOTE   = const(24)
 _SYS_ACTIVE_SENSING        = const(0xFE)
 _CC_BANK_MSB               = const(0x00)
 _CC_BANK_LSB               = const(0x20)
@@ -88,6 +103,12 @@ class Router():
                               [0, 0, 0, 0, 0, 0, 0, 0]]
         self.routing = []
         self.routes = {}
+        # pedal cc routes: lists of routes (self.cc_routes) indexed per input port and cc number (self.cc_route_index, set up by
+        # self.update) and input channel per input port to check against
+        self.cc_route_index = array('h', (_NONE for _ in range(_NR_IN_PORTS << 7)))
+        self.cc_routes = []
+        self.input_channels = array('b', (_NONE for _ in range(_NR_IN_PORTS)))
+        self.midi_learn_ports = 0 # bitmask of input ports listened to for midi learn
         self.input_trigger = 0
         input_triggers = ml.data.input_triggers
         for i, trigger_short in enumerate(TRIGGERS_SHORT):
@@ -97,10 +118,65 @@ class Router():
         self.input_zone = 0
         self.midi_ports = MIDIPorts(ml.thread_lock)
         self.note_off_time_tracker = {}
+        # per output port ring of tracked notes (oldest first) to steal the oldest note if max polyphony is exceeded; released notes are
+        # marked as _NONE in the ring (looked up via self.note_ring_slots) and skipped when stealing
+        self.max_polyphony = array('b', (_NONE for _ in range(_NR_OUT_PORTS)))
+        self.active_notes = array('B', (0 for _ in range(_NR_OUT_PORTS)))
+        self.note_ring = array('h', (_NONE for _ in range(_NR_OUT_PORTS * _MAX_POLYPHONY)))
+        self.note_ring_head = array('B', (0 for _ in range(_NR_OUT_PORTS)))
+        self.note_ring_used = array('B', (0 for _ in range(_NR_OUT_PORTS)))
+        self.note_ring_slots = {}
+        # note off time tracker keys which expired in the current pass (so no delete list needs to be built on the second core); the
+        # rest waits for the next pass if more notes expire at once
+        self.expired_notes = array('i', (0 for _ in range(_NR_OUT_PORTS * _MAX_POLYPHONY)))
+        self._reserve_note_dicts()
+        # precompiled choke table (set up by self.update): input key (like route key for note on, with bit 0 set for polyphonic
+        # aftertouch) -> (trigger, choke zone, array of output notes to stop, packed like note off time tracker keys)
+        self.choke_table = {}
+        # choke groups: per group a bitmap of members (distinct output port/channel/note, stored in self.choke_members) which might be
+        # sounding, so choking only iterates over sounding members; self.choke_slots links note off time tracker keys to (group << 5) + bit
+        self.choke_active = array('I', (0 for _ in range(_CHOKE_GROUPS)))
+        self.choke_members = array('i', (0 for _ in range(_CHOKE_GROUPS * _MAX_CHOKE_MEMBERS)))
+        self.choke_slots = {}
+        if PRINT_CHOKE_TIME:
+            self.choke_count = 0
+            self.choke_total_time = 0
+            self.choke_max_time = 0
+        # retrigger mask per input trigger zone (slot trigger * _MAX_ZONES + zone, looked up by note on key in self.mask_slots, which is
+        # set up by self.update): a hit within mask time after the previous (unsuppressed) hit softer than mask velocity % of it is dropped
+        self.mask_slots = {}
+        mask_slot_count = len(TRIGGERS) * _MAX_ZONES
+        self.mask_time = array('H', (0 for _ in range(mask_slot_count)))
+        self.mask_velocity = array('B', (0 for _ in range(mask_slot_count)))
+        self.last_hit_time = array('i', (0 for _ in range(mask_slot_count))) # arrival time (ticks_us)
+        self.last_hit_velocity = array('B', (0 for _ in range(mask_slot_count)))
+        self.suppressed_count = array('H', (0 for _ in range(mask_slot_count)))
+        # per (output port, channel, cc) state for forwarding pedal cc values (indexed by route['cc_slot'], set up by self.update)
+        self.cc_out_key = array('h')
+        self.cc_sent = array('b')
+        self.cc_pending = array('b')
+        self.cc_sent_time = array('i')
+        self.cc_deadband = array('B')
+        self.cc_interval = array('H')
+        self.cc_pending_count = 0
+        self.clock_input_port = _NONE
+        self.clock_output_ports = 0 # bitmap of output ports to forward midi clock to
+        self.sysex_output_ports = array('b', (_NONE for _ in range(_NR_IN_PORTS))) # output port to stream sysex to per input port
+        if PRINT_CLOCK_JITTER:
+            self.clock_last_time = _NONE
+            self.clock_count = 0
+            self.clock_min_interval = 0
+            self.clock_max_interval = 0
         self.program_change_time = _NONE
         self.ui_trigger = None
-        self._monitor_data = deque((),_MONITOR_BUFFER_LENGTH)
-        self._midi_learn_data = None
+        self.event_time = 0 # arrival time (ticks_us) of the midi message being routed, so timing is relative to the hit, not to processing
+        # monitor ring (2 words per message; oldest dropped if full) and midi learn data (latest only), written to preallocated arrays
+        # so sending to the monitor doesn't allocate memory on the second core
+        self.monitor_ring = array('I', (0 for _ in range(2 * _MONITOR_BUFFER_LENGTH)))
+        self.monitor_head = 0
+        self.monitor_count = 0
+        self.midi_learn_words = array('I', (0, 0))
+        self.midi_learn_waiting = False
         self.last_midi_learn_time = _NONE
         self.midi_ports.load()
 
@@ -118,7 +194,6 @@ class Router():
         _gc_mem_alloc = _gc.mem_alloc
         _gc_collect()
         _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
-        self._all_notes_off()
         _data = _ml.data
         program = self.program
         if bank == _NONE:
@@ -131,6 +206,10 @@ class Router():
         else:
             if not (update_only := self.active_program == program_number):
                 self.active_program = program_number
+        if update_only:
+            self._all_notes_off()
+        else:
+            self.panic(True)
         if self.program_changed:
             program = self.program
         else:
@@ -162,10 +241,50 @@ class Router():
         self.midi_learn = (midi_learn := settings['midi_learn'])
         self.midi_learn_port = (midi_learn_port := settings['midi_learn_port'])
         self.default_output_velocity = settings['default_output_velocity']
+        self.clock_output_ports = (clock_output_ports := settings['clock_output_ports'])
+        self.clock_input_port = _NONE if clock_output_ports == 0 else settings['clock_input_port']
+        sysex_output_ports = self.sysex_output_ports
+        for i, output_port in enumerate(settings['sysex_output_ports']):
+            sysex_output_ports[i] = output_port
+        input_ports = self.midi_ports.input_ports
+        for i, (_, _, message_filter) in enumerate(input_port_mapping):
+            input_ports[i].midi_decoder.set_filter(message_filter)
         triggers_short = TRIGGERS_SHORT
         routes = self.routes
         routes.clear()
+        cc_route_index = self.cc_route_index
+        for i in range(_NR_IN_PORTS << 7):
+            cc_route_index[i] = _NONE
+        cc_routes = self.cc_routes
+        cc_routes.clear()
+        input_channels = self.input_channels
+        for i, (_, channel, _) in enumerate(input_port_mapping):
+            input_channels[i] = channel
+        cc_slots = {}
+        cc_deadbands = []
+        cc_intervals = []
+        choke_targets = {}
+        choke_slots = self.choke_slots
+        choke_slots.clear()
+        choke_members = self.choke_members
+        choke_member_counts = [0] * _CHOKE_GROUPS
         # set up mapping routes
+        mask_time = self.mask_time
+        mask_velocity = self.mask_velocity
+        mask_slots = self.mask_slots
+        mask_slots.clear()
+        for i in range(len(mask_time)):
+            mask_time[i] = 0
+        for trigger_name, input in input_triggers.items():
+            slot = triggers_short.index(trigger_name) * _MAX_ZONES
+            input_channel = _NONE if (input_port := input['port']) == _NONE else input_port_mapping[input_port][1]
+            for zone, input_mapping in enumerate(input['mapping']):
+                mask_time[slot + zone] = input_mapping['mask_time']
+                mask_velocity[slot + zone] = input_mapping['mask_velocity']
+                # zones sharing the same note (told apart by pedal cc) share the mask of the first of them
+                if input_channel != _NONE and input_mapping['mask_time'] != 0 and (note := input_mapping['note']) != _NONE and \
+                    not (key_int := (input_port << 1) + (input_channel << 4) + (note << 8)) in mask_slots:
+                    mask_slots[key_int] = slot + zone
         for routing_item in routing:
             trigger = triggers_short.index(trigger_name := routing_item['trigger'])
             try:
@@ -188,26 +307,72 @@ class Router():
                         note_off = voice_map['note_off']
                     if (channel := voice_map['channel']) != _NONE:
                         output_channel = channel
+                    if 'choke' in (zone_labels := TRIGGERS[trigger][2][1]) and zone != zone_labels.index('choke') and \
+                        output_channel != _NONE:
+                        # output notes to stop when the trigger is choked (any zone other than the choke zone itself)
+                        if not trigger in choke_targets:
+                            choke_targets[trigger] = set()
+                        #      (18)               7      4   3
+                        # 00000000 00000000 00|1111111|1111|111
+                        #                     |   n   |  c | p
+                        #                     |   t   |  h | t
+                        choke_note = input_mapping['note'] if output_note == _NONE else output_note
+                        choke_targets[trigger].add(output_port + (output_channel << 3) + (choke_note << 7))
                     route = {'trigger': trigger, 'zone': zone, 'input_defs': input_mapping, 'output_port': output_port, 'voice': voice // 2,
                              'output_channel': output_channel, 'output_note': output_note, 'note_off': note_off, 'cc_value': 0,
                              'curve': GenCurves(voice_map['min_velocity'], voice_map['max_velocity'], voice_map['curve'], voice_map['threshold'],
-                                                layer['transient'], layer['transient_layer'], layer['scale'])}
-                    #         (18)            7     3   3  1
-                    # 00000000 00000000 00|1111111|111|111|0
-                    #                     |   n   | c | p |
-                    #                     |   t   | h | t |0
-                    key_int = (input_port << 1) + ((input_channel := input_port_mapping[input_port][1]) << 4) + (input_mapping['note'] << 7)
-                    if not key_int in routes:
-                        routes[key_int] = []
-                    routes[key_int].append(route)
-                    if (pedal_cc := input_mapping['pedal_cc']) != _NONE:
-                        #         (18)            7     3   3  1
-                        # 00000000 00000000 00|1111111|111|111|1
-                        #                     |   c   | c | p |
-                        #                     |   c   | h | t |1
-                        if not (key_int := 1 + (input_port << 1) + (input_channel << 4) + (pedal_cc << 7)) in routes:
+                                                layer['transient'], layer['transient_layer'], layer['scale']).to_bytes(), 'choke_slot': _NONE}
+                    if (choke_group := voice_map['choke_group']) != _NONE and output_channel != _NONE:
+                        # an output note can only be a member of one choke group (the first one it's assigned to)
+                        #      (18)               7      4   3
+                        # 00000000 00000000 00|1111111|1111|111
+                        #                     |   n   |  c | p
+                        #                     |   t   |  h | t
+                        choke_note = input_mapping['note'] if output_note == _NONE else output_note
+                        if (member_key := output_port + (output_channel << 3) + (choke_note << 7)) in choke_slots:
+                            route['choke_slot'] = choke_slots[member_key]
+                        elif (bit := choke_member_counts[choke_group]) < _MAX_CHOKE_MEMBERS:
+                            choke_member_counts[choke_group] = bit + 1
+                            choke_members[choke_group * _MAX_CHOKE_MEMBERS + bit] = member_key
+                            choke_slots[member_key] = (choke_slot := (choke_group << 5) + bit)
+                            route['choke_slot'] = choke_slot
+                    # note on routes (only if a note on can match: input channel and note set)
+                    #       (17)              7      4   3  1
+                    # 00000000 00000000 0|1111111|1111|111|0
+                    #                    |   n   |  c | p |
+                    #                    |   t   |  h | t |0
+                    input_channel = input_port_mapping[input_port][1]
+                    if input_channel != _NONE and (input_note := input_mapping['note']) != _NONE:
+                        if not (key_int := (input_port << 1) + (input_channel << 4) + (input_note << 8)) in routes:
                             routes[key_int] = []
                         routes[key_int].append(route)
+                    if (pedal_cc := input_mapping['pedal_cc']) != _NONE:
+                        # routes sending the same cc to the same output port and channel share one slot, using the smallest deadband
+                        # and interval of their voices
+                        route['cc_slot'] = _NONE
+                        if output_channel != _NONE:
+                            #      (18)               7      4   3
+                            # 00000000 00000000 00|1111111|1111|111
+                            #                     |   c   |  c | p
+                            #                     |   c   |  h | t
+                            if (cc_key := output_port + (output_channel << 3) + (pedal_cc << 7)) in cc_slots:
+                                route['cc_slot'] = (slot := cc_slots[cc_key])
+                                cc_deadbands[slot] = min(cc_deadbands[slot], voice_map['cc_deadband'])
+                                cc_intervals[slot] = min(cc_intervals[slot], voice_map['cc_interval'])
+                            else:
+                                route['cc_slot'] = (slot := len(cc_slots))
+                                cc_slots[cc_key] = slot
+                                cc_deadbands.append(voice_map['cc_deadband'])
+                                cc_intervals.append(voice_map['cc_interval'])
+                        # pedal cc routes, grouped per input port and cc number (the input channel is checked when routing)
+                        #  3     7
+                        # 111|1111111
+                        #  p |   c
+                        #  t |   c
+                        if (group := cc_route_index[(cc_index := (input_port << 7) + pedal_cc)]) == _NONE:
+                            cc_route_index[cc_index] = (group := len(cc_routes))
+                            cc_routes.append([])
+                        cc_routes[group].append(route)
                     #          (22)             7     3
                     # 1111111111111111111111|0000000|000
                     #                       |   t   | z
@@ -215,11 +380,38 @@ class Router():
                     if not (key_int := -1 * (zone + 1 + (trigger + 1 << 7))) in routes:
                         routes[key_int] = []
                     routes[key_int].append(route)
+        # set up choke table: a note on for the choke zone's note or polyphonic aftertouch on any other zone's note chokes the trigger
+        choke_table = self.choke_table
+        choke_table.clear()
+        for trigger, targets in choke_targets.items():
+            input = input_triggers[triggers_short[trigger]]
+            input_channel = input_port_mapping[(input_port := input['port'])][1]
+            if input_channel == _NONE:
+                continue
+            choke_entry = (trigger, (choke_zone := TRIGGERS[trigger][2][1].index('choke')), array('i', targets))
+            for zone, input_mapping in enumerate(input['mapping']):
+                if (note := input_mapping['note']) == _NONE:
+                    continue
+                key_int = (input_port << 1) + (input_channel << 4) + (note << 8)
+                choke_table[key_int if zone == choke_zone else key_int + 1] = choke_entry
+        # set up pedal cc forwarding state
+        cc_count = len(cc_slots)
+        self.cc_out_key = (cc_out_key := array('h', (0 for _ in range(cc_count))))
+        for cc_key, slot in cc_slots.items():
+            cc_out_key[slot] = cc_key
+        self.cc_sent = array('b', (_NONE for _ in range(cc_count)))
+        self.cc_pending = array('b', (_NONE for _ in range(cc_count)))
+        self.cc_sent_time = array('i', (0 for _ in range(cc_count)))
+        self.cc_deadband = array('B', cc_deadbands)
+        self.cc_interval = array('H', cc_intervals)
+        self.cc_pending_count = 0
         # set device settings
+        max_polyphony = self.max_polyphony
         for i in range(len(output_mapping) // 2):
             if (_midi_encoder := self.midi_ports.output_ports[i].midi_encoder) != _NONE:
                 device_settings = output_mapping[2 * i + 1]
                 _midi_encoder.set(device_settings['vel_0_note_off'], device_settings['running_status'])
+                max_polyphony[i] = device_settings['max_polyphony']
         # send bank select messages
         bank_select = program['bank_select']
         for i in range(len(bank_select) // 2):
@@ -243,13 +435,13 @@ class Router():
                     # start blocking receiving progrm change events to avoid them back from output device
                     self.program_change_time = time.ticks_ms()
                     _midi_encoder.midi_send(_COMMAND_PROGRAM_CHANGE, channel, value, _NONE)
-        # set up midi learn route (only having the key in the routes collection matters)
-        if midi_learn and midi_learn_port != _NONE:
-            routes[f'l{self.midi_learn_port}'] = []
+        # set up midi learn port bitmask
+        self.midi_learn_ports = 1 << midi_learn_port if midi_learn and midi_learn_port != _NONE else 0
         self.set_trigger()
         _gc_collect()
         _gc_threshold(_gc_mem_free() // 4 + _gc_mem_alloc())
-        _ml.ui.program_change(update_only)
+        if _ml.ui is not None: # None while booting in fast start mode
+            _ml.ui.program_change(update_only)
         self.resume() # resume second thread
 
     def handshake(self):
@@ -262,6 +454,26 @@ class Router():
         while self.running:
             pass
 
+    def panic(self, already_waiting: bool = False) -> None:
+        '''stop all sounding notes on all output ports by sending note off messages for all notes tracked as sounding (not all devices
+        respond to all notes off or all sound off) and then all notes off and all sound off messages to each channel in use (using running
+        status and bypassing the monitor); called by self.update and ui.process_user_input'''
+        if not already_waiting:
+            self.handshake() # request second thread to wait
+        if PRINT_PANIC_TIME:
+            start_time = time.ticks_us()
+        output_ports = self.midi_ports.output_ports
+        for output_port in output_ports:
+            output_port.clear_thru()
+        self._all_notes_off(False)
+        for output_port in output_ports:
+            if (_midi_encoder := output_port.midi_encoder) != _NONE:
+                _midi_encoder.panic()
+        if PRINT_PANIC_TIME:
+            print(f'panic took {time.ticks_diff(time.ticks_us(), start_time)} µs') # type: ignore
+        if not already_waiting:
+            self.resume() # resume second thread
+
     def resume(self):
         '''allow second thread to resume running; called by Page*._save_*_settings, PageTools.initiate_* and PageSettings.process_user_input'''
         with ml.thread_lock:
@@ -276,11 +488,15 @@ class Router():
         _ticks_diff = _time.ticks_diff
         _ticks_ms = _time.ticks_ms
         output_ports = self.midi_ports.output_ports
-        delete_list = []
-        for key_int, time_value in note_off_time_tracker.items():
-            if int(time_value) == _NONE or int(_ticks_diff(_ticks_ms(), time_value)) < 0:
+        expired_notes = ptr32(self.expired_notes)
+        expired_count = 0
+        for key_int in note_off_time_tracker: # iterating over keys only, as .items() would allocate memory
+            if int(time_value := note_off_time_tracker[key_int]) == _NONE or int(_ticks_diff(_ticks_ms(), time_value)) < 0:
                 continue
-            delete_list.append(key_int)
+            if expired_count == _NR_OUT_PORTS * _MAX_POLYPHONY: # full (only possible with max polyphony off): the rest is for the next pass
+                break
+            expired_notes[expired_count] = int(key_int)
+            expired_count += 1
             #      (18)               7      4   3
             # 00000000 00000000 00|1111111|1111|111
             #                     |   n   |  c | p
@@ -290,8 +506,26 @@ class Router():
             channel = tmp & 0b1111
             _midi_encoder = output_ports[port].midi_encoder
             _midi_encoder.note_off(channel, tmp >> 4) # note = tmp >> 4
-        for key_int in delete_list:
-            del note_off_time_tracker[key_int]
+        for i in range(expired_count):
+            del note_off_time_tracker[builtins.int(expired_key := expired_notes[i])]
+            self._release_note(expired_key)
+
+    @micropython.viper
+    def process_cc_pending(self):
+        '''send pedal cc values held back by self._forward_cc once their minimum interval has passed; called by main_loops.py:
+        second_thread'''
+        if int(self.cc_pending_count) == 0:
+            return
+        now = int(time.ticks_ms())
+        cc_pending = self.cc_pending
+        cc_sent_time = self.cc_sent_time
+        cc_interval = self.cc_interval
+        for slot in range(int(len(cc_pending))):
+            if (value := int(cc_pending[slot])) == _NONE or int(time.ticks_diff(now, cc_sent_time[slot])) < int(cc_interval[slot]):
+                continue
+            cc_pending[slot] = _NONE
+            self.cc_pending_count = int(self.cc_pending_count) - 1
+            self._send_cc(slot, value, now)
 
     def process_program_change_break(self) -> None:
         '''set self.program_change_time to _NONE if a blocking time has passed after sending program change message; called
@@ -418,7 +652,8 @@ class Router():
         self.handshake() # request second thread to wait
         voices.append(self._check_name(voices, name))
         voices.append({'channel': _NONE, 'note': _NONE, 'note_off': _NOTE_OFF_OFF, 'threshold': 0, 'curve': 0,
-                       'min_velocity': 0, 'max_velocity': 127})
+                       'min_velocity': 0, 'max_velocity': 127, 'cc_deadband': 0, 'cc_interval': _CC_INTERVAL,
+                       'choke_group': _NONE})
         self._save()
 
     def delete_voice(self, port: int, name: str) -> None:
@@ -448,15 +683,17 @@ class Router():
 
     @micropython.viper
     def route_note_on(self, channel: int, note: int, velocity: int, port: int):
-        '''route note on message to assigned destinations; called by MidiDecoder.read'''
-        #         (18)            7     3   3  1
-        # 00000000 00000000 00|1111111|111|111|0
-        #                         n   | c | p |
-        #                         t   | h | t |0
-        if builtins.int(key_int := (port << 1) + (channel << 4) + (note << 7)) in self.routes:
+        '''route note on message to assigned destinations; called by self.route_events'''
+        #       (17)              7      4   3  1
+        # 00000000 00000000 0|1111111|1111|111|0
+        #                    |   n   |  c | p |
+        #                    |   t   |  h | t |0
+        if builtins.int(key_int := (port << 1) + (channel << 4) + (note << 8)) in self.routes:
+            if velocity != _NONE and builtins.int(key_int) in (mask_slots := self.mask_slots) and \
+                bool(self._suppress_retrigger(int(mask_slots[key_int]), velocity)):
+                return
             default_output_velocity = int(self.default_output_velocity)
             output_ports = self.midi_ports.output_ports
-            _send_to_monitor = self.send_to_monitor
             for route in self.routes[key_int]:
                 if velocity == 0 and int(route['note_off']) == _NOTE_OFF_OFF:
                     break
@@ -476,100 +713,206 @@ class Router():
                         output_channel = int(route['output_channel'])
                         note_off = int(route['note_off'])
                         _midi_encoder = output_ports[output_port].midi_encoder
+                        if (choke_slot := int(route['choke_slot'])) != _NONE:
+                            self._choke_group(choke_slot)
                         if self._set_note_off(output_port, output_channel, output_note, note_off, _midi_encoder):
                             _midi_encoder.note_on(output_channel, output_note, velocity)
-                    _send_to_monitor(_MONITOR_MODE_ROUTING, trigger=route['trigger'], zone=route['zone'],
-                                     output_port=output_port, voice=route['voice'], command=_COMMAND_NOTE_ON)
+                    self.send_to_monitor(_MONITOR_MODE_ROUTING, trigger=route['trigger'], zone=route['zone'],
+                                         output_port=output_port, voice=route['voice'], command=_COMMAND_NOTE_ON)
 
     def trigger_note_on(self, output_port: int, output_channel: int, output_note: int, note_off: int) -> None:
         '''route note on message to assigned destinations; called by main_loops.py: second_thread'''
+        self.event_time = time.ticks_us()
         _midi_encoder = self.midi_ports.output_ports[output_port].midi_encoder
         if self._set_note_off(output_port, output_channel, output_note, note_off, _midi_encoder):
             _midi_encoder.note_on(output_channel, output_note, int(self.default_output_velocity))
 
+    @micropython.viper
+    def route_events(self, events, event_times, event_count: int, port: int):
+        '''route batch of decoded midi messages (packed by MidiDecoder._add_event) and send them to the monitor, setting self.event_time to
+        each message's arrival time; called by MidiDecoder.flush'''
+        choke = bool(self.choke_table)
+        buffer = ptr32(events)
+        times = ptr32(event_times)
+        for i in range(event_count):
+            #             2       8        7       7
+            # 00000000|11|11111111|1111111|1111111
+            #         |dl| status |   d1  |   d2
+            event = buffer[i]
+            self.event_time = times[i]
+            data_length = event >> 22
+            status_byte = (event >> 14) & 0xFF
+            data_1 = (event >> 7) & 0x7F if data_length > 0 else _NONE
+            data_2 = event & 0x7F if data_length == 2 else _NONE
+            if status_byte < 0xF0:
+                command = status_byte & 0xF0
+                channel = status_byte & 0x0F
+                if command == _COMMAND_NOTE_ON and data_2 != 0: # velocity != 0
+                    self.route_note_on(channel, data_1, data_2, port)
+                    if choke:
+                        self.route_choke((port << 1) + (channel << 4) + (data_1 << 8))
+                elif command == _COMMAND_POLY_PRESSURE and data_2 != 0 and choke:
+                    self.route_choke(1 + (port << 1) + (channel << 4) + (data_1 << 8))
+                self.route_midi_thru(channel, command, data_1, data_2, port)
+                self.send_to_monitor(_MONITOR_MODE_MIDI_IN, port, channel + 1, _NONE, _NONE, _NONE, _NONE, command, data_1, data_2)
+            else:
+                self.route_midi_thru(_NONE, status_byte, data_1, data_2, port)
+                self.send_to_monitor(_MONITOR_MODE_MIDI_IN, port, _NONE, _NONE, _NONE, _NONE, _NONE, status_byte, data_1, data_2)
+
+    @micropython.viper
+    def _suppress_retrigger(self, mask_slot: int, velocity: int) -> bool:
+        '''return True (and count and monitor the suppressed hit) if a hit arrives within mask time after the previous hit of the same
+        trigger zone and is softer than mask velocity % of it (comparing arrival times), otherwise remember the hit; called by
+        self.route_note_on'''
+        now = int(self.event_time)
+        last_hit_velocity = self.last_hit_velocity
+        if int(time.ticks_diff(now, self.last_hit_time[mask_slot])) < int(self.mask_time[mask_slot]) * 1000 and \
+            velocity * 100 < int(last_hit_velocity[mask_slot]) * int(self.mask_velocity[mask_slot]):
+            suppressed_count = self.suppressed_count
+            if (count := int(suppressed_count[mask_slot])) < 0xFFFF:
+                suppressed_count[mask_slot] = count + 1
+            self.send_to_monitor(_MONITOR_MODE_ROUTING, trigger=mask_slot // _MAX_ZONES, zone=mask_slot % _MAX_ZONES, data_1=velocity)
+            return True
+        self.last_hit_time[mask_slot] = now
+        last_hit_velocity[mask_slot] = velocity
+        return False
+
+    @micropython.viper
+    def route_choke(self, key_int: int):
+        '''stop all output notes of a trigger straight away when a choke (note on for its choke zone or polyphonic aftertouch for any
+        other zone) is received, using the choke table precompiled by self.update; called by self.route_events'''
+        #       (17)              7      4   3  1
+        # 00000000 00000000 0|1111111|1111|111|1
+        #                    |   n   |  c | p |p
+        #                    |   t   |  h | t |a
+        if not builtins.int(key_int) in (choke_table := self.choke_table):
+            return
+        trigger, zone, targets = choke_table[key_int]
+        output_ports = self.midi_ports.output_ports
+        note_off_time_tracker = self.note_off_time_tracker
+        for i in range(int(len(targets))):
+            #      (18)               7      4   3
+            # 00000000 00000000 00|1111111|1111|111
+            #                     |   n   |  c | p
+            #                     |   t   |  h | t
+            target = int(targets[i])
+            output_ports[target & 0b111].midi_encoder.note_off((target >> 3) & 0b1111, target >> 7) # channel, note
+            if builtins.int(target) in note_off_time_tracker:
+                del note_off_time_tracker[builtins.int(target)]
+                self._release_note(target)
+        self.send_to_monitor(_MONITOR_MODE_ROUTING, trigger=trigger, zone=zone, command=_COMMAND_NOTE_OFF)
+
     @micropython.viper
     def route_midi_thru(self, channel: int, command: int, data_1: int, data_2: int, port: int):
-        '''route any kind of midi message to assigned destinations; called by MidiDecoder.read'''
+        '''route any kind of midi message to assigned destinations; called by self.route_events'''
         # midi thru input port -> midi thru output port
         input_channel = int(self.midi_thru_input_channel)
         if bool(self.midi_thru) and int(self.midi_thru_input_port) == port and (input_channel == _NONE or input_channel == channel):
             output_channel = _NONE if channel == _NONE else int(self.midi_thru_output_channel)
             if output_channel == _NONE:
                 output_channel = channel
-            if type(_midi_encoder := self.midi_ports.output_ports[int(self.midi_thru_output_port)].midi_encoder) != builtins.int:
-                _midi_encoder.midi_send(command, output_channel, data_1, data_2)
-        # route anything else than note on / note off
-        #         (18)            7     3   3  1
-        # 00000000 00000000 00|1111111|111|111|1
-        #                         d   | c | p |
-        #                         1   | h | t |1
-        if builtins.int(key_int := 1 + (port << 1) + (channel << 4) + (data_1 << 7)) in self.routes:
-            output_ports = self.midi_ports.output_ports
-            for route in self.routes[key_int]:
+            self.midi_ports.output_ports[int(self.midi_thru_output_port)].queue_thru(command, output_channel, data_1, data_2)
+        # route pedal cc
+        #  3     7
+        # 111|1111111
+        #  p |   c
+        #  t |   c
+        if command == _COMMAND_CC and channel == int(self.input_channels[port]) and \
+            (group := int(self.cc_route_index[(port << 7) + data_1])) != _NONE:
+            for route in self.cc_routes[group]:
                 output_port = int(route['output_port'])
-                if command == _COMMAND_CC and data_1 == int(route['input_defs']['pedal_cc']):
-                    route['cc_value'] = data_2
-                    output_channel = int(route['output_channel'])
-                    self.send_to_monitor(_MONITOR_MODE_ROUTING, trigger=int(route['trigger']), zone=int(route['zone']),
-                                         output_port=output_port, voice=route['voice'], command=_COMMAND_CC, data_2=data_2)
-                if output_port != _NONE:
-                    output_ports[output_port].midi_encoder.midi_send(command, output_channel, data_1, data_1)
+                route['cc_value'] = data_2
+                self.send_to_monitor(_MONITOR_MODE_ROUTING, trigger=int(route['trigger']), zone=int(route['zone']),
+                                     output_port=output_port, voice=route['voice'], command=_COMMAND_CC, data_2=data_2)
+                if (slot := int(route['cc_slot'])) != _NONE:
+                    self._forward_cc(slot, data_2)
         # midi learn (anything except device/trigger)
         if command == _COMMAND_PROGRAM_CHANGE:
             if int(self.program_change_time) == _NONE:
-                midi_learn_data = self._encode_midi_learn_data(port, channel, _NONE, _NONE, _NONE, data_1, _NONE, _NONE)
                 with ml.thread_lock:
-                    self._midi_learn_data = midi_learn_data
+                    self._set_midi_learn_data(port, channel, _NONE, _NONE, _NONE, data_1, _NONE, _NONE)
 ###### TO BE DOCUMENTED: MIDI LEARN ALSO WORKS ON SELECTED PORT FOR INPUT PAGE, NOT ON MIDI LEARN PORT
-        if int(ml.ui.active_frame) != _FRAME_INPUT and (not bool(self.midi_learn) or f'l{port}' not in self.routes):
+        if ml.ui is None or int(ml.ui.active_frame) != _FRAME_INPUT and not int(self.midi_learn_ports) & 1 << port:
             return
         if command == _COMMAND_NOTE_ON:
-            midi_learn_data = self._encode_midi_learn_data(port, channel, _NONE, _NONE, data_1, _NONE, _NONE, _NONE)
             with ml.thread_lock:
-                self._midi_learn_data = midi_learn_data
+                self._set_midi_learn_data(port, channel, _NONE, _NONE, data_1, _NONE, _NONE, _NONE)
         elif command == _COMMAND_CC:
-            midi_learn_data = self._encode_midi_learn_data(port, channel, _NONE, _NONE, _NONE, _NONE, data_1, data_2)
             with ml.thread_lock:
-                self._midi_learn_data = midi_learn_data
+                self._set_midi_learn_data(port, channel, _NONE, _NONE, _NONE, _NONE, data_1, data_2)
+
+    @micropython.viper
+    def route_clock(self, midi_byte: int):
+        '''forward midi clock, start, continue and stop (system real-time) bytes straight to the midi clock output ports, ahead of waiting
+        midi thru messages (but behind bytes already passed on to the output port's transmitter); called by MidiDecoder.read'''
+        output_ports = self.midi_ports.output_ports
+        ports = int(self.clock_output_ports)
+        port = 0
+        while ports:
+            if ports & 1:
+                output_ports[port].send_real_time(midi_byte)
+            ports >>= 1
+            port += 1
+        if PRINT_CLOCK_JITTER and midi_byte == _SYS_CLOCK:
+            self._measure_clock_jitter()
+
+    def _measure_clock_jitter(self) -> None:
+        '''measure spread of time between forwarded midi clock bytes and print it once every quarter note; called by self.route_clock'''
+        now = time.ticks_us()
+        if (last_time := self.clock_last_time) == _NONE:
+            self.clock_last_time = now
+            return
+        self.clock_last_time = now
+        interval = time.ticks_diff(now, last_time)
+        if (count := self.clock_count) == 0:
+            self.clock_min_interval = interval
+            self.clock_max_interval = interval
+        elif interval < self.clock_min_interval:
+            self.clock_min_interval = interval
+        elif interval > self.clock_max_interval:
+            self.clock_max_interval = interval
+        if (count := count + 1) == _CLOCKS_PER_QUARTER_NOTE:
+            count = 0
+            print(f'clock interval {self.clock_min_interval}-{self.clock_max_interval} µs, jitter ' # type: ignore
+                  f'{self.clock_max_interval - self.clock_min_interval} µs')
+        self.clock_count = count
 
     def send_to_monitor(self, mode: int, input_port: int = _NONE, channel: int = _NONE, trigger: int = _NONE, zone: int = _NONE,
                         output_port: int = _NONE, voice: int = _NONE,
                         command: int = _NONE, data_1: int = _NONE, data_2: int = _NONE) -> None:
         '''set monitor data and midi learn data (router.send_to_monitor > router.monitor_data > ui.process_monitor >
-        PageMonitor.add_to_monitor); called by self.route_note_on, self.route_note_off, self.route_midi_thru, MidiDecoder.read,
+        PageMonitor.add_to_monitor); called by self.route_note_on, self.route_note_off, self.route_midi_thru, self.route_events,
         MidiEncoder.note_on and MidiEncoder.note_off'''
         ###### filtering out system clock and active sensing (TO DO: add filter options setting)
         if command == _SYS_CLOCK or command == _SYS_ACTIVE_SENSING:
             return
-        _thread_lock = ml.thread_lock
-        monitor_data = self._encode_monitor_data(mode, input_port + 1, trigger, zone, channel, output_port, voice, command, data_1, data_2)
-        with _thread_lock:
-            self._monitor_data.append(monitor_data)
-        if self.midi_learn and trigger != _NONE:
-            midi_learn_data = self._encode_midi_learn_data(_NONE, _NONE, trigger, zone, _NONE, _NONE, _NONE, _NONE)
-            with _thread_lock:
-                self._midi_learn_data = midi_learn_data
+        with ml.thread_lock:
+            self._queue_monitor_data(mode, input_port + 1, trigger, zone, channel, output_port, voice, command, data_1, data_2)
+            if self.midi_learn and trigger != _NONE:
+                self._set_midi_learn_data(_NONE, _NONE, trigger, zone, _NONE, _NONE, _NONE, _NONE)
 
     def read_monitor_data(self) -> tuple|None:
         '''return oldest unprocessed monitor data; called by ui.process_monitor'''
-        if len(self._monitor_data) == 0:
+        if self.monitor_count == 0:
             return None
         with ml.thread_lock:
-            monitor_data = self._monitor_data.popleft()
-        return self._decode_monitor_data(monitor_data)
+            monitor_data = self._decode_monitor_data((head := self.monitor_head) << 1)
+            self.monitor_head = (head + 1) % _MONITOR_BUFFER_LENGTH
+            self.monitor_count -= 1
+        return monitor_data
 
     def read_midi_learn_data(self) -> tuple|None:
         '''return unprocessed monitor data if available, otherwise return None; called by main_loops.py: main'''
-        if (_midi_learn_data := self._midi_learn_data) is None:
+        if not self.midi_learn_waiting:
             return None
         now = time.ticks_ms()
         last_time = self.last_midi_learn_time
         if last_time != _NONE and time.ticks_diff(now, last_time) < _MIDI_LEARN_DELAY:
             return None
         self.last_midi_learn_time = now
-        decoded_data = self._decode_midi_learn_data(_midi_learn_data)
         with ml.thread_lock:
-            self._midi_learn_data = None
+            decoded_data = self._decode_midi_learn_data()
+            self.midi_learn_waiting = False
         return decoded_data
 
     def program_options(self, i: int) -> str:
@@ -587,21 +930,50 @@ class Router():
         del self.program
         del self.routes
 
-    def _all_notes_off(self) -> None:
-        '''turn off all notes; called by self.update'''
+    def _all_notes_off(self, to_monitor: bool = True) -> None:
+        '''turn off all notes tracked as sounding, sending the note off messages to the monitor as well if to_monitor is True (not while
+        panicking); called by self.update and self.panic'''
         output_ports = self.midi_ports.output_ports
-        delete_list = []
         for key_int in (note_off_time_tracker := self.note_off_time_tracker):
-            delete_list.append(key_int)
             #      (18)               7      4   3
             # 00000000 00000000 00|1111111|1111|111
             #                     |   n   |  c | p
             #                     |   t   |  h | t
             _midi_encoder = output_ports[key_int & 0b111].midi_encoder
             key_int >>= 3
-            _midi_encoder.note_off(key_int & 0b1111, key_int >> 4) # channel, note
-        for key_int in delete_list:
-            del note_off_time_tracker[key_int]
+            if to_monitor:
+                _midi_encoder.note_off(key_int & 0b1111, key_int >> 4) # channel, note
+            else:
+                _midi_encoder.panic_note_off(key_int & 0b1111, key_int >> 4)
+        note_off_time_tracker.clear()
+        self._reset_note_rings()
+
+    def _reset_note_rings(self) -> None:
+        '''clear output ports' rings of active notes and choke groups' bitmaps of sounding members; called by self._all_notes_off'''
+        self.note_ring_slots.clear()
+        self._reserve_note_dicts()
+        choke_active = self.choke_active
+        for i in range(_CHOKE_GROUPS):
+            choke_active[i] = 0
+        note_ring = self.note_ring
+        for i in range(_NR_OUT_PORTS * _MAX_POLYPHONY):
+            note_ring[i] = _NONE
+        for i in range(_NR_OUT_PORTS):
+            self.active_notes[i] = 0
+            self.note_ring_head[i] = 0
+            self.note_ring_used[i] = 0
+
+    def _reserve_note_dicts(self) -> None:
+        '''grow note off time tracker and note ring slots to hold the maximum number of tracked notes by adding and removing dummy keys (a
+        dict only grows if full and deleted entries are reused), so adding notes doesn't allocate memory on the second core; called by
+        self.__init__ and self._reset_note_rings'''
+        for _dict in (self.note_off_time_tracker, self.note_ring_slots):
+            if len(_dict) > 0:
+                continue
+            for key in range(_NR_OUT_PORTS * _MAX_POLYPHONY):
+                _dict[key] = 0
+            for key in range(_NR_OUT_PORTS * _MAX_POLYPHONY):
+                del _dict[key]
 
     def _check_name(self, in_list: list|tuple, new_name: str, old_name: str = '') -> str:
         '''checks if program name exists and if so adds a number between brackets; called by self.add_voice and self.rename_voice'''
@@ -642,38 +1014,210 @@ class Router():
         note_off_time_tracker = self.note_off_time_tracker
         if builtins.int(key_int := output_port + (output_channel << 3) + (output_note << 7)) in note_off_time_tracker:
             midi_encoder.note_off(output_channel, output_note)
+            del note_off_time_tracker[builtins.int(key_int)]
+            self._release_note(key_int)
             if note_off == _NOTE_OFF_TOGGLE:
-                del note_off_time_tracker[builtins.int(key_int)]
                 return False
+        self._track_note(output_port, key_int)
+        # note off time is relative to the arrival time of the hit (converted to ms), so processing delay doesn't lengthen notes
+        _time = time
+        hit_time = int(_time.ticks_add(_time.ticks_ms(), -(int(_time.ticks_diff(_time.ticks_us(), self.event_time)) // 1000)))
         if note_off == _NOTE_OFF_PULSE:
-            time_value = int(time.ticks_ms())
+            time_value = hit_time
         elif note_off == _NOTE_OFF_TOGGLE:
             time_value = _NONE
         else:
-            _time = time
-            time_value = int(_time.ticks_add(_time.ticks_ms(), note_off + _NOTE_OFF_OFFSET_MS))
+            time_value = int(_time.ticks_add(hit_time, note_off + _NOTE_OFF_OFFSET_MS))
         note_off_time_tracker[key_int] = time_value
         return True
 
     @micropython.viper
-    def _encode_monitor_data(self, mode: int, input_port: int, trigger: int, zone: int, channel: int, output_port: int, voice: int,
-                             command: int, data_1: int, data_2: int):
-        '''returns compressed monitor data tuple; called by self.send_to_monitor'''
+    def _track_note(self, output_port: int, key_int: int):
+        '''add note to the output port's ring of active notes, first stealing the oldest active note if max polyphony is reached (notes
+        aren't tracked if max polyphony is off); called by self._set_note_off'''
+        if (max_polyphony := int(self.max_polyphony[output_port])) == _NONE:
+            return
+        note_ring = self.note_ring
+        note_ring_head = self.note_ring_head
+        note_ring_used = self.note_ring_used
+        active_notes = self.active_notes
+        first_slot = output_port * _MAX_POLYPHONY
+        # steal oldest note(s) if max polyphony is reached
+        while int(active_notes[output_port]) >= max_polyphony:
+            head = int(note_ring_head[output_port])
+            stolen_key = int(note_ring[first_slot + head])
+            note_ring_head[output_port] = (head + 1) % _MAX_POLYPHONY
+            note_ring_used[output_port] = int(note_ring_used[output_port]) - 1
+            if stolen_key == _NONE:
+                continue
+            note_ring[first_slot + head] = _NONE
+            del self.note_ring_slots[builtins.int(stolen_key)]
+            del self.note_off_time_tracker[builtins.int(stolen_key)]
+            if builtins.int(stolen_key) in (choke_slots := self.choke_slots):
+                choke_slot = int(choke_slots[stolen_key])
+                self.choke_active[choke_slot >> 5] = int(self.choke_active[choke_slot >> 5]) & ~(1 << (choke_slot & 0b11111))
+            active_notes[output_port] = int(active_notes[output_port]) - 1
+            #      (18)               7      4   3
+            # 00000000 00000000 00|1111111|1111|111
+            #                     |   n   |  c | p
+            #                     |   t   |  h | t
+            stolen_key >>= 3
+            self.midi_ports.output_ports[output_port].midi_encoder.note_off(stolen_key & 0b1111, stolen_key >> 4) # channel, note
+        # drop released notes from the head of the ring, or compact it if released notes are stuck behind the oldest active one
+        if (used := int(note_ring_used[output_port])) == _MAX_POLYPHONY:
+            head = int(note_ring_head[output_port])
+            while used > 0 and int(note_ring[first_slot + head]) == _NONE:
+                head = (head + 1) % _MAX_POLYPHONY
+                used -= 1
+            if used == _MAX_POLYPHONY:
+                # move active notes towards the head, keeping their order (writing position never overtakes reading position)
+                used = 0
+                note_ring_slots = self.note_ring_slots
+                for i in range(_MAX_POLYPHONY):
+                    if (key := int(note_ring[first_slot + (head + i) % _MAX_POLYPHONY])) != _NONE:
+                        slot = first_slot + (head + used) % _MAX_POLYPHONY
+                        note_ring[slot] = key
+                        note_ring_slots[builtins.int(key)] = slot
+                        used += 1
+                for i in range(used, _MAX_POLYPHONY):
+                    note_ring[first_slot + (head + i) % _MAX_POLYPHONY] = _NONE
+            note_ring_head[output_port] = head
+            note_ring_used[output_port] = used
+        # add note as newest entry
+        slot = first_slot + (int(note_ring_head[output_port]) + int(note_ring_used[output_port])) % _MAX_POLYPHONY
+        note_ring[slot] = key_int
+        self.note_ring_slots[builtins.int(key_int)] = slot
+        note_ring_used[output_port] = int(note_ring_used[output_port]) + 1
+        active_notes[output_port] = int(active_notes[output_port]) + 1
+
+    @micropython.viper
+    def _release_note(self, key_int: int):
+        '''mark note as released in the output port's ring of active notes and its choke group's bitmap of sounding members; called by
+        self.process_timed_note_off_events, self.route_choke, self._choke_group and self._set_note_off'''
+        if builtins.int(key_int) in (choke_slots := self.choke_slots):
+            choke_slot = int(choke_slots[key_int])
+            self.choke_active[choke_slot >> 5] = int(self.choke_active[choke_slot >> 5]) & ~(1 << (choke_slot & 0b11111))
+        if not builtins.int(key_int) in (note_ring_slots := self.note_ring_slots):
+            return
+        self.note_ring[int(note_ring_slots.pop(builtins.int(key_int)))] = _NONE
+        output_port = key_int & 0b111
+        active_notes = self.active_notes
+        active_notes[output_port] = int(active_notes[output_port]) - 1
+
+    @micropython.viper
+    def _choke_group(self, choke_slot: int):
+        '''stop choke group members which might still be sounding (only iterating over the set bits of the group's bitmap) and mark the
+        member about to be played as sounding; called by self.route_note_on'''
+        if PRINT_CHOKE_TIME:
+            start_time = int(time.ticks_us())
+        #           (23)              4     5
+        # 00000000 00000000 0000000|1111|11111
+        #                          |  g | bit
+        group = choke_slot >> 5
+        bit = 1 << (choke_slot & 0b11111)
+        choke_active = self.choke_active
+        if (active := int(choke_active[group]) & ~bit) != 0:
+            choke_members = self.choke_members
+            output_ports = self.midi_ports.output_ports
+            note_off_time_tracker = self.note_off_time_tracker
+            slot = group * _MAX_CHOKE_MEMBERS
+            while active:
+                if active & 1:
+                    #      (18)               7      4   3
+                    # 00000000 00000000 00|1111111|1111|111
+                    #                     |   n   |  c | p
+                    #                     |   t   |  h | t
+                    member_key = int(choke_members[slot])
+                    output_ports[member_key & 0b111].midi_encoder.note_off((member_key >> 3) & 0b1111, member_key >> 7) # channel, note
+                    if builtins.int(member_key) in note_off_time_tracker:
+                        del note_off_time_tracker[builtins.int(member_key)]
+                        self._release_note(member_key)
+                active >>= 1
+                slot += 1
+        choke_active[group] = bit
+        if PRINT_CHOKE_TIME:
+            self._measure_choke_time(int(time.ticks_diff(time.ticks_us(), start_time)))
+
+    def _measure_choke_time(self, choke_time: int) -> None:
+        '''keep track of time taken by self._choke_group and print average and maximum once every 64 chokes; called by
+        self._choke_group'''
+        self.choke_total_time += choke_time
+        self.choke_max_time = max(self.choke_max_time, choke_time)
+        if (choke_count := self.choke_count + 1) < 64:
+            self.choke_count = choke_count
+            return
+        print(f'choke group: average {self.choke_total_time // choke_count} µs, max {self.choke_max_time} µs')
+        self.choke_count = 0
+        self.choke_total_time = 0
+        self.choke_max_time = 0
+
+    @micropython.viper
+    def _forward_cc(self, slot: int, value: int):
+        '''forward pedal cc value to its output port, skipping values within the deadband of the last sent value (except for 0 and 127)
+        and holding back values arriving within the minimum interval after the last sent value (latest value wins); called by
+        self.route_midi_thru'''
+        cc_pending = self.cc_pending
+        sent = int(self.cc_sent[slot])
+        change = value - sent if value > sent else sent - value
+        if change == 0 or (change <= int(self.cc_deadband[slot]) and value != 0 and value != _CC_MAX):
+            if int(cc_pending[slot]) != _NONE:
+                cc_pending[slot] = _NONE
+                self.cc_pending_count = int(self.cc_pending_count) - 1
+            return
+        now = int(time.ticks_ms())
+        if int(time.ticks_diff(now, self.cc_sent_time[slot])) < int(self.cc_interval[slot]):
+            if int(cc_pending[slot]) == _NONE:
+                self.cc_pending_count = int(self.cc_pending_count) + 1
+            cc_pending[slot] = value
+            return
+        if int(cc_pending[slot]) != _NONE:
+            cc_pending[slot] = _NONE
+            self.cc_pending_count = int(self.cc_pending_count) - 1
+        self._send_cc(slot, value, now)
+
+    @micropython.viper
+    def _send_cc(self, slot: int, value: int, now: int):
+        '''send pedal cc value to its output port and store it as last sent value; called by self.process_cc_pending and
+        self._forward_cc'''
+        self.cc_sent[slot] = value
+        self.cc_sent_time[slot] = now
+        #      (18)               7      4   3
+        # 00000000 00000000 00|1111111|1111|111
+        #                     |   c   |  c | p
+        #                     |   c   |  h | t
+        cc_key = int(self.cc_out_key[slot])
+        self.midi_ports.output_ports[cc_key & 0b111].queue_thru(_COMMAND_CC, (cc_key >> 3) & 0b1111, cc_key >> 7, value)
+
+    @micropython.viper
+    def _queue_monitor_data(self, mode: int, input_port: int, trigger: int, zone: int, channel: int, output_port: int, voice: int,
+                            command: int, data_1: int, data_2: int):
+        '''add compressed monitor data to the monitor ring, dropping the oldest message if the ring is full (to be called with thread lock
+        acquired); called by self.send_to_monitor'''
         #    7     3   4      8       5    3  2     (8)       8        8        8
         # 0000000|111|1111|11111111|11111|111|11, 00000000|11111111|11111111|11111111
         #    v   | o | z  |   t    |  c  | i |m           |   d    |   d    |   c
         #    c   | p | n  |   r    |  h  | p |d           |   2    |   1    |   m
-        return mode + (input_port << 2) + (channel + 1 << 5) + (trigger + 1 << 10) + (zone + 1 << 18) + \
-               (output_port + 1 << 22) + (voice + 1 << 25), command + 1 + (data_1 + 1 << 8) + (data_2 + 1 << 16)
+        head = int(self.monitor_head)
+        if (count := int(self.monitor_count)) == _MONITOR_BUFFER_LENGTH:
+            head = (head + 1) % _MONITOR_BUFFER_LENGTH
+            self.monitor_head = head
+            count -= 1
+        ring = ptr32(self.monitor_ring)
+        slot = (head + count) % _MONITOR_BUFFER_LENGTH << 1
+        ring[slot] = mode + (input_port << 2) + (channel + 1 << 5) + (trigger + 1 << 10) + (zone + 1 << 18) + (output_port + 1 << 22) + \
+                     (voice + 1 << 25)
+        ring[slot + 1] = command + 1 + (data_1 + 1 << 8) + (data_2 + 1 << 16)
+        self.monitor_count = count + 1
 
     @micropython.viper
-    def _decode_monitor_data(self, monitor_data):
-        '''returns expanded monitor data tuple based on compressed monitor data tuple; called by self.read_monitor_data'''
+    def _decode_monitor_data(self, slot: int):
+        '''returns expanded monitor data tuple based on compressed monitor data in the monitor ring; called by self.read_monitor_data'''
         #    7     3   4      8       5    3  2     (8)       8        8        8
         # 0000000|111|1111|11111111|11111|111|11, 00000000|11111111|11111111|11111111
         #    v   | o | z  |   t    |  c  | i |m           |   d    |   d    |   c
         #    c   | p | n  |   r    |  h  | p |d           |   2    |   1    |   m
-        mode = (monitor_data_0 := int(monitor_data[0])) & 0b11
+        ring = ptr32(self.monitor_ring)
+        mode = (monitor_data_0 := ring[slot]) & 0b11
         monitor_data_0 >>= 2
         input_port = monitor_data_0 & 0b111
         monitor_data_0 >>= 3
@@ -685,42 +1229,47 @@ class Router():
         monitor_data_0 >>= 4
         output_port = (monitor_data_0 & 0b111) - 1
         monitor_data_0 >>= 3
-        voice = monitor_data_0 - 1
-        command = ((monitor_data_1 := int(monitor_data[1])) & 0b11111111) - 1
+        voice = (monitor_data_0 & 0b1111111) - 1
+        command = ((monitor_data_1 := ring[slot + 1]) & 0b11111111) - 1
         monitor_data_1 >>= 8
         data_1 = (monitor_data_1 & 0b11111111) - 1
         monitor_data_1 >>= 8
-        data_2 = monitor_data_1 - 1
+        data_2 = (monitor_data_1 & 0b11111111) - 1
         return mode, input_port, channel, trigger, zone, output_port, voice, command, data_1, data_2
 
     @micropython.viper
-    def _encode_midi_learn_data(self, port: int, channel: int, trigger: int, zone: int, note: int, program: int, cc: int, cc_value: int):
-        '''returns compressed midi learn data tuple; called by self.route_midi_thru and self.send_to_monitor'''
+    def _set_midi_learn_data(self, port: int, channel: int, trigger: int, zone: int, note: int, program: int, cc: int, cc_value: int):
+        '''store compressed midi learn data, replacing data not read yet (to be called with thread lock acquired); called by
+        self.route_midi_thru and self.send_to_monitor'''
         #   (12)        8      8       5    3      8        8        8        8
         # 000000000000|1111|11111111|11111|111, 11111111|11111111|11111111|11111111
         #             | z  |   t    |  c  | p      c    |   c    |   p    |   n
         #             | n  |   r    |  h  | t      v    |   c    |   r    |   t
-        return (port + 1 + (channel + 1 << 3) + (trigger + 1 << 8) + (zone + 1 << 16),
-                note + 1 + (program + 1 << 8) + (cc + 1 << 16) + (cc_value + 1 << 24))
+        words = ptr32(self.midi_learn_words)
+        words[0] = port + 1 + (channel + 1 << 3) + (trigger + 1 << 8) + (zone + 1 << 16)
+        words[1] = note + 1 + (program + 1 << 8) + (cc + 1 << 16) + (cc_value + 1 << 24)
+        self.midi_learn_waiting = True
 
-    def _decode_midi_learn_data(self, midi_learn_data):
-        '''returns expanded midi learn data tuple based on compressed monitor data tuple; called by ui.process_midi_learn_data'''
+    @micropython.viper
+    def _decode_midi_learn_data(self):
+        '''returns expanded midi learn data tuple based on compressed midi learn data; called by self.read_midi_learn_data'''
         #   (12)        8      8       5    3      8        8        8        8
         # 000000000000|1111|11111111|11111|111, 11111111|11111111|11111111|11111111
         #             | z  |   t    |  c  | p      c    |   c    |   p    |   n
         #             | n  |   r    |  h  | t      v    |   c    |   r    |   t
-        port = ((monitor_data_0 := int(midi_learn_data[0])) & 0b111) - 1
-        monitor_data_0 >>= 3
-        channel = (monitor_data_0 & 0b11111) - 1
-        monitor_data_0 >>= 5
-        trigger = (monitor_data_0 & 0b11111111) - 1
-        monitor_data_0 >>= 8
-        zone = monitor_data_0 - 1
-        note = ((monitor_data_1 := int(midi_learn_data[1])) & 0b11111111) - 1
-        monitor_data_1 >>= 8
-        program = (monitor_data_1 & 0b11111111) - 1
-        monitor_data_1 >>= 8
-        cc = (monitor_data_1 & 0b11111111) - 1
-        monitor_data_1 >>= 8
-        cc_value = monitor_data_1 - 1
+        words = ptr32(self.midi_learn_words)
+        port = ((midi_learn_data_0 := words[0]) & 0b111) - 1
+        midi_learn_data_0 >>= 3
+        channel = (midi_learn_data_0 & 0b11111) - 1
+        midi_learn_data_0 >>= 5
+        trigger = (midi_learn_data_0 & 0b11111111) - 1
+        midi_learn_data_0 >>= 8
+        zone = (midi_learn_data_0 & 0b11111111) - 1
+        note = ((midi_learn_data_1 := words[1]) & 0b11111111) - 1
+        midi_learn_data_1 >>= 8
+        program = (midi_learn_data_1 & 0b11111111) - 1
+        midi_learn_data_1 >>= 8
+        cc = (midi_learn_data_1 & 0b11111111) - 1
+        midi_learn_data_1 >>= 8
+        cc_value = (midi_learn_data_1 & 0b11111111) - 1
         return port, channel, trigger, zone, note, program, cc, cc_value
\ No newline at end of file
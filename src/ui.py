@@ -12,14 +12,17 @@
 
 _INITIAL_FRAME      = const(1) # do not set to 0 (pages tab)
 ENABLE_SCREEN_DUMPS = const(False)
+LAZY_PAGES          = const(True) # set to False to build all pages and pop-ups at boot (to compare boot time and free heap)
 
 from machine import Pin, freq
 import time
+import gc
 
 import main_loops as ml
 from display import Display
 import font
 from constants import DEFAULT_PROGRAM_NAME, TRIGGERS
+from data_types import LazyList
 
 from ui_pages_tabs import PagesTabs
 from ui_page_program import PageProgram
@@ -101,6 +104,11 @@ _POP_UP_MATRIX               = const(7)
 _POP_UP_CHORD                = const(8)
 _POP_UP_ABOUT                = const(9)
 
+# rarely used pages and pop-ups which are unloaded if memory is running low
+_UNLOADABLE_FRAMES           = (_FRAME_TOOLS, _FRAME_SETTINGS)
+_UNLOADABLE_POP_UPS          = (_POP_UP_ABOUT,)
+_LOW_MEMORY                  = const(32_768) # bytes
+
 _CONFIRM_SAVE                = const(0)
 _CONFIRM_REPLACE_PROGRAM     = const(1)
 _TEXT_EDIT                   = const(0)
@@ -109,12 +117,14 @@ _MARGIN                      = const(3)
 _PAGES_W                     = const(16)
 
 _MAX_CHARACTERS              = const(34)
+_MAX_ZONES                   = const(4)
 
 _MONITOR_MODE_MIDI_IN        = const(0)
 _MONITOR_MODE_MIDI_OUT       = const(1)
 _MONITOR_PAGE_ROUTING        = const(0)
 _MONITOR_PAGE_MIDI_IN        = const(1)
 _MONITOR_PAGE_MIDI_OUT       = const(2)
+_MONITOR_ROWS                = const(12) # number of lines visible on a monitor sub-page (PageMonitor._MAX_ROWS)
 
 _COMMAND_NOTE_OFF            = const(0x80)
 _COMMAND_NOTE_ON             = const(0x90)
@@ -159,40 +169,43 @@ _TEXT_SYSTEM_RESET           = 'SR Sys Reset'
 class UI():
     '''user interface class; initiated once by main_loops.py: init'''
 
-    def __init__(self) -> None:
-        self.display = Display(_DISPLAY_SPI, _DISPLAY_BAUTRATE, Pin(_DISPLAY_PIN_DC), Pin(_DISPLAY_PIN_RST),
-                          Pin(_DISPLAY_PIN_BACKLIGHT, mode=Pin.OUT), font)
-        self.encoder_nav = Encoder(_ENCODER_NAV_PIN_A, _ENCODER_NAV_PIN_B, div=4)
-        self.encoder_val = Encoder(_ENCODER_VAL_PIN_A, _ENCODER_VAL_PIN_B, div=4)
-        self.buttons = (buttons := [Button(pin) for pin in _BUTTON_PINS])
+    def __init__(self, display: Display|None = None) -> None:
+        if display is None: # display is only passed on by ui_host.HostUI
+            display = Display(_DISPLAY_SPI, _DISPLAY_BAUTRATE, Pin(_DISPLAY_PIN_DC), Pin(_DISPLAY_PIN_RST),
+                              Pin(_DISPLAY_PIN_BACKLIGHT, mode=Pin.OUT), font)
+        self.display = display
+        ml.boot_time('display')
+        # flag set by encoder and button interrupts and by self.set_user_input_tuple to wake up the main loop
+        self.input_pending = (input_pending := bytearray(1))
+        self.encoder_nav = Encoder(_ENCODER_NAV_PIN_A, _ENCODER_NAV_PIN_B, div=4, input_pending=input_pending)
+        self.encoder_val = Encoder(_ENCODER_VAL_PIN_A, _ENCODER_VAL_PIN_B, div=4, input_pending=input_pending)
+        self.buttons = (buttons := [Button(pin, input_pending=input_pending) for pin in _BUTTON_PINS])
         buttons[_BUTTON_TRIGGER_YES].long_press = True
         buttons[_BUTTON_SEL_OPT].long_press = True
         buttons[_BUTTON_PROGRAM].long_press = True
         self.user_input_tuple = None
         self.page_select_mode = False
         self.trigger_timer = None
-        self.frames = []
         self.active_frame = _INITIAL_FRAME
-        self.frames.append(PagesTabs(_FRAME_PAGE_SELECT, _DISPLAY_W - _PAGES_W, 0, _PAGES_W, _DISPLAY_H, _INITIAL_FRAME))
+        # pages and pop-ups are built on first use (the pages tab and the initial page straight away)
+        self.pop_ups = LazyList((lambda: TextEdit(_POP_UP_TEXT_EDIT), lambda: SelectPopUp(_POP_UP_SELECT), lambda: MenuPopUp(_POP_UP_MENU),
+                                 lambda: ConfirmPopUp(_POP_UP_CONFIRM), lambda: MessagePopUp(_POP_UP_MESSAGE),
+                                 lambda: ProgramPopUp(_POP_UP_PROGRAM), lambda: TriggerPopUp(_POP_UP_TRIGGER),
+                                 lambda: MatrixPopUp(_POP_UP_MATRIX), lambda: ChordPopUp(_POP_UP_CHORD), lambda: AboutPopUp(_POP_UP_ABOUT)))
         x, y, w, h = 0, 0, _DISPLAY_W - _PAGES_W - _MARGIN, _DISPLAY_H
-        self.frames.append(PageProgram(_FRAME_PROGRAM, x, y, w, h, self.active_frame == _FRAME_PROGRAM))
-        self.frames.append(PageMatrix(_FRAME_MATRIX, x, y, w, h, self.active_frame == _FRAME_MATRIX))
-        self.frames.append(PageInput(_FRAME_INPUT, x, y, w, h, self.active_frame == _FRAME_INPUT))
-        self.frames.append(PageOutput(_FRAME_OUTPUT, x, y, w, h, self.active_frame == _FRAME_OUTPUT))
-        self.frames.append(PageTools(_FRAME_TOOLS, x, y, w, h, self.active_frame == _FRAME_TOOLS))
-        self.frames.append(PageMonitor(_FRAME_MONITOR, x, y, w, h, self.active_frame == _FRAME_MONITOR))
-        self.frames.append(PageSettings(_FRAME_SETTINGS, x, y, w, h, self.active_frame == _FRAME_SETTINGS))
-        self.pop_ups = []
-        self.pop_ups.append(TextEdit(_POP_UP_TEXT_EDIT))
-        self.pop_ups.append(SelectPopUp(_POP_UP_SELECT))
-        self.pop_ups.append(MenuPopUp(_POP_UP_MENU))
-        self.pop_ups.append(ConfirmPopUp(_POP_UP_CONFIRM))
-        self.pop_ups.append(MessagePopUp(_POP_UP_MESSAGE))
-        self.pop_ups.append(ProgramPopUp(_POP_UP_PROGRAM))
-        self.pop_ups.append(TriggerPopUp(_POP_UP_TRIGGER))
-        self.pop_ups.append(MatrixPopUp(_POP_UP_MATRIX))
-        self.pop_ups.append(ChordPopUp(_POP_UP_CHORD))
-        self.pop_ups.append(AboutPopUp(_POP_UP_ABOUT))
+        # pages built after the initial data load are built invisible and loaded when PagesTab.set_page makes them visible
+        page = lambda page_class, id: lambda: page_class(id, x, y, w, h, not self.frames.loaded and self.active_frame == id)
+        self.frames = LazyList((lambda: PagesTabs(_FRAME_PAGE_SELECT, _DISPLAY_W - _PAGES_W, 0, _PAGES_W, _DISPLAY_H, _INITIAL_FRAME),
+                                page(PageProgram, _FRAME_PROGRAM), page(PageMatrix, _FRAME_MATRIX), page(PageInput, _FRAME_INPUT),
+                                page(PageOutput, _FRAME_OUTPUT), page(PageTools, _FRAME_TOOLS), page(PageMonitor, _FRAME_MONITOR),
+                                page(PageSettings, _FRAME_SETTINGS)))
+        self.frames[_FRAME_PAGE_SELECT]
+        self.frames[_INITIAL_FRAME]
+        if not LAZY_PAGES:
+            for i in range(len(self.frames)):
+                self.frames[i]
+            for i in range(len(self.pop_ups)):
+                self.pop_ups[i]
         self.active_pop_up = None
         self.sleep = False
         self.sleep_time = time.ticks_ms()
@@ -207,9 +220,26 @@ class UI():
             freq(_LOW_FREQ)
 
     def program_change(self, update_only: bool) -> None:
-        '''update ui after program change; called by router.update'''
-        for frame in self.frames:
+        '''update ui after program change (pages which haven't been built yet are updated once they are built); called by router.update'''
+        for frame in (frames := self.frames):
             frame.program_change(update_only)
+        frames.loaded = True
+
+    def free_memory(self) -> None:
+        '''unload rarely used pages and pop-ups (unless in use) and clear cached label bitmaps if memory is running low, so they are built
+        again on next use; called by self.process_encoder_input before changing page'''
+        if gc.mem_free() >= _LOW_MEMORY:
+            return
+        frames = self.frames
+        for id in _UNLOADABLE_FRAMES:
+            if id != self.active_frame:
+                frames.unload(id)
+        pop_ups = self.pop_ups
+        for id in _UNLOADABLE_POP_UPS:
+            if pop_ups.items[id] is not self.active_pop_up:
+                pop_ups.unload(id)
+        self.display.clear_label_cache()
+        gc.collect()
 
     def set_trigger(self, trigger: int = _NONE, zone: int = _NONE) -> None:
         '''set active trigger (triggered by the trigger button), call router.set_trigger and page.set_trigger; called by
@@ -234,6 +264,7 @@ class UI():
         if value_val != _NONE:
             if self.active_pop_up is None:
                 if self.page_select_mode:
+                    self.free_memory()
                     self.frames[_FRAME_PAGE_SELECT].set_page(value_val)
                     redraw = True
                 else:
@@ -308,7 +339,10 @@ class UI():
                     redraw = True
             else: # button_id == _BUTTON_PROGRAM
                 if value == _BUTTON_EVENT_LONG_PRESS:
-                    self.display.save_screen_dump()
+                    if self.buttons[_BUTTON_TRIGGER_YES].held(): # long-press of program button while holding trigger button
+                        _router.panic()
+                    else:
+                        self.display.save_screen_dump()
                 elif _BUTTON_EVENT_PRESS and _active_pop_up is None: # pop-up not visible, short-press of program button
                     if self.page_select_mode:
                         self.page_select_mode = False
@@ -345,48 +379,45 @@ class UI():
             return False
 
     def process_monitor(self) -> bool:
-        '''process monitor data (router.send_to_monitor > router.monitor_data > ui.process_monitor > PageMonitor.add_to_monitor); called by
-        main_loops.py: main'''
-        _ml = ml
-        _router = _ml.router
-        if (monitor_data := _router.read_monitor_data()) is None:
+        '''process all waiting monitor data in one batch, only formatting lines which end up visible on the active monitor sub-page (if
+        any) (router.send_to_monitor > router.read_monitor_data > ui.process_monitor > PageMonitor.add_to_monitor); called once per frame
+        by main_loops.py: main'''
+        _router = ml.router
+        if _router.monitor_count == 0:
             return False
         self._wake_up()
+        if self.active_frame == _FRAME_MONITOR and (monitor := self.frames[_FRAME_MONITOR]).visible:
+            sub_page = monitor.sub_page
+        else:
+            sub_page = _NONE
+        batch = []
+        while (monitor_data := _router.read_monitor_data()) is not None:
+            if sub_page == _NONE:
+                continue # drain without formatting
+            if sub_page == _MONITOR_PAGE_ROUTING:
+                if monitor_data[3] == _NONE: # trigger
+                    continue
+            elif monitor_data[0] != (_MONITOR_MODE_MIDI_IN if sub_page == _MONITOR_PAGE_MIDI_IN else _MONITOR_MODE_MIDI_OUT):
+                continue
+            batch.append(monitor_data)
+            if len(batch) > _MONITOR_ROWS: # older lines would be overwritten before the next frame is drawn
+                batch.pop(0)
+        if len(batch) == 0:
+            return False
+        redraw = False
+        _add_to_monitor = monitor.add_to_monitor
+        _monitor_text = self._monitor_text
+        for monitor_data in batch:
+            if (text := _monitor_text(sub_page, monitor_data)) != '':
+                redraw |= _add_to_monitor(sub_page, text)
+        return redraw
+
+    def _monitor_text(self, sub_page: int, monitor_data: tuple) -> str:
+        '''return monitor line for monitor sub-page based on monitor data (empty string if there is nothing to show); called by
+        self.process_monitor'''
         mode, input_port, channel, trigger, zone, output_port, voice, command, data_1, data_2 = monitor_data
-        text_routing = ''
-        text_midi_in = ''
-        text_midi_out = ''
-        if trigger != _NONE:
-            _data = _ml.data
-            input_device_text = _data.input_port_mapping[input_port][0]
-            if command == _COMMAND_NOTE_ON:
-                trigger_defs = TRIGGERS[trigger]
-                trigger_text = f'{trigger_defs[0]}{trigger_defs[2][0][zone]}'
-                input = f'{input_device_text} {trigger_text}'
-                output_device_text = _data.output_mapping[2 * output_port]
-                voice_text = _data.output_mapping[2 * output_port + 1]['mapping'][voice * 2][0]
-                output = f'{output_device_text} {voice_text}'
-                l = len(text_routing := f'{input} > {output}')
-                if l > _MAX_CHARACTERS:
-                    d = l - _MAX_CHARACTERS
-                    if (l_input := len(input)) > (l_output := len(output)):
-                        d_out = (d * l_output) // (l - 3)
-                        d_in = d - d_out
-                    else:
-                        d_in = (d * l_input) // (l - 3)
-                        d_out = d - d_in
-                    if d_in > 0:
-                        input_device_text = input_device_text[:(len(input_device_text) - d_in)]
-                    if d_out > 0:
-                        output_device_text = output_device_text[:(len(output_device_text) - d_out)]
-                    text_routing = f'{input_device_text} {trigger_text} > {output_device_text} {voice_text}'    
-            elif command == _COMMAND_CC:
-                text_pedal = f' foot pedal {data_2}'
-                text_routing = f'{input_device_text}{text_pedal}'
-                l = len(text_routing)
-                if l > _MAX_CHARACTERS:
-                    input_device_text = input_device_text[:(_MAX_CHARACTERS - len(text_pedal))]
-                    text_routing = f'{input_device_text}{text_pedal}'
+        if sub_page == _MONITOR_PAGE_ROUTING:
+            return self._monitor_routing_text(input_port, trigger, zone, output_port, voice, command, data_1, data_2)
         if command == _COMMAND_NOTE_OFF:
             data_1_str = '' if data_1 == _NONE else mt.number_to_note(data_1)
             data_2_str = '' if data_2 == _NONE else str(data_2)
@@ -434,27 +465,62 @@ class UI():
             descriptive_str = f'P{input_port} {_TEXT_SYSTEM_RESET}        '
         else:
             descriptive_str = ''
-        if descriptive_str != '':
-            data_1_str = '  ' if data_1 == _NONE else f'{data_1:02X}'
-            data_2_str = '  ' if data_2 == _NONE else f'{data_2:02X}'
-            midi_str = f'[{(command + channel):X} {data_1_str} {data_2_str}]'
-        if mode == _MONITOR_MODE_MIDI_IN and descriptive_str != '':
-            text_midi_in = f'{descriptive_str} {midi_str}' 
-        elif mode == _MONITOR_MODE_MIDI_OUT and descriptive_str != '':
-            text_midi_out = f'{descriptive_str} {midi_str}'
-        redraw = False
-        if text_routing != '':
-            redraw |= self.frames[_FRAME_MONITOR].add_to_monitor(_MONITOR_PAGE_ROUTING, text_routing)
-        if text_midi_in != '':
-            redraw |= self.frames[_FRAME_MONITOR].add_to_monitor(_MONITOR_PAGE_MIDI_IN, text_midi_in)
-        if text_midi_out != '':
-            redraw |= self.frames[_FRAME_MONITOR].add_to_monitor(_MONITOR_PAGE_MIDI_OUT, text_midi_out)
-        return redraw
+        if descriptive_str == '':
+            return ''
+        data_1_str = '  ' if data_1 == _NONE else f'{data_1:02X}'
+        data_2_str = '  ' if data_2 == _NONE else f'{data_2:02X}'
+        return f'{descriptive_str} [{(command + channel):X} {data_1_str} {data_2_str}]'
+
+    def _monitor_routing_text(self, input_port: int, trigger: int, zone: int, output_port: int, voice: int, command: int, data_1: int,
+                              data_2: int) -> str:
+        '''return routing monitor line (empty string if there is nothing to show); called by self._monitor_text'''
+        _data = ml.data
+        text_routing = ''
+        input_device_text = _data.input_port_mapping[input_port][0]
+        if command == _COMMAND_NOTE_ON:
+            trigger_defs = TRIGGERS[trigger]
+            trigger_text = f'{trigger_defs[0]}{trigger_defs[2][0][zone]}'
+            input = f'{input_device_text} {trigger_text}'
+            output_device_text = _data.output_mapping[2 * output_port]
+            voice_text = _data.output_mapping[2 * output_port + 1]['mapping'][voice * 2][0]
+            output = f'{output_device_text} {voice_text}'
+            l = len(text_routing := f'{input} > {output}')
+            if l > _MAX_CHARACTERS:
+                d = l - _MAX_CHARACTERS
+                if (l_input := len(input)) > (l_output := len(output)):
+                    d_out = (d * l_output) // (l - 3)
+                    d_in = d - d_out
+                else:
+                    d_in = (d * l_input) // (l - 3)
+                    d_out = d - d_in
+                if d_in > 0:
+                    input_device_text = input_device_text[:(len(input_device_text) - d_in)]
+                if d_out > 0:
+                    output_device_text = output_device_text[:(len(output_device_text) - d_out)]
+                text_routing = f'{input_device_text} {trigger_text} > {output_device_text} {voice_text}'    
+        elif command == _NONE: # suppressed retrigger
+            trigger_defs = TRIGGERS[trigger]
+            count = ml.router.suppressed_count[trigger * _MAX_ZONES + zone]
+            text_mask = f' {trigger_defs[0]}{trigger_defs[2][0][zone]} masked {data_1} #{count}'
+            text_routing = f'{input_device_text[:(_MAX_CHARACTERS - len(text_mask))]}{text_mask}'
+        elif command == _COMMAND_NOTE_OFF: # choke
+            trigger_defs = TRIGGERS[trigger]
+            text_choke = f' {trigger_defs[0]}{trigger_defs[2][0][zone]} choked'
+            text_routing = f'{input_device_text[:(_MAX_CHARACTERS - len(text_choke))]}{text_choke}'
+        elif command == _COMMAND_CC:
+            text_pedal = f' foot pedal {data_2}'
+            text_routing = f'{input_device_text}{text_pedal}'
+            l = len(text_routing)
+            if l > _MAX_CHARACTERS:
+                input_device_text = input_device_text[:(_MAX_CHARACTERS - len(text_pedal))]
+                text_routing = f'{input_device_text}{text_pedal}'
+        return text_routing
 
     def set_user_input_tuple(self, input_tuple: tuple|None) -> None:
         '''set global user input variable (ui.set_user_input_tuple > ui.user_input_tuple > ui.process_user_input >
         Page/PagesTab.process_user_input); called by Page.callback_input and PagesTab.callback_input'''
         self.user_input_tuple = input_tuple
+        self.input_pending[0] = 1
 
     def save_program(self, and_set_bank: int = _NONE, and_set_program: int = _NONE) -> None:
         '''initiate process to save program and set bank/program afterwards; called by self.process_user_input,
@@ -248,11 +248,10 @@ class TitleBar(Block):
             program += '*'
         page = f'{self.page_number}/{self.number_of_pages}'
         _display = ml.ui.display
-        _display.rect(0, 0, _SUB_PAGE_W, _TITLE_BAR_H, back_color, True) # type: ignore (temporary)
+        # program and page number are drawn on top of the (cached) title bitmap
+        _display.label_box(0, 0, _SUB_PAGE_W, _TITLE_BAR_H, self.title, back_color, fore_color)
         _text = _display.text_box
         _text(_MARGIN, 0, _PROGRAM_NUMBER_W, _TITLE_BAR_H, program, back_color, fore_color, _ALIGN_LEFT)
-        _text(_PROGRAM_NUMBER_W + _MARGIN, 0, _SUB_PAGE_W - 2 * _PROGRAM_NUMBER_W - 2 * _MARGIN, _TITLE_BAR_H, self.title,
-              back_color, fore_color, _ALIGN_CENTRE,)
         _text(_SUB_PAGE_W - _PROGRAM_NUMBER_W - _MARGIN, 0, _PROGRAM_NUMBER_W, _TITLE_BAR_H, page, back_color, fore_color, _ALIGN_RIGHT)
 
 class MatrixCell(Block):
@@ -409,8 +408,7 @@ class ButtonBlock(Block):
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
         else:
-            _rect(x, y, w, _LABEL_H, color_light, True) # type: ignore (temporary)
-            _display.text_box(x, y, w, _LABEL_H, self.label, color_light, color_dark, _ALIGN_CENTRE)
+            _display.label_box(x, y, w, _LABEL_H, self.label, color_light, color_dark)
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
         yy += _BUTTON_MARGIN_Y
@@ -475,8 +473,7 @@ class CheckBoxBlock(Block):
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
         else:
-            _rect(x, y, w, _LABEL_H, color_light, True) # type: ignore (temporary)
-            _text(x, y, w, _LABEL_H, self.label, color_light, color_dark, _ALIGN_CENTRE)
+            _display.label_box(x, y, w, _LABEL_H, self.label, color_light, color_dark)
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
         yy += 1
@@ -576,8 +573,7 @@ class SelectBlock(Block):
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
             yy += 1
         else:
-            _rect(x, y, w, _LABEL_H, color_light, True) # type: ignore (temporary)
-            _text(x, y, w, _LABEL_H, self.label, color_light, color_dark, _ALIGN_CENTRE)
+            _display.label_box(x, y, w, _LABEL_H, self.label, color_light, color_dark)
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
             yy += 1
@@ -692,8 +688,7 @@ class TextBlock(Block):
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
         else:
-            _rect(x, y, w, _LABEL_H, color_light, True) # type: ignore (temporary)
-            _text(x, y, w, _LABEL_H, self.label, color_light, color_dark, _ALIGN_CENTRE)
+            _display.label_box(x, y, w, _LABEL_H, self.label, color_light, color_dark)
             yy = y + _LABEL_H
             _rect(x, yy, w, _VALUE_H, color_dark, True) # type: ignore (temporary)
         yy += 1
@@ -0,0 +1,153 @@
+''' Host user interface library for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Runs the ui on a computer (the unix port of MicroPython, or CPython with the stand-ins of tests/host.py) without hardware: the display
+    is a display_host.HostDisplay and the encoders and buttons are replaced by stand-ins fed by a script, so pages can be driven
+    headlessly and their rendering measured per frame (HostDisplay.frame_log).'''
+
+import main_loops as ml
+import ui as ui_lib
+import font
+from display_host import HostDisplay
+
+_NONE                    = const(-1)
+
+_BUTTON_EVENT_NONE       = const(0)
+_BUTTON_EVENT_PRESS      = const(1)
+_BUTTON_EVENT_LONG_PRESS = const(2)
+
+ENCODER_NAV              = const(0)
+ENCODER_VAL              = const(1)
+
+BUTTON_DEL               = const(0) # NAV encoder button
+BUTTON_SEL_OPT           = const(1) # VAL encoder button
+BUTTON_TRIGGER_YES       = const(2)
+BUTTON_PAGE_NO           = const(3)
+BUTTON_PROGRAM           = const(4)
+
+class ScriptedEncoder():
+    '''stand-in for encoder.Encoder returning the values of scripted turns; initiated by HostUI.__init__'''
+
+    def __init__(self, input_pending) -> None:
+        self.input_pending = input_pending
+        self.max_val = _NONE
+        self.out_val = 0
+        self.pending_val = _NONE
+
+    def set(self, value: int, max_val: int = _NONE) -> None:
+        '''set value and range; called by Page*, PagesTab and PopUp* blocks'''
+        self.out_val = value
+        self.pending_val = _NONE
+        if max_val != _NONE:
+            self.max_val = max_val
+
+    def turn(self, steps: int) -> None:
+        '''turn encoder by steps (negative for counter clockwise), wrapping around like encoder.Encoder does for single steps; called by
+        HostUI.turn'''
+        if self.max_val == _NONE:
+            return
+        self.out_val = (self.out_val + steps) % (self.max_val + 1)
+        self.pending_val = self.out_val
+        self.input_pending[0] = 1
+
+    def value(self) -> int:
+        '''return value after the last turn if not returned yet, otherwise return _NONE; called by ui.process_encoder_input'''
+        value = self.pending_val
+        self.pending_val = _NONE
+        return value
+
+    def close(self) -> None:
+        pass
+
+class ScriptedButton():
+    '''stand-in for button.Button returning scripted presses; initiated by HostUI.__init__'''
+
+    def __init__(self, input_pending) -> None:
+        self.input_pending = input_pending
+        self.event = _BUTTON_EVENT_NONE
+        self.is_held = False
+
+    def press(self, long_press: bool = False) -> None:
+        '''press and release button; called by HostUI.press'''
+        self.event = _BUTTON_EVENT_LONG_PRESS if long_press else _BUTTON_EVENT_PRESS
+        self.input_pending[0] = 1
+
+    def value(self) -> int:
+        '''return event of the last press if not returned yet; called by ui.process_user_input'''
+        event = self.event
+        self.event = _BUTTON_EVENT_NONE
+        return event
+
+    def held(self) -> bool:
+        '''return True if button is held down (set by HostUI.press); called by ui.process_user_input'''
+        return self.is_held
+
+    def close(self) -> None:
+        pass
+
+class HostUI():
+    '''ui.UI drawing to a HostDisplay, driven by scripted encoder turns and button presses; ml.data and ml.router need to be set up
+    (ml.router is updated, which draws the initial page, as main_loops.init does)'''
+
+    def __init__(self, path: str|None = None, image_format: str = 'ppm') -> None:
+        self.display = (display := HostDisplay(font, path, image_format))
+        ml.ui = (_ui := ui_lib.UI(display))
+        self.ui = _ui
+        input_pending = _ui.input_pending
+        for encoder in (_ui.encoder_nav, _ui.encoder_val):
+            encoder.close()
+        _ui.encoder_nav = ScriptedEncoder(input_pending)
+        _ui.encoder_val = ScriptedEncoder(input_pending)
+        for button in _ui.buttons:
+            button.close()
+        _ui.buttons = [ScriptedButton(input_pending) for _ in range(len(_ui.buttons))]
+        ml.router.update(already_waiting=True)
+        display.draw_screen()
+
+    def turn(self, encoder_id: int, steps: int = 1) -> None:
+        '''turn encoder one step at a time, processing each step as the main loop does'''
+        encoder = self.ui.encoder_nav if encoder_id == ENCODER_NAV else self.ui.encoder_val
+        step = 1 if steps > 0 else -1
+        for _ in range(abs(steps)):
+            encoder.turn(step)
+            self.process()
+
+    def press(self, button_id: int, long_press: bool = False, holding: int = _NONE) -> None:
+        '''press button (while holding the button with id holding down) and process it as the main loop does'''
+        buttons = self.ui.buttons
+        if holding != _NONE:
+            buttons[holding].is_held = True
+        buttons[button_id].press(long_press)
+        self.process()
+        if holding != _NONE:
+            buttons[holding].is_held = False
+
+    def process(self) -> bool:
+        '''process waiting input (including user input set by callbacks while processing) and monitor data, drawing the screen if
+        anything changed, as one pass of main_loops.main does; return True if the screen was drawn'''
+        _ui = self.ui
+        input_pending = _ui.input_pending
+        redraw = False
+        while input_pending[0]:
+            input_pending[0] = 0
+            redraw |= _ui.process_encoder_input()
+            redraw |= _ui.process_user_input()
+        redraw |= _ui.process_monitor()
+        if redraw:
+            self.display.draw_screen()
+        return redraw
@@ -15,8 +15,9 @@ _INITIAL_SUB_PAGE = const(0)
 import main_loops as ml
 from data_types import GenOptions
 from ui_pages import Page
-from ui_blocks import TitleBar, SelectBlock, TextBlock, TextRow
-from constants import CHANNEL_OPTIONS, NOTE_OPTIONS, CC_OPTIONS, CC_VALUE_OPTIONS, TRIGGERS, TRIGGERS_SHORT, TRIGGERS_LONG, TEXT_ROWS_INPUT
+from ui_blocks import TitleBar, EmptyRow, SelectBlock, CheckBoxBlock, TextBlock, TextRow
+from constants import CHANNEL_OPTIONS, NOTE_OPTIONS, CC_OPTIONS, CC_VALUE_OPTIONS, MASK_TIME_OPTIONS, MASK_VELOCITY_OPTIONS, TRIGGERS, \
+    TRIGGERS_SHORT, TRIGGERS_LONG, TEXT_ROWS_INPUT
 
 _NONE               = const(-1)
 
@@ -33,9 +34,11 @@ _ALIGN_CENTRE       = const(1)
 
 _ENCODER_NAV        = const(0)
 
-_SUB_PAGES          = const(2)
+_SUB_PAGES          = const(4)
 _SUB_PAGE_PORTS     = const(0)
 _SUB_PAGE_NOTES     = const(1)
+_SUB_PAGE_MASKS     = const(2)
+_SUB_PAGE_FILTERS   = const(3)
 
 _SELECT_SUB_PAGE    = const(-1)
 _PORT_FIRST_DEVICE  = const(0)
@@ -46,6 +49,14 @@ _NOTE_FIRST_NOTE    = const(2)
 _NOTE_FIRST_CC      = const(3)
 _NOTE_FIRST_CC_MIN  = const(4)
 _NOTE_FIRST_CC_MAX  = const(5)
+_MASK_INPUT_TRIGGER = const(0)
+_MASK_FIRST_TIME    = const(1)
+_MASK_FIRST_VEL     = const(2)
+_FILTER_PORT        = const(0)
+_FILTER_FIRST       = const(1)
+_FILTERS            = const(8)
+
+_MASK_VELOCITY      = const(50) # % (default)
 
 _POP_UP_TEXT_EDIT   = const(0)
 _POP_UP_CONFIRM     = const(3)
@@ -59,6 +70,8 @@ class PageInput(Page):
         self.port_settings = [['', _NONE] for _ in range(_NR_IN_PORTS)]
         self.selected_port = 0
         self.map_settings = [[_NONE, _NONE, 0 , 127] for _ in range(_MAX_ZONES)]
+        self.mask_settings = [[0, _MASK_VELOCITY] for _ in range(_MAX_ZONES)]
+        self.filter_port = 0
         self.device_options = GenOptions(_NR_IN_PORTS, func=self._device_options)
         self.page_is_built = False
         self._build_page()
@@ -82,8 +95,12 @@ class PageInput(Page):
                 return True
             if self.sub_page == _SUB_PAGE_PORTS:
                 self.selected_port = (value - _PORT_FIRST_DEVICE) // 2
-            elif value >= _NOTE_FIRST_NOTE: # sub_page == _SUB_PAGE_NOTE
-                ml.router.set_trigger(zone=(value - _NOTE_FIRST_NOTE) // 4)
+            elif self.sub_page == _SUB_PAGE_NOTES:
+                if value >= _NOTE_FIRST_NOTE:
+                    ml.router.set_trigger(zone=(value - _NOTE_FIRST_NOTE) // 4)
+            elif self.sub_page == _SUB_PAGE_MASKS:
+                if value >= _MASK_FIRST_TIME:
+                    ml.router.set_trigger(zone=(value - _MASK_FIRST_TIME) // 2)
             return True
         return False
 
@@ -121,6 +138,26 @@ class PageInput(Page):
                 self.port_settings[row][col] = _NONE if value == _NONE else value - 1 # value == 0 becomes _NONE
             if self._save_port_settings():
                 self._set_port_options()
+        elif self.sub_page == _SUB_PAGE_MASKS:
+            if button_del or button_sel_opt or value_is_none:
+                return False
+            elif id == _MASK_INPUT_TRIGGER:
+                ml.ui.set_trigger(value)
+            else:
+                row, col = divmod(id - _MASK_FIRST_TIME, 2)
+                self.mask_settings[row][col] = value
+                if self._save_mask_settings():
+                    self._set_mask_options()
+        elif self.sub_page == _SUB_PAGE_FILTERS:
+            if button_del or button_sel_opt or value_is_none:
+                return False
+            elif id == _FILTER_PORT:
+                if value == self.filter_port:
+                    return False
+                self.filter_port = value
+                self._set_filter_options()
+            elif self._save_filter_settings(id - _FILTER_FIRST, bool(value)):
+                self._set_filter_options()
         else: # sub_page == _SUB_PAGE_NOTES
             if button_del or button_sel_opt or value_is_none:
                 return False
@@ -141,7 +178,7 @@ class PageInput(Page):
 
     def set_trigger(self) -> None:
         '''set active trigger (triggered by trigger button) at page level; called by ui.set_trigger (also calling router.set_trigger)'''
-        if self.sub_page != _SUB_PAGE_PORTS:
+        if self.sub_page == _SUB_PAGE_NOTES or self.sub_page == _SUB_PAGE_MASKS:
             self._load()
 
 ###### TO BE DOCUMENTED: MIDI LEARN ALSO WORKS ON SELECTED PORT FOR INPUT PAGE, NOT ON MIDI LEARN PORT
@@ -155,6 +192,16 @@ class PageInput(Page):
             if col == 0 or row != port: # device or different input device
                 return False
             value = channel + 1 # _NONE becomes 0
+        elif sub_page == _SUB_PAGE_MASKS:
+            if block != _MASK_INPUT_TRIGGER or trigger == _NONE:
+                return False
+            self.blocks[_MASK_INPUT_TRIGGER].set_value(f'{TRIGGERS_SHORT[trigger]}{TRIGGERS[trigger][2][0][zone]}', False)
+            ml.ui.set_trigger(trigger, zone)
+            return True
+        elif sub_page == _SUB_PAGE_FILTERS:
+            if block != _FILTER_PORT or port == _NONE:
+                return False
+            value = port
         else: # sub_page == _SUB_PAGE_NOTES
             if block == _NOTE_INPUT_TRIGGER:
                 if trigger == _NONE:
@@ -219,6 +266,25 @@ class PageInput(Page):
                                           f'p{i + 1}: device name', callback_func=_callback_input))
                 blocks.append(SelectBlock(_PORT_FIRST_CHANNEL + 2 * i, row, 3, 1, 4, selected_block == _PORT_FIRST_CHANNEL + 2 * i,
                                           'channel', CHANNEL_OPTIONS, default_selection=0, callback_func=_callback_input))
+        elif sub_page == _SUB_PAGE_MASKS:
+            title_bar = TitleBar('input retrigger mask', 3, _SUB_PAGES)
+            blocks.append(SelectBlock(_MASK_INPUT_TRIGGER, 0, 0, 1, 1, selected_block == _MASK_INPUT_TRIGGER, 'input trigger',
+                                      TRIGGERS_LONG, add_line=True, callback_func=_callback_input))
+            empty_blocks.append(EmptyRow(1))
+            for i in range(_MAX_ZONES):
+                blocks.append(SelectBlock(_MASK_FIRST_TIME + 2 * i, i + 2, 0, 1, 2, selected_block == _MASK_FIRST_TIME + 2 * i,
+                                          default_selection=0, callback_func=_callback_input))
+                blocks.append(SelectBlock(_MASK_FIRST_VEL + 2 * i, i + 2, 1, 1, 2, selected_block == _MASK_FIRST_VEL + 2 * i,
+                                          default_selection=_MASK_VELOCITY, callback_func=_callback_input))
+        elif sub_page == _SUB_PAGE_FILTERS:
+            title_bar = TitleBar('input message filters', 4, _SUB_PAGES)
+            blocks.append(SelectBlock(_FILTER_PORT, 0, 0, 1, 1, selected_block == _FILTER_PORT, 'port/device', add_line=True,
+                                      callback_func=_callback_input))
+            for i, label in enumerate(('active sensing', 'clock', 'poly aftertouch', 'chan pressure', 'pitch bend', 'control change',
+                                       'program change', 'system common')):
+                blocks.append(CheckBoxBlock(_FILTER_FIRST + i, i // 2 + 1, i % 2, 1, 2, selected_block == _FILTER_FIRST + i, label,
+                                            callback_func=_callback_input))
+            empty_blocks.append(EmptyRow(5))
         else: # sub_page == _SUB_PAGE_NOTES
             title_bar = TitleBar('input notes/pedal cc', 2, _SUB_PAGES)
             blocks.append(SelectBlock(_NOTE_INPUT_TRIGGER, 0, 0, 1, 1, selected_block == _NOTE_INPUT_TRIGGER, 'input trigger',
@@ -242,6 +308,8 @@ class PageInput(Page):
         redraw &= ml.ui.active_pop_up is None
         self._load_port_options()
         self._load_map_options(False)
+        self._load_mask_options(False)
+        self._set_filter_options(False)
         if redraw:
             self._set_text_row(False)
             self.draw()
@@ -251,6 +319,22 @@ class PageInput(Page):
         selection = self.selected_block[(sub_page := self.sub_page)]
         if sub_page == _SUB_PAGE_PORTS:
             text = TEXT_ROWS_INPUT[_SUB_PAGE_PORTS][selection]
+        elif sub_page == _SUB_PAGE_FILTERS:
+            text = TEXT_ROWS_INPUT[_SUB_PAGE_FILTERS][selection]
+        elif sub_page == _SUB_PAGE_MASKS:
+            if selection == _MASK_INPUT_TRIGGER:
+                text = TEXT_ROWS_INPUT[_SUB_PAGE_MASKS][_MASK_INPUT_TRIGGER]
+            else:
+                row, col = divmod(selection - _MASK_FIRST_TIME, 2)
+                _router = ml.router
+                trigger_short = TRIGGERS_SHORT[_router.input_trigger]
+                if row < len(zone_names := TRIGGERS[_router.input_trigger][2][1]):
+                    if col == 0:
+                        text = f'ignore retriggers of {trigger_short} {zone_names[row]} for'
+                    else:
+                        text = '...if softer than this % of first hit'
+                else:
+                    text = ''
         else: # sub_page == _SUB_PAGE_NOTES
             if selection == _NOTE_INPUT_TRIGGER:
                 text = TEXT_ROWS_INPUT[_SUB_PAGE_NOTES][_NOTE_INPUT_TRIGGER]
@@ -276,7 +360,7 @@ class PageInput(Page):
     def _load_port_options(self) -> None:
         '''load and set values to input blocks on ports sub-page; called by self._load'''
         settings = self.port_settings
-        for port, (name, channel) in enumerate(ml.data.input_port_mapping):
+        for port, (name, channel, _) in enumerate(ml.data.input_port_mapping):
             map = settings[port]
             map[0] = name
             map[1] = channel
@@ -310,6 +394,24 @@ class PageInput(Page):
                 settings[m][3] = 127
         self._set_map_options(redraw)
 
+    def _load_mask_options(self, redraw: bool = True) -> None:
+        '''load and set values to options and values to input blocks on retrigger mask sub-page; called by self._load'''
+        settings = self.mask_settings
+        _ml = ml
+        if len(input_triggers := _ml.data.input_triggers) == 0:
+            zones_count = 0
+        else:
+            triggers = input_triggers[(trigger_short := TRIGGERS_SHORT[_ml.router.input_trigger])]
+            zones_count = len(TRIGGERS[TRIGGERS_SHORT.index(trigger_short)][2][0])
+            for zone, trigger_map in enumerate(triggers['mapping']):
+                map = settings[zone]
+                map[0] = trigger_map['mask_time']
+                map[1] = trigger_map['mask_velocity']
+        for i in range(zones_count, _MAX_ZONES):
+            settings[i][0] = 0
+            settings[i][1] = _MASK_VELOCITY
+        self._set_mask_options(redraw)
+
     def _set_port_options(self) -> None:
         '''set options and values to input blocks on ports sub-page; called by self._load_port_options'''
         if self.sub_page != _SUB_PAGE_PORTS:
@@ -376,6 +478,47 @@ class PageInput(Page):
             else:
                 block.enable(False, False, redraw=redraw)
 
+    def _set_mask_options(self, redraw: bool = True) -> None:
+        '''set options and values to input blocks on retrigger mask sub-page; called by self.process_user_input and
+        self._load_mask_options'''
+        if self.sub_page != _SUB_PAGE_MASKS:
+            return
+        blocks = self.blocks
+        blocks[_MASK_INPUT_TRIGGER].set_options(selection=ml.router.input_trigger, redraw=False)
+        zones_count = len(zone_icons := TRIGGERS[ml.router.input_trigger][2][0])
+        for row, (mask_time, mask_velocity) in enumerate(self.mask_settings):
+            block = blocks[_MASK_FIRST_TIME + 2 * row]
+            if row < zones_count:
+                block.enable(True, redraw=False)
+                if (icon := zone_icons[row]) != '':
+                    icon += ' '
+                block.set_label(f'{icon}mask time', False)
+                block.set_options(MASK_TIME_OPTIONS, mask_time, 0, redraw)
+            else:
+                block.enable(False, False, redraw=redraw)
+            block = blocks[_MASK_FIRST_VEL + 2 * row]
+            if row < zones_count:
+                if mask_time == 0:
+                    block.enable(False, redraw=False)
+                    block.set_label('', False)
+                    block.set_options(redraw=redraw)
+                else:
+                    block.enable(True, redraw=False)
+                    block.set_label('mask velocity', False)
+                    block.set_options(MASK_VELOCITY_OPTIONS, mask_velocity, _MASK_VELOCITY, redraw)
+            else:
+                block.enable(False, False, redraw=redraw)
+
+    def _set_filter_options(self, redraw: bool = True) -> None:
+        '''set options and values to input blocks on message filters sub-page; called by self.process_user_input and self._load'''
+        if self.sub_page != _SUB_PAGE_FILTERS:
+            return
+        blocks = self.blocks
+        blocks[_FILTER_PORT].set_options(self.device_options, (port := self.filter_port), 0, redraw)
+        message_filter = ml.data.input_port_mapping[port][2]
+        for i in range(_FILTERS):
+            blocks[_FILTER_FIRST + i].set_checked(bool(message_filter & 1 << i), redraw=redraw)
+
     def _save_port_settings(self) -> bool:
         '''save values from input blocks on ports sub-page; called by self.process_user_input'''
         _ml = ml
@@ -445,6 +588,53 @@ class PageInput(Page):
             _router.resume() # resume second thread
         return changed
 
+    def _save_mask_settings(self) -> bool:
+        '''save values from input blocks on retrigger mask sub-page; called by self.process_user_input'''
+        _ml = ml
+        _data = _ml.data
+        _router = _ml.router
+        _router.handshake() # request second thread to wait
+        if len(input_triggers := _data.input_triggers) == 0:
+            _router.resume() # resume second thread
+            return False
+        triggers = input_triggers[TRIGGERS_SHORT[_router.input_trigger]]
+        changed = False
+        zones_count = len(TRIGGERS[_router.input_trigger][2][0])
+        for zone, (mask_time, mask_velocity) in enumerate(self.mask_settings):
+            if zone < zones_count:
+                trigger = triggers['mapping'][zone]
+                if trigger['mask_time'] != mask_time:
+                    trigger['mask_time'] = mask_time
+                    changed = True
+                if trigger['mask_velocity'] != mask_velocity:
+                    trigger['mask_velocity'] = mask_velocity
+                    changed = True
+        if changed:
+            _data.save_data_json_file()
+            _router.update(already_waiting=True)
+        else:
+            _router.resume() # resume second thread
+        return changed
+
+    def _save_filter_settings(self, bit: int, checked: bool) -> bool:
+        '''save value from check box on message filters sub-page; called by self.process_user_input'''
+        _ml = ml
+        _data = _ml.data
+        _router = _ml.router
+        _router.handshake() # request second thread to wait
+        map = _data.input_port_mapping[self.filter_port]
+        if checked:
+            message_filter = map[2] | 1 << bit
+        else:
+            message_filter = map[2] & ~(1 << bit)
+        if changed := map[2] != message_filter:
+            map[2] = message_filter
+            _data.save_data_json_file()
+            _router.update(already_waiting=True)
+        else:
+            _router.resume() # resume second thread
+        return changed
+
     def _callback_confirm(self, caller_id: int, confirm: bool) -> None:
         '''callback for confirm pop-up; called (passed on) by self.process_user_input'''
         if not confirm:
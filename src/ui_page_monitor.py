@@ -52,8 +52,7 @@ class PageMonitor(Page):
         super().__init__(id, x, y, w, h, _SUB_PAGES, visible)
         self.sub_page = _INITIAL_SUB_PAGE
         self.block_active = True
-        self.row = 0
-        self.row_length = 0
+        self.row = 0 # row the next line is written to (showing '...')
         self.frame_buffer = None
         self.page_is_built = False
         self._build_page()
@@ -93,33 +92,32 @@ class PageMonitor(Page):
         by ui.process_monitor'''
         if not bool(self.visible) or int(self.sub_page) != type:
             return False
+        # circular view: the new line replaces the '...' marker, which moves to the next row (replacing the oldest line), wrapping around
+        # to the top row at the bottom of the page, so only two rows need to be redrawn (instead of scrolling the whole page)
         _frame_buffer = self.frame_buffer
-        if (row := int(self.row)) == _MAX_ROWS:
-            _frame_buffer.scroll(0, -_ROW_H) # type: ignore
-            _frame_buffer.rect(0, (y := _MAX_ROWS * _ROW_H), int(self.row_length) * _FONT_WIDTH + 1, _ROW_H, _COLOR_DARK, True) # type: ignore (temporary)
-            y -= _ROW_H
-        else:
-            _frame_buffer.rect(0, (y := row * _ROW_H), 3 * _FONT_WIDTH, _ROW_H, _COLOR_DARK, True) # type: ignore (temporary)
-            self.row = row + 1
-        self.row_length = len(text)
         _display = ml.ui.display
-        _get_ch = _display.font.get_ch
-        _FrameBuffer = framebuf.FrameBuffer
-        MONO_HLSB = framebuf.MONO_HLSB
-        frame_buffer = self.frame_buffer
-        _blit = frame_buffer.blit # type: ignore
+        _get_glyph = _display.font.get_glyph
+        _blit = _frame_buffer.blit # type: ignore
         _palette = self._palette
+        _frame_buffer.rect(0, (y := (row := int(self.row)) * _ROW_H), _PAGE_W, _ROW_H, _COLOR_DARK, True) # type: ignore (temporary)
         x = 1
         for char in text:
-            ch_buffer = _FrameBuffer(bytearray(_get_ch(ord(char))), _FONT_WIDTH, _FONT_HEIGHT, MONO_HLSB)
-            _blit(ch_buffer, x, y, _COLOR_DARK, _palette)
+            _blit(_get_glyph(ord(char)), x, y, _COLOR_DARK, _palette)
             x += _FONT_WIDTH
-        ch_buffer = _FrameBuffer(bytearray(_get_ch(_ASCII_DOT)), _FONT_WIDTH, _FONT_HEIGHT, MONO_HLSB)
+        if (next_row := row + 1) > _MAX_ROWS:
+            next_row = 0
+        self.row = next_row
+        _frame_buffer.rect(0, (next_y := next_row * _ROW_H), _PAGE_W, _ROW_H, _COLOR_DARK, True) # type: ignore (temporary)
+        ch_buffer = _get_glyph(_ASCII_DOT)
         x = 1
-        y += _ROW_H
         for _ in range(3):
-            _blit(ch_buffer, x, y, _COLOR_DARK, _palette)
+            _blit(ch_buffer, x, next_y, _COLOR_DARK, _palette)
             x += _FONT_WIDTH
+        if next_row == 0:
+            _display.mark_dirty(0, _TITLE_BAR_H + _TOP_MARGIN + y, _PAGE_W, _ROW_H)
+            _display.mark_dirty(0, _TITLE_BAR_H + _TOP_MARGIN, _PAGE_W, _ROW_H)
+        else:
+            _display.mark_dirty(0, _TITLE_BAR_H + _TOP_MARGIN + y, _PAGE_W, 2 * _ROW_H)
         return True
 
     def _build_page(self) -> None:
@@ -152,8 +150,7 @@ class PageMonitor(Page):
         _display.rect(0, _TITLE_BAR_H, _PAGE_W, _PAGE_H, _COLOR_DARK, True) # type: ignore (temporary)
         frame_buffer = self.frame_buffer
         _blit = frame_buffer.blit # type: ignore
-        _get_ch = _display.font.get_ch
-        ch_buffer = framebuf.FrameBuffer(bytearray(_get_ch(_ASCII_DOT)), _FONT_WIDTH, _FONT_HEIGHT, framebuf.MONO_HLSB)
+        ch_buffer = _display.font.get_glyph(_ASCII_DOT)
         _palette = self._palette
         x = 1
         for _ in range(3):
@@ -15,9 +15,9 @@ _INITIAL_SUB_PAGE = const(0)
 import main_loops as ml
 from data_types import GenOptions
 from ui_pages import Page
-from ui_blocks import TitleBar, EmptyRow, CheckBoxBlock, SelectBlock, TextBlock, TextRow
+from ui_blocks import TitleBar, EmptyRow, EmptyBlock, CheckBoxBlock, SelectBlock, TextBlock, TextRow
 from constants import CONTEXT_MENU_ITEMS, START_OPTION, CHANNEL_OPTIONS, NOTE_OPTIONS, NOTE_OFF_OPTIONS_WO, VELOCITY_OPTIONS, \
-    CURVE_OPTIONS, TEXT_ROWS_OUTPUT
+    CURVE_OPTIONS, POLYPHONY_OPTIONS, CC_DEADBAND_OPTIONS, CC_INTERVAL_OPTIONS, CHOKE_GROUP_OPTIONS, TEXT_ROWS_OUTPUT
 
 _NONE                  = const(-1)
 
@@ -35,6 +35,8 @@ _NOTE_OFF_OFF          = const(-1)
 
 _ADD_NEW_LABEL         = '[add new]'
 
+_CC_INTERVAL           = const(10) # ms
+
 _MAX_LABEL_LENGTH      = const(33)
 
 _ENCODER_NAV           = const(0)
@@ -50,6 +52,7 @@ _DEVICE_DEVICE         = const(0)
 _DEVICE_CHANNEL        = const(1)
 _DEVICE_0_NOTE_OFF     = const(2)
 _DEVICE_RUNNING_STATUS = const(3)
+_DEVICE_MAX_POLYPHONY  = const(4)
 _VOICE_DEVICE          = const(0)
 _VOICE_VOICE           = const(1)
 _VOICE_CHANNEL         = const(2)
@@ -59,6 +62,9 @@ _VOICE_THRESHOLD       = const(5)
 _VOICE_CURVE           = const(6)
 _VOICE_MIN_VELOCITY    = const(7)
 _VOICE_MAX_VELOCITY    = const(8)
+_VOICE_CC_DEADBAND     = const(9)
+_VOICE_CC_INTERVAL     = const(10)
+_VOICE_CHOKE_GROUP     = const(11)
 
 _POP_UP_TEXT_EDIT      = const(0)
 _POP_UP_SELECT         = const(1)
@@ -255,7 +261,9 @@ class PageOutput(Page):
                                         default_selection=True, callback_func=_callback_input))
             blocks.append(CheckBoxBlock(_DEVICE_RUNNING_STATUS, 3, 0, 1, 1, selected_block == _DEVICE_RUNNING_STATUS, 'running status',
                                         default_selection=True, callback_func=_callback_input))
-            empty_blocks.append(EmptyRow(4))
+            blocks.append(SelectBlock(_DEVICE_MAX_POLYPHONY, 4, 0, 1, 2, selected_block == _DEVICE_MAX_POLYPHONY, 'max polyphony',
+                                      POLYPHONY_OPTIONS, default_selection=0, callback_func=_callback_input))
+            empty_blocks.append(EmptyBlock(4, 1, 1, 2))
             empty_blocks.append(EmptyRow(5))
         else: # sub_page == _SUB_PAGE_VOICE
             title_bar = TitleBar('output voice', 3, _SUB_PAGES)
@@ -277,7 +285,12 @@ class PageOutput(Page):
                                       VELOCITY_OPTIONS, default_selection=0, callback_func=_callback_input))
             blocks.append(SelectBlock(_VOICE_MAX_VELOCITY, 4, 1, 1, 2, selected_block == _VOICE_MAX_VELOCITY, 'max velocity',
                                       VELOCITY_OPTIONS, default_selection=127, callback_func=_callback_input))
-            empty_blocks.append(EmptyRow(5))
+            blocks.append(SelectBlock(_VOICE_CC_DEADBAND, 5, 0, 1, 3, selected_block == _VOICE_CC_DEADBAND, 'cc deadband',
+                                      CC_DEADBAND_OPTIONS, default_selection=0, callback_func=_callback_input))
+            blocks.append(SelectBlock(_VOICE_CC_INTERVAL, 5, 1, 1, 3, selected_block == _VOICE_CC_INTERVAL, 'cc interval',
+                                      CC_INTERVAL_OPTIONS, default_selection=_CC_INTERVAL, callback_func=_callback_input))
+            blocks.append(SelectBlock(_VOICE_CHOKE_GROUP, 5, 2, 1, 3, selected_block == _VOICE_CHOKE_GROUP, 'choke group',
+                                      CHOKE_GROUP_OPTIONS, default_selection=0, callback_func=_callback_input))
         text_row = TextRow(_TEXT_ROW_Y, _TEXT_ROW_H, _BACK_COLOR, _FORE_COLOR, _ALIGN_CENTRE)
         return title_bar, blocks, empty_blocks, text_row
 
@@ -341,6 +354,7 @@ class PageOutput(Page):
         blocks[_DEVICE_CHANNEL].set_options(selection=settings['channel'] + 1, redraw=redraw) # _NONE becomes 0
         blocks[_DEVICE_0_NOTE_OFF].set_checked(settings['vel_0_note_off'], redraw=redraw)
         blocks[_DEVICE_RUNNING_STATUS].set_checked(settings['running_status'], redraw=redraw)
+        blocks[_DEVICE_MAX_POLYPHONY].set_options(selection=max(settings['max_polyphony'], 0), redraw=redraw) # _NONE becomes 0
 
     def _set_voice_options(self, redraw: bool = True) -> None:
         '''load and set options and values to input blocks on triggers sub-page; called by self.process_user_input and self._load'''
@@ -358,6 +372,9 @@ class PageOutput(Page):
             curve = 3
             min_velocity = 0
             max_velocity = 127
+            cc_deadband = 0
+            cc_interval = _CC_INTERVAL
+            choke_group = 0
         else:
             mapping = output_mapping[2 * port + 1]['mapping'][2 * voice + 1]
             channel = mapping['channel'] + 1 # _NONE becomes 0
@@ -367,6 +384,9 @@ class PageOutput(Page):
             curve = mapping['curve'] + 3 # -3 becomes 0
             min_velocity = mapping['min_velocity']
             max_velocity = mapping['max_velocity']
+            cc_deadband = mapping['cc_deadband']
+            cc_interval = mapping['cc_interval']
+            choke_group = mapping['choke_group'] + 1 # _NONE becomes 0
         blocks = self.blocks
         blocks[_VOICE_DEVICE].set_options(self.device_options, port, 0, redraw)
         blocks[_VOICE_VOICE].set_options(voices, self.voice_voice, redraw=redraw)
@@ -377,6 +397,9 @@ class PageOutput(Page):
         blocks[_VOICE_CURVE].set_options(selection=curve, redraw=redraw)
         blocks[_VOICE_MIN_VELOCITY].set_options(selection=min_velocity, redraw=redraw)
         blocks[_VOICE_MAX_VELOCITY].set_options(selection=max_velocity, redraw=redraw)
+        blocks[_VOICE_CC_DEADBAND].set_options(selection=cc_deadband, redraw=redraw)
+        blocks[_VOICE_CC_INTERVAL].set_options(selection=cc_interval, redraw=redraw)
+        blocks[_VOICE_CHOKE_GROUP].set_options(selection=choke_group, redraw=redraw)
 
     def _save_port_settings(self) -> None:
         '''save values from input blocks on ports sub-page; called by self.process_user_input'''
@@ -421,6 +444,9 @@ class PageOutput(Page):
         elif id == _DEVICE_RUNNING_STATUS:
             key = 'running_status'
             store_value = bool(value)
+        elif id == _DEVICE_MAX_POLYPHONY:
+            key = 'max_polyphony'
+            store_value = _NONE if value == 0 else value # 0 becomes _NONE
         if device[key] != store_value:
             device[key] = store_value
             changed = True
@@ -463,9 +489,18 @@ class PageOutput(Page):
         elif id == _VOICE_MIN_VELOCITY:
             key = 'min_velocity'
             store_value = value
-        else: # id == _VOICE_MAX_VELOCITY
+        elif id == _VOICE_MAX_VELOCITY:
             key = 'max_velocity'
             store_value = value
+        elif id == _VOICE_CC_DEADBAND:
+            key = 'cc_deadband'
+            store_value = value
+        elif id == _VOICE_CC_INTERVAL:
+            key = 'cc_interval'
+            store_value = value
+        else: # id == _VOICE_CHOKE_GROUP
+            key = 'choke_group'
+            store_value = value - 1 # 0 becomes _NONE
         if voice[key] != store_value:
             voice[key] = store_value
             changed = True
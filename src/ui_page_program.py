@@ -361,7 +361,8 @@ class PageProgram(Page):
         self.mapping_settings = (settings := [[_NONE, _NONE, _NONE, _NOTE_OFF_OFF, _NONE, 0, True] for _ in range(_NR_ROUTING_LAYERS)])
         blocks = self.blocks
         _router = ml.router
-        blocks[_NAME].set_options(GenOptions(100, func=_router.program_options), ml.router.active_program, redraw=False)
+        blocks[_NAME].set_options(GenOptions(100, func=_router.program_options, memoize=True), ml.router.active_program,
+                                  redraw=False)
         trigger_long = TRIGGERS_LONG[(input_trigger := _router.input_trigger)]
         zone_name = TRIGGERS[input_trigger][2][1][(zone := _router.input_zone)]
         text = trigger_long if zone_name == '' else f'{trigger_long}   {zone_name}'
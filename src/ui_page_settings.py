@@ -14,7 +14,7 @@ _INITIAL_SUB_PAGE = const(0)
 
 import main_loops as ml
 from ui_pages import Page
-from ui_blocks import TitleBar, ButtonBlock, CheckBoxBlock, SelectBlock, TextRow
+from ui_blocks import TitleBar, EmptyRow, ButtonBlock, CheckBoxBlock, SelectBlock, TextRow
 from constants import INPUT_PORT_OPTIONS, OUTPUT_PORT_OPTIONS, CHANNEL_OPTIONS, VELOCITY_OPTIONS, TEXT_ROWS_SETTINGS
 
 _NONE                     = const(-1)
@@ -27,8 +27,12 @@ _FORE_COLOR               = const(0xD9CD) # 0xCDD9 light purple grey
 
 _ALIGN_CENTRE             = const(1)
 
-_SUB_PAGES                = const(1)
+_NR_IN_PORTS              = const(6)
+_NR_OUT_PORTS             = const(6)
+
+_SUB_PAGES                = const(2)
 _SUB_PAGE_SETTINGS        = const(0)
+_SUB_PAGE_CLOCK           = const(1)
 
 _SELECT_SUB_PAGE          = const(-1)
 _MIDI_THRU                = const(0)
@@ -43,6 +47,9 @@ _STORE_BACK_UP            = const(8)
 _RESTORE_BACK_UP          = const(9)
 _FACTORY_RESET            = const(10)
 _ABOUT                    = const(11)
+_CLOCK_INPUT_PORT         = const(0)
+_CLOCK_FIRST_OUTPUT_PORT  = const(1)
+_SYSEX_FIRST_INPUT_PORT   = const(7)
 
 _POP_UP_CONFIRM           = const(3)
 _POP_UP_ABOUT             = const(9)
@@ -84,6 +91,8 @@ class PageSettings(Page):
             self._set_sub_page(value)
             self._load()
             return True
+        if self.sub_page == _SUB_PAGE_CLOCK:
+            return self._save_clock_settings(id, value, button_del, button_sel_opt)
         # if self.sub_page == _SUB_PAGE_SETTINGS:
         if button_del:
             return False
@@ -156,6 +165,20 @@ class PageSettings(Page):
         empty_blocks = []
         selected_block = self.selected_block[sub_page]
         _callback_input = self.callback_input
+        if sub_page == _SUB_PAGE_CLOCK:
+            title_bar = TitleBar('clock/sysex', 2, _SUB_PAGES)
+            blocks.append(SelectBlock(_CLOCK_INPUT_PORT, 0, 0, 1, 1, selected_block == _CLOCK_INPUT_PORT, 'clock input port',
+                                      INPUT_PORT_OPTIONS, default_selection=0, callback_func=_callback_input))
+            for i in range(_NR_OUT_PORTS):
+                blocks.append(CheckBoxBlock(_CLOCK_FIRST_OUTPUT_PORT + i, 1, i, 1, _NR_OUT_PORTS,
+                                            selected_block == _CLOCK_FIRST_OUTPUT_PORT + i, f'out {i + 1}', callback_func=_callback_input))
+            for i in range(_NR_IN_PORTS):
+                blocks.append(SelectBlock(_SYSEX_FIRST_INPUT_PORT + i, 2, i, 1, _NR_IN_PORTS, selected_block == _SYSEX_FIRST_INPUT_PORT + i,
+                                          f'in {i + 1}', OUTPUT_PORT_OPTIONS, default_selection=0, callback_func=_callback_input))
+            for i in range(3, 6):
+                empty_blocks.append(EmptyRow(i))
+            text_row = TextRow(_TEXT_ROW_Y, _TEXT_ROW_H, _BACK_COLOR, _FORE_COLOR, _ALIGN_CENTRE)
+            return title_bar, blocks, empty_blocks, text_row
         # if sub_page == _SUB_PAGE_SETTINGS:
         title_bar = TitleBar('settings', 1, _SUB_PAGES)
         blocks.append(CheckBoxBlock(_MIDI_THRU, 0, 0, 1, 1, selected_block == _MIDI_THRU, 'midi thru', callback_func=_callback_input))
@@ -192,14 +215,21 @@ class PageSettings(Page):
 
     def _set_text_row(self, redraw: bool = True) -> None:
         '''draw text row with long description of currently selected block; called by self.encoder and self._load'''
-        self.text_row.set_text(TEXT_ROWS_SETTINGS[self.selected_block[self.sub_page]], redraw) # type: ignore
+        self.text_row.set_text(TEXT_ROWS_SETTINGS[(sub_page := self.sub_page)][self.selected_block[sub_page]], redraw) # type: ignore
 
     def _set_options(self) -> None:
         '''load and set options and values to input blocks; called by self._load'''
-        if self.sub_page != _SUB_PAGE_SETTINGS:
-            return
         settings = ml.data.settings
         blocks = self.blocks
+        if self.sub_page == _SUB_PAGE_CLOCK:
+            blocks[_CLOCK_INPUT_PORT].set_options(selection=settings['clock_input_port'] + 1, redraw=False) # _NONE becomes 0
+            clock_output_ports = settings['clock_output_ports']
+            for i in range(_NR_OUT_PORTS):
+                blocks[_CLOCK_FIRST_OUTPUT_PORT + i].set_checked(bool(clock_output_ports & 1 << i), redraw=False)
+            sysex_output_ports = settings['sysex_output_ports']
+            for i in range(_NR_IN_PORTS):
+                blocks[_SYSEX_FIRST_INPUT_PORT + i].set_options(selection=sysex_output_ports[i] + 1, redraw=False) # _NONE becomes 0
+            return
         blocks[_MIDI_THRU].set_checked((midi_thru := settings['midi_thru']), redraw=False)
         if midi_thru:
             block = blocks[_MIDI_THRU_INPUT_PORT]
@@ -237,6 +267,26 @@ class PageSettings(Page):
             block.set_options((), redraw=False)
         blocks[_DEFAULT_VELOCITY].set_options(selection=settings['default_output_velocity'], redraw=False)
 
+    def _save_clock_settings(self, id: int, value: int, button_del: bool, button_sel_opt: bool) -> bool:
+        '''save values from input blocks on clock/sysex sub-page; called by self.process_user_input'''
+        if button_del or button_sel_opt or value == _NONE:
+            return False
+        _ml = ml
+        _data = _ml.data
+        _router = _ml.router
+        _router.handshake() # request second thread to wait
+        settings = _data.settings
+        if id == _CLOCK_INPUT_PORT:
+            settings['clock_input_port'] = value - 1 # 0 becomes _NONE
+        elif id >= _SYSEX_FIRST_INPUT_PORT:
+            settings['sysex_output_ports'][id - _SYSEX_FIRST_INPUT_PORT] = value - 1 # 0 becomes _NONE
+        else: # clock output port check boxes
+            bit = 1 << id - _CLOCK_FIRST_OUTPUT_PORT
+            settings['clock_output_ports'] = settings['clock_output_ports'] | bit if value else settings['clock_output_ports'] & ~bit
+        _data.save_data_json_file()
+        _router.update(already_waiting=True)
+        return True
+
     def _callback_confirm(self, caller_id: int, confirm: bool) -> None:
         '''callback for confirm pop-up; called (passed on) by self.process_user_input'''
         if not confirm:
@@ -0,0 +1,90 @@
+''' Choke group benchmark for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Prints the time per choke of router.Router._choke_group (iterating over the sounding members of one choke group's bitmap) against
+    scanning all choke group member routes for sounding notes, for 16 groups of 8 members played as random 16th note hi-hat hits (200
+    bpm for one minute). Run with the unix port of MicroPython for numbers which compare to the hardware (viper code runs as plain Python
+    on CPython):
+
+        micropython tests/bench_choke.py'''
+
+import host
+
+from time import ticks_us, ticks_diff
+
+import main_loops as ml
+from test_midi_decoder import Random
+
+_GROUPS         = const(16)
+_MEMBERS        = const(8) # per group
+_HITS           = const(12_800) # 16th notes at 200 bpm for one minute, for all groups
+_MAX_MEMBERS    = const(30) # as _MAX_CHOKE_MEMBERS in router.py
+
+class _Data:
+    input_triggers = {}
+
+def _set_up_router():
+    '''return router.Router with choke groups set up as by router.update and a list of (choke slot, note off time tracker key) per
+    member'''
+    ml.data = _Data()
+    import router
+    ml.router = (_router := router.Router())
+    _router.midi_learn = False
+    members = []
+    for group in range(_GROUPS):
+        for bit in range(_MEMBERS):
+            key = bit % 6 + (group << 3) + (40 + bit << 7) # output port, channel, note
+            _router.choke_members[group * _MAX_MEMBERS + bit] = key
+            _router.choke_slots[key] = (slot := (group << 5) + bit)
+            members.append((slot, key))
+    return _router, members
+
+def bitmap(_router, hits) -> int:
+    '''play hits through router._choke_group and return time taken in µs'''
+    _choke_group = _router._choke_group
+    note_off_time_tracker = _router.note_off_time_tracker
+    start_time = ticks_us()
+    for slot, key in hits:
+        _choke_group(slot)
+        note_off_time_tracker[key] = 0 # sounding until choked
+    return ticks_diff(ticks_us(), start_time)
+
+def scan(_router, members, hits) -> int:
+    '''play hits by scanning all member routes for sounding notes of the same group and return time taken in µs'''
+    note_off_time_tracker = _router.note_off_time_tracker
+    output_ports = _router.midi_ports.output_ports
+    start_time = ticks_us()
+    for slot, key in hits:
+        group = slot >> 5
+        for member_slot, member_key in members:
+            if member_slot >> 5 == group and member_key != key and member_key in note_off_time_tracker:
+                output_ports[member_key & 0b111].midi_encoder.note_off((member_key >> 3) & 0b1111, member_key >> 7)
+                del note_off_time_tracker[member_key]
+        note_off_time_tracker[key] = 0
+    return ticks_diff(ticks_us(), start_time)
+
+def main() -> None:
+    random = Random(1)
+    _router, members = _set_up_router()
+    hits = [members[random.next(len(members))] for _ in range(_HITS)]
+    bitmap_time = bitmap(_router, hits)
+    _router.note_off_time_tracker.clear()
+    scan_time = scan(_router, members, hits)
+    print(f'bitmap: {bitmap_time / _HITS:.2f} µs per choke, scanning {len(members)} member routes: {scan_time / _HITS:.2f} µs per choke')
+
+main()
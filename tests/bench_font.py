@@ -0,0 +1,95 @@
+''' Text rendering benchmark for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Prints characters per second and bytes allocated per character for drawing text the way Display.text_box did before glyph frame
+    buffers were cached (copying each character into a new bytearray wrapped in a new FrameBuffer) and with the cached glyphs of
+    font.get_glyph, both with and without blitting onto a display sized RGB565 frame buffer. Needs the framebuf module, so it only runs
+    with the unix port of MicroPython:
+
+        micropython tests/bench_font.py'''
+
+import host
+
+import gc
+from time import ticks_us, ticks_diff
+
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+_DISPLAY_WIDTH  = const(220)
+_DISPLAY_HEIGHT = const(176)
+_FONT_WIDTH     = const(6)
+_FONT_HEIGHT    = const(8)
+
+_TEXT           = 'monitor: note on 36 vel 100 ch 10 port 1'
+_REPEAT         = const(500)
+
+def copied(font, screen, palette, blit: bool) -> None:
+    '''draw _TEXT the way Display.text_box did before glyphs were cached'''
+    _FrameBuffer = framebuf.FrameBuffer
+    MONO_HLSB = framebuf.MONO_HLSB
+    _get_ch = font.get_ch
+    for _ in range(_REPEAT):
+        x = 0
+        for char in _TEXT:
+            ch_buffer = _FrameBuffer(bytearray(_get_ch(ord(char))), _FONT_WIDTH, _FONT_HEIGHT, MONO_HLSB)
+            if blit:
+                screen.blit(ch_buffer, x, 0, 0, palette)
+            x += _FONT_WIDTH
+
+def cached(font, screen, palette, blit: bool) -> None:
+    '''draw _TEXT the way Display.text_box does with cached glyphs'''
+    _get_glyph = font.get_glyph
+    for _ in range(_REPEAT):
+        x = 0
+        for char in _TEXT:
+            glyph = _get_glyph(ord(char))
+            if blit:
+                screen.blit(glyph, x, 0, 0, palette)
+            x += _FONT_WIDTH
+
+def measure(function, font, screen, palette, blit: bool) -> tuple:
+    '''return characters per second and bytes allocated per character'''
+    function(font, screen, palette, blit) # warm up (builds the glyph cache)
+    gc.collect()
+    gc.disable()
+    allocated = gc.mem_alloc()
+    start_time = ticks_us()
+    function(font, screen, palette, blit)
+    time = ticks_diff(ticks_us(), start_time)
+    allocated = gc.mem_alloc() - allocated
+    gc.enable()
+    chars = _REPEAT * len(_TEXT)
+    return chars * 1_000_000 // max(1, time), allocated / chars
+
+def main() -> None:
+    if framebuf is None or not host.IS_MICROPYTHON:
+        print('bench_font.py needs the framebuf module: run it with the unix port of MicroPython')
+        return
+    import font
+    screen = framebuf.FrameBuffer(bytearray(2 * _DISPLAY_WIDTH * _DISPLAY_HEIGHT), _DISPLAY_WIDTH, _DISPLAY_HEIGHT, framebuf.RGB565)
+    palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+    palette.pixel(1, 0, 0xFFFF)
+    for blit in (False, True):
+        for name, function in (('copied glyphs', copied), ('cached glyphs', cached)):
+            chars_per_second, allocated = measure(function, font, screen, palette, blit)
+            print(f'{name}{" + blit" if blit else ""}: {chars_per_second} chars/s, {allocated:.1f} bytes allocated per char')
+
+main()
@@ -0,0 +1,78 @@
+''' MIDI decoder benchmark for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Prints the number of bytes per second decoded by the table-driven midi decoder (src/midi_decoder.py) and by the per-byte reference
+    decoder it replaced (reference_midi_decoder.py), for a random stream and for a stream of running status note messages, with router
+    stand-ins which do nothing (so only decoding and the calls into the router are measured). Run with the unix port of MicroPython for
+    numbers which compare to the hardware (viper code runs as plain Python on CPython):
+
+        micropython tests/bench_midi_decoder.py'''
+
+import host
+
+from time import ticks_us, ticks_diff
+
+import main_loops as ml
+import midi_decoder
+import reference_midi_decoder
+from test_midi_decoder import random_stream
+
+_STREAM_LENGTH = const(100_000)
+
+class _Router:
+    '''router stand-in for both decoders, doing nothing'''
+
+    clock_input_port = -1
+    sysex_output_ports = [-1] * 6
+
+    def route_events(self, events, event_times, event_count: int, port: int) -> None:
+        pass
+
+    def route_note_on(self, channel: int, note: int, velocity: int, port: int) -> None:
+        pass
+
+    def route_midi_thru(self, channel: int, command: int, data_1: int, data_2: int, port: int) -> None:
+        pass
+
+    def send_to_monitor(self, mode: int, port: int, channel: int, command: int = -1, data_1: int = -1, data_2: int = -1) -> None:
+        pass
+
+def bytes_per_second(decoder, stream) -> int:
+    '''return number of bytes per second decoder reads from stream'''
+    read = decoder.read
+    start_time = ticks_us()
+    for midi_byte in stream:
+        read(midi_byte)
+    if hasattr(decoder, 'flush'):
+        decoder.flush()
+    return len(stream) * 1_000_000 // max(1, ticks_diff(ticks_us(), start_time))
+
+def main() -> None:
+    ml.router = _Router()
+    notes = bytearray(_STREAM_LENGTH)
+    notes[0] = 0x99
+    for i in range(1, _STREAM_LENGTH):
+        notes[i] = 36 + i % 12 if i & 1 else 1 + i % 127
+    for name, stream in (('random stream', random_stream(_STREAM_LENGTH, 1)), ('running status notes', notes)):
+        reference = bytes_per_second(reference_midi_decoder.MIDIDecoder(0), stream)
+        table_driven = bytes_per_second(midi_decoder.MIDIDecoder(0), stream)
+        print(f'{name}: reference decoder {reference} bytes/s, table-driven decoder {table_driven} bytes/s '
+              f'({table_driven / reference:.2f}x)')
+    print('(midi runs at 3125 bytes/s per port)')
+
+main()
@@ -0,0 +1,88 @@
+''' Boot benchmark for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+    Prints the time taken and heap used by building ui.UI (with the first ui.program_change) the way main_loops.init does, with the
+    pages and pop-ups built on first use (ui.LAZY_PAGES) and after building the remaining pages and pop-ups as well, which is what
+    booting with LAZY_PAGES set to False costs. Loads example_presets/data_files, mounted as /data_files. Needs the framebuf module and
+    a mountable file system, so it only runs with the unix port of MicroPython:
+
+        micropython tests/bench_ui_boot.py'''
+
+import host
+
+import gc
+try:
+    import vfs
+except ImportError: # MicroPython before v1.23
+    import os as vfs
+from time import ticks_ms, ticks_diff
+
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+import main_loops as ml
+
+_DATA_FILES_PATH = (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../example_presets/data_files'
+
+def measure(function) -> tuple:
+    '''return time taken by function in ms and bytes of heap it left allocated'''
+    gc.collect()
+    allocated = gc.mem_alloc()
+    start_time = ticks_ms()
+    function()
+    time = ticks_diff(ticks_ms(), start_time)
+    gc.collect()
+    return time, gc.mem_alloc() - allocated
+
+def build_ui() -> None:
+    '''import ui, build ui.UI and do the first program change, as main_loops.init does'''
+    import ui as ui_lib
+    ml.ui = ui_lib.UI()
+    ml.ui.program_change(True)
+
+def build_remaining() -> None:
+    '''build the pages and pop-ups which weren't used yet'''
+    for lazy_list in (ml.ui.frames, ml.ui.pop_ups):
+        for i in range(len(lazy_list)):
+            lazy_list[i]
+
+def main() -> None:
+    if framebuf is None or not host.IS_MICROPYTHON:
+        print('bench_ui_boot.py needs the framebuf module: run it with the unix port of MicroPython')
+        return
+    vfs.mount(vfs.VfsPosix(_DATA_FILES_PATH), '/data_files')
+    from data import Data
+    from router import Router
+    ml.data = Data()
+    ml.data.load_data_json_file()
+    ml.router = Router()
+    ml.router.update(already_waiting=True)
+    lazy_time, lazy_allocated = measure(build_ui)
+    import ui as ui_lib
+    if not ui_lib.LAZY_PAGES:
+        print('set ui.LAZY_PAGES to True to compare lazy with eager building')
+        return
+    remaining_time, remaining_allocated = measure(build_remaining)
+    print(f'lazy pages: {lazy_time} ms, {lazy_allocated} bytes allocated, {gc.mem_free() + remaining_allocated} bytes free')
+    print(f'all pages built: {lazy_time + remaining_time} ms, {lazy_allocated + remaining_allocated} bytes allocated, '
+          f'{gc.mem_free()} bytes free')
+
+main()
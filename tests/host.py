@@ -0,0 +1,356 @@
+''' Host test set-up for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Makes the modules in src importable on a computer: it installs stand-ins for the rp2040 specific modules (machine, rp2) and for
+    main_loops (which would start the hardware), and when running on CPython instead of the unix port of MicroPython also for the
+    micropython and framebuf modules, const and the viper pointer types (so viper code runs as plain Python). Import it before any
+    module from src:
+
+        micropython tests/test_midi_decoder.py     (unix port of MicroPython, runs the decorators as on the hardware)
+        python -m pytest tests                     (CPython)
+        micropython tests/bench_midi_decoder.py    (benchmarks only print meaningful numbers on MicroPython)'''
+
+import sys
+import time
+
+IS_MICROPYTHON = sys.implementation.name == 'micropython'
+
+_TICKS_MAX         = 0x3FFFFFFF
+_TICKS_HALF_PERIOD = 0x20000000
+
+_SRC_PATH = (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src'
+
+class _Module:
+    '''stand-in module object (MicroPython has no types.ModuleType)'''
+
+    def __init__(self, name: str) -> None:
+        self.__name__ = name
+
+class Lock:
+    '''stand-in for the _thread lock in main_loops (tests run on a single thread)'''
+
+    locked = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
+
+    def acquire(self) -> None:
+        pass
+
+    def release(self) -> None:
+        pass
+
+class Pin:
+    '''stand-in for machine.Pin'''
+
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, *_, **__) -> None:
+        self.state = 0
+
+    def init(self, *_, value: int = 0, **__) -> None:
+        self.state = value
+
+    def __call__(self, value: int|None = None) -> int:
+        if value is not None:
+            self.state = value
+        return self.state
+
+    def on(self) -> None:
+        self.state = 1
+
+    def off(self) -> None:
+        self.state = 0
+
+    high = on
+    low = off
+
+    def value(self, value: int|None = None) -> int:
+        return self(value)
+
+    def irq(self, *_, **__) -> None:
+        pass
+
+class UART:
+    '''stand-in for machine.UART: written bytes are collected in self.sent and bytes passed to self.feed can be read back'''
+
+    IRQ_RXIDLE = 4096
+
+    def __init__(self, *_, **__) -> None:
+        self.sent = bytearray()
+        self.received = bytearray()
+
+    def write(self, data) -> int:
+        self.sent.extend(data)
+        return len(data)
+
+    def txdone(self) -> bool:
+        return True
+
+    def feed(self, data) -> None:
+        self.received.extend(data)
+
+    def any(self) -> int:
+        return len(self.received)
+
+    def readinto(self, buffer, length: int) -> int:
+        n = min(length, len(self.received))
+        buffer[:n] = self.received[:n]
+        self.received = self.received[n:]
+        return n
+
+    def irq(self, *_, **__) -> None:
+        pass
+
+    def deinit(self) -> None:
+        pass
+
+class StateMachine:
+    '''stand-in for rp2.StateMachine: bytes put in the tx fifo are collected in self.sent, the rx fifo stays empty'''
+
+    def __init__(self, *_, **__) -> None:
+        self.sent = bytearray()
+
+    def active(self, *_) -> None:
+        pass
+
+    def put(self, value: int, shift: int = 0) -> None:
+        self.sent.append((value >> shift) & 0xFF)
+
+    def get(self, *_) -> int:
+        return 0
+
+    def rx_fifo(self) -> int:
+        return 0
+
+    def tx_fifo(self) -> int:
+        return 0
+
+    def irq(self, *_, **__) -> None:
+        pass
+
+def _asm_pio(**_):
+    return lambda function: None
+
+class FrameBuffer:
+    '''stand-in for framebuf.FrameBuffer (RGB565 and MONO_HLSB only) written in plain Python, for CPython; text draws nothing (the
+    built-in 8x8 font isn't available) and ellipse ignores the quadrant mask'''
+
+    MONO_VLSB = 0
+    RGB565 = 1
+    MONO_HLSB = 3
+
+    def __init__(self, buffer, width: int, height: int, format: int, stride: int|None = None) -> None:
+        if format != FrameBuffer.RGB565 and format != FrameBuffer.MONO_HLSB:
+            raise ValueError('unsupported format')
+        self._buffer = memoryview(buffer)
+        self._width = width
+        self._height = height
+        self._format = format
+        stride = width if stride is None else stride
+        self._stride = stride if format == FrameBuffer.RGB565 else (stride + 7) & ~7
+
+    def pixel(self, x: int, y: int, c: int|None = None):
+        if x < 0 or y < 0 or x >= self._width or y >= self._height:
+            return None if c is None else 0
+        buffer = self._buffer
+        if self._format == FrameBuffer.RGB565:
+            i = 2 * (y * self._stride + x)
+            if c is None:
+                return buffer[i] | buffer[i + 1] << 8
+            buffer[i] = c & 0xFF
+            buffer[i + 1] = c >> 8 & 0xFF
+            return None
+        i = (y * self._stride + x) >> 3
+        bit = 7 - (x & 7)
+        if c is None:
+            return buffer[i] >> bit & 1
+        buffer[i] = buffer[i] | 1 << bit if c & 1 else buffer[i] & ~(1 << bit)
+        return None
+
+    def fill_rect(self, x: int, y: int, w: int, h: int, c: int) -> None:
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self._width)
+        y1 = min(y + h, self._height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if self._format != FrameBuffer.RGB565:
+            for row in range(y0, y1):
+                for column in range(x0, x1):
+                    self.pixel(column, row, c)
+            return
+        line = bytes((c & 0xFF, c >> 8 & 0xFF)) * (x1 - x0)
+        for row in range(y0, y1):
+            i = 2 * (row * self._stride + x0)
+            self._buffer[i:i + len(line)] = line
+
+    def fill(self, c: int) -> None:
+        self.fill_rect(0, 0, self._width, self._height, c)
+
+    def rect(self, x: int, y: int, w: int, h: int, c: int, f: bool = False) -> None:
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.fill_rect(x, y, w, 1, c)
+        self.fill_rect(x, y + h - 1, w, 1, c)
+        self.fill_rect(x, y, 1, h, c)
+        self.fill_rect(x + w - 1, y, 1, h, c)
+
+    def hline(self, x: int, y: int, w: int, c: int) -> None:
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x: int, y: int, h: int, c: int) -> None:
+        self.fill_rect(x, y, 1, h, c)
+
+    def line(self, x0: int, y0: int, x1: int, y1: int, c: int) -> None:
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        error = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                return
+            if 2 * error >= dy:
+                error += dy
+                x0 += sx
+            if 2 * error <= dx:
+                error += dx
+                y0 += sy
+
+    def ellipse(self, x: int, y: int, xr: int, yr: int, c: int, f: bool = False, m: int = 0b1111) -> None:
+        for dy in range(-yr, yr + 1):
+            dx = int(xr * (1 - (dy / yr) ** 2) ** 0.5) if yr else xr
+            if f:
+                self.fill_rect(x - dx, y + dy, 2 * dx + 1, 1, c)
+            else:
+                self.pixel(x - dx, y + dy, c)
+                self.pixel(x + dx, y + dy, c)
+
+    def text(self, s: str, x: int, y: int, c: int = 1) -> None:
+        pass
+
+    def scroll(self, xstep: int, ystep: int) -> None:
+        width = self._width
+        height = self._height
+        pixels = [[self.pixel(x, y) for x in range(width)] for y in range(height)]
+        for y in range(height):
+            for x in range(width):
+                if 0 <= x - xstep < width and 0 <= y - ystep < height:
+                    self.pixel(x, y, pixels[y - ystep][x - xstep])
+
+    def blit(self, source, x: int, y: int, key: int = -1, palette=None) -> None:
+        for row in range(source._height):
+            for column in range(source._width):
+                c = source.pixel(column, row)
+                if palette is not None:
+                    c = palette.pixel(c, 0)
+                if c != key:
+                    self.pixel(x + column, y + row, c)
+
+def _install() -> None:
+    if not IS_MICROPYTHON:
+        import builtins
+        builtins.const = lambda value: value
+        builtins.ptr8 = builtins.ptr16 = builtins.ptr32 = lambda buffer: buffer
+        builtins.uint = int
+        micropython = _Module('micropython')
+        micropython.const = builtins.const
+        micropython.native = micropython.viper = lambda function: function
+        micropython.alloc_emergency_exception_buf = lambda size: None
+        micropython.heap_lock = micropython.heap_unlock = lambda: 0
+        micropython.schedule = lambda function, argument: function(argument)
+        sys.modules['micropython'] = micropython
+        # ticks wrap around like on MicroPython (after 2**30)
+        time.ticks_ms = lambda: int(time.monotonic() * 1_000) & _TICKS_MAX
+        time.ticks_us = lambda: int(time.monotonic() * 1_000_000) & _TICKS_MAX
+        time.ticks_diff = lambda a, b: ((a - b + _TICKS_HALF_PERIOD) & _TICKS_MAX) - _TICKS_HALF_PERIOD
+        time.ticks_add = lambda a, b: (a + b) & _TICKS_MAX
+        time.sleep_ms = lambda ms: time.sleep(ms / 1_000)
+        time.sleep_us = lambda us: time.sleep(us / 1_000_000)
+        import gc
+        gc.threshold = lambda *_: 0
+        gc.mem_free = lambda: 0
+        gc.mem_alloc = lambda: 0
+        framebuf = _Module('framebuf')
+        framebuf.FrameBuffer = FrameBuffer
+        framebuf.MONO_VLSB = FrameBuffer.MONO_VLSB
+        framebuf.RGB565 = FrameBuffer.RGB565
+        framebuf.MONO_HLSB = FrameBuffer.MONO_HLSB
+        sys.modules['framebuf'] = framebuf
+    machine = _Module('machine')
+    machine.Pin = Pin
+    machine.UART = UART
+    machine.SPI = UART
+    machine.freq = lambda *_: 125_000_000
+    sys.modules['machine'] = machine
+    rp2 = _Module('rp2')
+    rp2.asm_pio = _asm_pio
+    rp2.StateMachine = StateMachine
+    rp2.PIO = _Module('PIO')
+    rp2.PIO.SHIFT_RIGHT = 1
+    rp2.PIO.OUT_HIGH = 1
+    rp2.PIO.IRQ_SM0 = 256
+    sys.modules['rp2'] = rp2
+    main_loops = _Module('main_loops')
+    main_loops.thread_lock = Lock()
+    main_loops.router = None
+    main_loops.ui = None
+    main_loops.data = None
+    main_loops.boot_time = lambda phase: None
+    sys.modules['main_loops'] = main_loops
+    if _SRC_PATH not in sys.path:
+        sys.path.insert(0, _SRC_PATH)
+
+_install()
+
+def call_heap_locked(function, *args):
+    '''call function with the heap locked, raising AssertionError if it allocates memory (on CPython the heap can't be locked, so only
+    the unix port of MicroPython proves a function to be allocation free)'''
+    import micropython
+    micropython.heap_lock()
+    try:
+        return function(*args)
+    except MemoryError:
+        raise AssertionError('memory allocated with heap locked')
+    finally:
+        micropython.heap_unlock()
+
+def run(tests: dict) -> None:
+    '''run all functions with a name starting with test_ in the given module globals; called by the test scripts if run as main'''
+    failed = 0
+    for name, test in sorted(tests.items()):
+        if not name.startswith('test_'):
+            continue
+        try:
+            test()
+            print('ok  ', name)
+        except Exception as e:
+            failed += 1
+            print('FAIL', name, repr(e))
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,220 @@
+''' MIDI decoder tests for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Fuzzed conformance of the table-driven midi decoder (src/midi_decoder.py) against the per-byte decoder it replaced
+    (reference_midi_decoder.py), plus the cases in which the new decoder intentionally differs:
+        - a first data byte of 0 (note 0, cc 0) is decoded (the reference decoder took 0 as 'no data byte stored yet')
+        - system common messages cancel running status (the reference decoder kept it, which the midi specification doesn't allow)
+        - data bytes following an undefined system common status byte (0xF4, 0xF5) are ignored'''
+
+import host
+
+import main_loops as ml
+import midi_decoder
+import reference_midi_decoder
+
+_NONE = -1
+
+class Random:
+    '''small deterministic pseudo random number generator (linear congruential), giving the same streams on CPython and MicroPython'''
+
+    def __init__(self, seed: int) -> None:
+        self.state = seed
+
+    def next(self, n: int) -> int:
+        '''return pseudo random integer from 0 to n - 1'''
+        self.state = (self.state * 1_103_515_245 + 12_345) & 0x7FFFFFFF
+        return (self.state >> 8) % n
+
+def random_stream(length: int, seed: int, system_common: bool = False) -> bytearray:
+    '''return stream of random midi bytes: mostly data bytes (1 to 127), with channel voice status bytes, system real-time bytes,
+    sysex start/end and (if system_common is True) system common status bytes mixed in; called by the tests and by
+    bench_midi_decoder.py'''
+    random = Random(seed)
+    stream = bytearray(length)
+    for i in range(length):
+        if (r := random.next(100)) < 15:
+            stream[i] = 0x80 + (random.next(7) << 4) + random.next(16)
+        elif r < 20:
+            stream[i] = (0xF8, 0xFA, 0xFB, 0xFC, 0xFE)[random.next(5)]
+        elif r < 22:
+            stream[i] = (0xF0, 0xF7)[random.next(2)]
+        elif r < 24 and system_common:
+            stream[i] = (0xF1, 0xF2, 0xF3, 0xF6)[random.next(4)]
+        else:
+            stream[i] = 1 + random.next(127)
+    return stream
+
+class NewRouter:
+    '''stand-in for router.Router collecting the events passed on by midi_decoder.MIDIDecoder as (command, channel, data 1, data 2), the
+    way the reference decoder passed them on to router.route_midi_thru'''
+
+    clock_input_port = _NONE
+    sysex_output_ports = [_NONE] * 6
+
+    def __init__(self) -> None:
+        self.received = []
+
+    def route_events(self, events, event_times, event_count: int, port: int) -> None:
+        for i in range(event_count):
+            event = events[i]
+            data_length = event >> 22
+            status_byte = event >> 14 & 0xFF
+            data_1 = event >> 7 & 0x7F if data_length > 0 else _NONE
+            data_2 = event & 0x7F if data_length == 2 else _NONE
+            if status_byte < 0xF0:
+                self.received.append((status_byte & 0xF0, status_byte & 0x0F, data_1, data_2))
+            else:
+                self.received.append((status_byte, _NONE, data_1, data_2))
+
+class ReferenceRouter:
+    '''stand-in for the router interface used by reference_midi_decoder.MIDIDecoder'''
+
+    clock_input_port = _NONE
+
+    def __init__(self) -> None:
+        self.received = []
+
+    def route_note_on(self, *_) -> None:
+        pass
+
+    def route_midi_thru(self, channel: int, command: int, data_1: int, data_2: int, port: int) -> None:
+        self.received.append((command, channel, data_1, data_2))
+
+    def send_to_monitor(self, *_, **__) -> None:
+        pass
+
+def decode(stream) -> list:
+    '''return messages decoded from stream by midi_decoder.MIDIDecoder'''
+    ml.router = (router := NewRouter())
+    decoder = midi_decoder.MIDIDecoder(0)
+    for midi_byte in stream:
+        decoder.read(midi_byte)
+    decoder.flush()
+    return router.received
+
+def decode_reference(stream) -> list:
+    '''return messages decoded from stream by reference_midi_decoder.MIDIDecoder'''
+    ml.router = (router := ReferenceRouter())
+    decoder = reference_midi_decoder.MIDIDecoder(0)
+    for midi_byte in stream:
+        decoder.read(midi_byte)
+    return router.received
+
+def test_fuzzed_conformance() -> None:
+    for seed in range(200):
+        stream = random_stream(500, seed)
+        received = decode(stream)
+        expected = decode_reference(stream)
+        assert received == expected, f'seed {seed}: first difference at message {_first_difference(received, expected)}'
+
+def test_running_status_and_real_time_in_between() -> None:
+    stream = (0x99, 36, 0xF8, 100, 38, 90, 0xFE, 0xB0, 4, 0xFA, 127, 0xC2, 5, 6)
+    assert decode(stream) == decode_reference(stream) == [(0xF8, _NONE, _NONE, _NONE), (0x90, 9, 36, 100), (0x90, 9, 38, 90),
+                                                          (0xFE, _NONE, _NONE, _NONE), (0xFA, _NONE, _NONE, _NONE), (0xB0, 0, 4, 127),
+                                                          (0xC0, 2, 5, _NONE), (0xC0, 2, 6, _NONE)]
+
+def test_sysex_without_output_port_is_dropped() -> None:
+    stream = (0xF0, 0x43, 0x10, 0xF8, 0x7F, 0xF7, 0x90, 40, 1)
+    assert decode(stream) == decode_reference(stream) == [(0xF8, _NONE, _NONE, _NONE), (0x90, 0, 40, 1)]
+
+def test_first_data_byte_zero() -> None:
+    assert decode((0x99, 0, 100, 0xB1, 0, 64)) == [(0x90, 9, 0, 100), (0xB0, 1, 0, 64)]
+
+def test_system_common_cancels_running_status() -> None:
+    assert decode((0xF1, 0x12, 0x34, 0xF2, 1, 2, 3, 0xF6, 5)) == [(0xF1, _NONE, 0x12, _NONE), (0xF2, _NONE, 1, 2),
+                                                                  (0xF6, _NONE, _NONE, _NONE)]
+
+def test_undefined_system_common_ignored() -> None:
+    assert decode((0x90, 36, 100, 0xF4, 38, 100, 0xF5, 1, 0x91, 40, 1)) == [(0x90, 0, 36, 100), (0x90, 1, 40, 1)]
+
+def test_fuzzed_conformance_with_system_common() -> None:
+    # compare only streams in which the reference decoder's handling of system common messages follows the midi specification
+    compared = 0
+    for seed in range(2_000):
+        stream = random_stream(60, seed, True)
+        if _reference_differs(stream):
+            continue
+        assert decode(stream) == decode_reference(stream), f'seed {seed}'
+        compared += 1
+    assert compared > 500
+
+def test_clock_fast_path() -> None:
+    ml.router = (router := NewRouter())
+    router.clock_input_port = 0
+    clock = []
+    router.route_clock = clock.append
+    decoder = midi_decoder.MIDIDecoder(0)
+    for midi_byte in (0xFA, 0xF8, 0xF9, 0x99, 36, 0xF8, 100, 0xFC, 0xFE):
+        decoder.read(midi_byte)
+    decoder.flush()
+    assert clock == [0xFA, 0xF8, 0xF8, 0xFC]
+    assert router.received == [(0xF9, _NONE, _NONE, _NONE), (0x90, 9, 36, 100), (0xFE, _NONE, _NONE, _NONE)]
+
+def test_event_buffer_batches() -> None:
+    ml.router = (router := NewRouter())
+    batches = []
+    route_events = router.route_events
+    router.route_events = lambda events, event_times, event_count, port: (batches.append(event_count),
+                                                                          route_events(events, event_times, event_count, port))
+    decoder = midi_decoder.MIDIDecoder(0)
+    for _ in range(40):
+        decoder.read(0xF8)
+    decoder.flush()
+    assert sum(batches) == 40
+    assert max(batches) == midi_decoder._EVENT_BUFFER_LENGTH
+
+def _reference_differs(stream) -> bool:
+    '''return True if stream holds data bytes following a completed system common message or a system common status byte cutting
+    short an incomplete message (the reference decoder kept its running status and stored first data byte in those cases);
+    called by test_fuzzed_conformance_with_system_common'''
+    system_common = False
+    data_length = 0
+    data_count = 0
+    for midi_byte in stream:
+        if midi_byte >= 0xF8:
+            continue
+        if 0xF1 <= midi_byte <= 0xF6:
+            if data_count > 0:
+                return True
+            system_common = True
+            data_length = (1, 2, 1, 0, 0, 0)[midi_byte - 0xF1]
+            data_count = 0 if data_length > 0 else _NONE # _NONE: message complete
+        elif midi_byte >= 0xF0: # sysex start/end: keeps an incomplete channel message's data byte count
+            system_common = False
+            data_length = 0
+        elif midi_byte >= 0x80:
+            system_common = False
+            data_length = 1 if midi_byte >= 0xC0 and midi_byte <= 0xDF else 2
+            data_count = 0
+        elif system_common:
+            if data_count == _NONE:
+                return True
+            data_count = data_count + 1 if data_count + 1 < data_length else _NONE
+        elif data_length > 0:
+            data_count = (data_count + 1) % data_length
+    return False
+
+def _first_difference(received: list, expected: list) -> int:
+    for i in range(min(len(received), len(expected))):
+        if received[i] != expected[i]:
+            return i
+    return min(len(received), len(expected))
+
+if __name__ == '__main__':
+    host.run(globals())
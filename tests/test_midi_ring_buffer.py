@@ -0,0 +1,143 @@
+''' Ring buffer and input port tests for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Drives midi_ring_buffer.RingBuffer through midi_ring_buffer.LoopbackBackend and checks the input port wiring and the output ports'
+    sysex handling in midi_ports.py.'''
+
+import host
+
+import main_loops as ml
+from midi_decoder import MIDIDecoder
+from midi_ring_buffer import RingBuffer, LoopbackBackend
+import midi_ports
+
+_NONE          = -1
+
+_RING_CAPACITY = 63 # _RING_LENGTH - 1 (one position is kept free to tell full from empty)
+
+class _Router:
+    '''stand-in for router.Router collecting the events passed on by the midi decoders as (port, status byte, data 1, data 2)'''
+
+    clock_input_port = -1
+    sysex_output_ports = [-1] * 6
+
+    def __init__(self) -> None:
+        self.received = []
+
+    def route_events(self, events, event_times, event_count: int, port: int) -> None:
+        for i in range(event_count):
+            event = events[i]
+            self.received.append((port, event >> 14 & 0xFF, event >> 7 & 0x7F, event & 0x7F))
+
+def _loopback(id: int = 2):
+    ml.router = _Router()
+    rx_pending = bytearray(6)
+    backend = LoopbackBackend()
+    ring_buffer = RingBuffer(backend, rx_pending, id)
+    backend.set_irq(ring_buffer.irq)
+    return backend, ring_buffer, rx_pending, MIDIDecoder(id)
+
+def test_pending_flag_and_decoding() -> None:
+    backend, ring_buffer, rx_pending, midi_decoder = _loopback()
+    assert rx_pending[2] == 0
+    backend.write(bytes((0x99, 36, 100, 38, 90))) # running status
+    assert rx_pending[2] == 1
+    assert ml.router.received == []
+    ring_buffer.process(midi_decoder)
+    assert ml.router.received == [(2, 0x99, 36, 100), (2, 0x99, 38, 90)]
+    ring_buffer.process(midi_decoder) # nothing waiting
+    assert len(ml.router.received) == 2
+
+def test_arrival_times() -> None:
+    backend, ring_buffer, _, midi_decoder = _loopback()
+    times = []
+    ml.router.route_events = lambda events, event_times, event_count, port: times.extend(event_times[:event_count])
+    backend.write(bytes((0x99, 36, 100)))
+    backend.write(bytes((0x99, 38, 100)))
+    ring_buffer.process(midi_decoder)
+    assert len(times) == 2
+    assert times[0] != 0 and times[1] >= times[0]
+
+def test_overflow_drops_newest_bytes() -> None:
+    backend, ring_buffer, _, midi_decoder = _loopback()
+    backend.write(bytes([0x99] + [36, 100] * 50))
+    assert ring_buffer.dropped == 101 - _RING_CAPACITY
+    ring_buffer.process(midi_decoder)
+    assert len(ml.router.received) == (_RING_CAPACITY - 1) // 2
+    backend.write(bytes((38, 90))) # room again
+    ring_buffer.process(midi_decoder)
+    assert ml.router.received[-1] == (2, 0x99, 38, 90)
+
+def test_wrap_around() -> None:
+    backend, ring_buffer, _, midi_decoder = _loopback()
+    for i in range(1_000):
+        backend.write(bytes((0x99, i & 0x7F, 1)))
+        ring_buffer.process(midi_decoder)
+    assert len(ml.router.received) == 1_000
+    assert ring_buffer.dropped == 0
+    assert ml.router.received[-1] == (2, 0x99, 999 & 0x7F, 1)
+
+def test_uart_ports_polled() -> None:
+    ml.router = _Router()
+    ports = midi_ports.MIDIPorts(host.Lock())
+    ports.load()
+    for i, input_port in enumerate(ports.input_ports):
+        is_pio = midi_ports._INPUT_PORTS[i][midi_ports._PORT_IS_PIO]
+        assert (input_port.ring_buffer is not None) == (midi_ports.IRQ_INPUT and (is_pio or midi_ports.IRQ_UART_INPUT))
+    if not midi_ports.IRQ_UART_INPUT:
+        assert ports.polled_ports == ports.input_ports[:2]
+    ports.hardware_uarts[1].feed(bytes((0x90, 60, 100)))
+    ports.process_input()
+    assert ml.router.received == [(1, 0x90, 60, 100)]
+    if midi_ports.IRQ_INPUT:
+        # data received by an interrupt driven port is only processed once its pending flag is set
+        input_port = ports.input_ports[3]
+        backend = LoopbackBackend()
+        input_port.ring_buffer.backend = backend
+        backend.set_irq(input_port.ring_buffer.irq)
+        backend.write(bytes((0x93, 62, 100)))
+        assert ports.rx_pending[3] == 1
+        ports.process_input()
+        assert ml.router.received[-1] == (3, 0x93, 62, 100)
+        assert ports.rx_pending[3] == 0
+    ports.delete()
+
+def test_real_time_within_sysex() -> None:
+    ml.router = _Router()
+    ports = midi_ports.MIDIPorts(host.Lock())
+    ports.load()
+    for output_port in ports.output_ports:
+        output_port.queue_sysex(bytes((0xF0, 0x43, 0x10)), 3)
+        output_port.process_thru()
+        assert output_port.sysex_open
+        output_port.midi_encoder.midi_send(0xF8, _NONE, _NONE, _NONE) # clock doesn't close the sysex message
+        assert output_port.sysex_open
+        output_port.midi_encoder.midi_send(0x90, 0, 36, 100) # a note does
+        assert not output_port.sysex_open
+        assert _sent(output_port) == bytes((0xF0, 0x43, 0x10, 0xF8, 0xF7, 0x90, 36, 100))
+    ports.delete()
+
+def _sent(output_port) -> bytes:
+    '''return and clear bytes sent to output port'''
+    transmitter = output_port.pio_uart if output_port.is_pio else output_port.hardware_uart
+    sent = bytes(transmitter.sent)
+    transmitter.sent = bytearray()
+    return sent
+
+if __name__ == '__main__':
+    host.run(globals())
@@ -0,0 +1,142 @@
+''' Allocation-free routing tests for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+    Runs router.Router.route_midi_thru for midi thru, pedal cc routing and midi learn with the heap locked (micropython.heap_lock), as
+    on the second core, so any allocation fails the test. The routing state is built by router.Router.update from a small data set.
+    Only the unix port of MicroPython can lock the heap:
+
+        micropython tests/test_router_heap_lock.py
+
+    On CPython (python -m pytest tests) the same calls run without heap lock, checking the routing results only.'''
+
+import host
+
+import main_loops as ml
+from data import Data
+
+_NONE             = -1
+
+_FRAME_INPUT      = 2 # as in router.py
+_FRAME_OTHER      = 0
+
+_COMMAND_NOTE_ON  = 0x90
+_COMMAND_CC       = 0xB0
+_COMMAND_PROGRAM  = 0xC0
+
+_PEDAL_PORT        = 1
+_PEDAL_CHANNEL     = 9
+_PEDAL_CC          = 4
+_CC_OUTPUT_PORT    = 3
+_CC_OUTPUT_CHANNEL = 2
+_LEARN_PORT        = 4
+
+class SmallData(Data):
+    '''data.Data holding a small data set and program (instead of loading them from /data_files): midi thru from port 0 to port 2 and
+    an open hihat on the pedal's port, routed to a voice on port 3 which gets the pedal cc'''
+
+    def __init__(self, midi_learn_port: int = _NONE) -> None:
+        super().__init__()
+        self.data = {'settings': {'midi_thru': True, 'midi_thru_input_port': 0, 'midi_thru_input_channel': _NONE,
+                                  'midi_thru_output_port': 2, 'midi_thru_output_channel': _NONE, 'midi_learn': midi_learn_port != _NONE,
+                                  'midi_learn_port': midi_learn_port, 'default_output_velocity': 64},
+                     'trigger_matrix': [[_NONE] * 8 for _ in range(8)],
+                     'input_port_mapping': [['', _NONE], ['pedal', _PEDAL_CHANNEL], ['', _NONE], ['', _NONE], ['', _NONE], ['', _NONE]],
+                     'input_triggers': {'HO': {'port': _PEDAL_PORT, 'mapping': [{'note': 46, 'pedal_cc': _PEDAL_CC, 'cc_min': 0,
+                                                                                 'cc_max': 127}]}},
+                     'output_mapping': []}
+        for port in range(6):
+            self.data['output_mapping'] += ['', {'channel': _CC_OUTPUT_CHANNEL if port == _CC_OUTPUT_PORT else 9, 'vel_0_note_off': True,
+                                                 'running_status': True, 'mapping': []}]
+        self.data['output_mapping'][2 * _CC_OUTPUT_PORT + 1]['mapping'] = ['hihat', {'channel': _NONE, 'note': 42, 'note_off': _NONE,
+                                                                                     'threshold': 0, 'curve': 0, 'min_velocity': 0,
+                                                                                     'max_velocity': 127, 'cc_interval': 0}]
+        self.load()
+
+    def load_program_json_file(self, bank: int, program: int) -> dict:
+        return {'program_change': [], 'bank_select': [],
+                'routing': [{'trigger': 'HO', 'zone': 0, 'layers': {'A': {'output_port': _CC_OUTPUT_PORT, 'voice': 'hihat', 'note': _NONE,
+                                                                          'note_off': _NONE, 'transient': _NONE, 'transient_layer': 0,
+                                                                          'scale': True}}}]}
+
+class _UI:
+    active_frame = _FRAME_OTHER
+
+    def program_change(self, update_only: bool) -> None:
+        pass
+
+def _set_up_router(midi_learn_port: int = _NONE):
+    '''return router.Router set up by router.update from SmallData'''
+    ml.data = SmallData(midi_learn_port)
+    ml.ui = _UI()
+    import router
+    ml.router = (_router := router.Router())
+    _router.update(already_waiting=True)
+    return _router
+
+def _sent(port) -> bytes:
+    '''return and clear bytes sent to output port'''
+    output_port = port.pio_uart if port.is_pio else port.hardware_uart
+    sent = bytes(output_port.sent)
+    output_port.sent = bytearray()
+    return sent
+
+def test_pedal_cc_heap_locked() -> None:
+    _router = _set_up_router()
+    output_port = _router.midi_ports.output_ports[_CC_OUTPUT_PORT]
+    route_midi_thru = _router.route_midi_thru
+    route_midi_thru(_PEDAL_CHANNEL, _COMMAND_CC, _PEDAL_CC, 10, _PEDAL_PORT) # warm up, as the second thread does before locking the heap
+    assert _sent(output_port) == bytes((_COMMAND_CC + _CC_OUTPUT_CHANNEL, _PEDAL_CC, 10))
+    for value in (0, 20, 64, 127):
+        host.call_heap_locked(route_midi_thru, _PEDAL_CHANNEL, _COMMAND_CC, _PEDAL_CC, value, _PEDAL_PORT)
+        assert _sent(output_port) == bytes((_PEDAL_CC, value)) # running status
+    assert _router.cc_routes[0][0]['cc_value'] == 127
+    host.call_heap_locked(route_midi_thru, _PEDAL_CHANNEL - 1, _COMMAND_CC, _PEDAL_CC, 30, _PEDAL_PORT) # other channel: not routed
+    host.call_heap_locked(route_midi_thru, _PEDAL_CHANNEL, _COMMAND_CC, _PEDAL_CC + 1, 30, _PEDAL_PORT) # other cc: not routed
+    assert _sent(output_port) == b''
+    assert _router.monitor_count > 0
+
+def test_midi_thru_heap_locked() -> None:
+    _router = _set_up_router()
+    output_port = _router.midi_ports.output_ports[2]
+    route_midi_thru = _router.route_midi_thru
+    route_midi_thru(0, _COMMAND_NOTE_ON, 36, 100, 0)
+    assert _sent(output_port) == bytes((_COMMAND_NOTE_ON, 36, 100))
+    host.call_heap_locked(route_midi_thru, 0, _COMMAND_NOTE_ON, 38, 90, 0)
+    assert _sent(output_port) == bytes((38, 90)) # running status
+    host.call_heap_locked(route_midi_thru, 1, _COMMAND_CC, 7, 90, 0)
+    assert _sent(output_port) == bytes((_COMMAND_CC + 1, 7, 90))
+
+def test_midi_learn_heap_locked() -> None:
+    _router = _set_up_router()
+    route_midi_thru = _router.route_midi_thru
+    route_midi_thru(3, _COMMAND_NOTE_ON, 36, 100, _LEARN_PORT)
+    assert not _router.midi_learn_waiting # not on a midi learn port and input page not active
+    ml.ui.active_frame = _FRAME_INPUT
+    host.call_heap_locked(route_midi_thru, 5, _COMMAND_CC, 11, 64, _LEARN_PORT)
+    assert _router._decode_midi_learn_data() == (_LEARN_PORT, 5, _NONE, _NONE, _NONE, _NONE, 11, 64)
+    _router = _set_up_router(_LEARN_PORT)
+    route_midi_thru = _router.route_midi_thru
+    host.call_heap_locked(route_midi_thru, 3, _COMMAND_NOTE_ON, 40, 100, _LEARN_PORT)
+    assert _router.midi_learn_waiting
+    assert _router._decode_midi_learn_data() == (_LEARN_PORT, 3, _NONE, _NONE, 40, _NONE, _NONE, _NONE)
+    _router.program_change_time = _NONE
+    host.call_heap_locked(route_midi_thru, 5, _COMMAND_PROGRAM, 7, _NONE, _LEARN_PORT)
+    assert _router._decode_midi_learn_data() == (_LEARN_PORT, 5, _NONE, _NONE, _NONE, 7, _NONE, _NONE)
+
+if __name__ == '__main__':
+    host.run(globals())
@@ -0,0 +1,116 @@
+''' Headless ui tests for Cybo-Drummer - Humanize Those Drum Computers!
+    https://github.com/HLammers/cybo-drummer
+    Copyright (c) 2024-2025 Harm Lammers
+
+    MIT licence:
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+    CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+    SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+    Drives the ui through ui_host.HostUI (HostDisplay with scripted encoders and buttons) on the small data set of
+    test_router_heap_lock.py, checking the frames drawn (HostDisplay.frame_log).'''
+
+import host
+
+import main_loops as ml
+
+_FRAME_PROGRAM = 1 # as in ui.py
+_FRAME_MATRIX  = 2
+_FRAME_MONITOR = 6
+
+_DISPLAY_WIDTH = 220 # as in ui_page_monitor.py
+_PAGE_W        = 204
+_ROW_H         = 12
+_MAX_ROWS      = 12
+_PAGE_TOP      = 16 # _TITLE_BAR_H + _TOP_MARGIN
+
+# frame_log entries
+_FRAME         = 0
+_SPI_BYTES     = 1
+_DIRTY_RECTS   = 2
+
+_SCREEN_BYTES  = 77_440 # 220 * 176 * 2
+
+def host_ui():
+    '''return ui_host.HostUI on router.Router set up from the small data set; called by the tests'''
+    from test_router_heap_lock import SmallData
+    import router
+    import ui_host
+    ml.data = SmallData()
+    ml.router = router.Router()
+    return ui_host.HostUI(None)
+
+def test_initial_draw() -> None:
+    _host_ui = host_ui()
+    frame_log = _host_ui.display.frame_log
+    assert len(frame_log) == 2 # cleared by HostDisplay.__init__, then drawn by HostUI.__init__
+    assert frame_log[1][_SPI_BYTES] >= _SCREEN_BYTES
+    assert _host_ui.ui.active_frame == _FRAME_PROGRAM
+
+def test_page_switch() -> None:
+    import ui_host
+    _host_ui = host_ui()
+    display = _host_ui.display
+    frame_log = display.frame_log
+    program_page = bytes(display.byte_buffer)
+    _host_ui.press(ui_host.BUTTON_PAGE_NO) # page select mode
+    assert _host_ui.ui.page_select_mode
+    assert len(frame_log) == 3
+    assert frame_log[2][_DIRTY_RECTS] > 0
+    _host_ui.turn(ui_host.ENCODER_VAL)
+    assert _host_ui.ui.active_frame == _FRAME_MATRIX
+    assert len(frame_log) == 4
+    assert frame_log[3][_FRAME] == 3
+    assert frame_log[3][_SPI_BYTES] > 0
+    assert bytes(display.byte_buffer) != program_page
+    assert not _host_ui.process() # nothing left to draw
+    assert len(frame_log) == 4
+
+def test_monitor_wrap_around() -> None:
+    import ui_host
+    _host_ui = host_ui()
+    display = _host_ui.display
+    _host_ui.press(ui_host.BUTTON_PAGE_NO)
+    _host_ui.turn(ui_host.ENCODER_VAL, _FRAME_MONITOR - _FRAME_PROGRAM)
+    assert _host_ui.ui.active_frame == _FRAME_MONITOR
+    monitor = _host_ui.ui.frames[_FRAME_MONITOR]
+    assert monitor.row == 0
+    marker = _row_pixels(display, 0) # '...' marker drawn by PageMonitor._reset_monitor
+    for i in range(2 * (_MAX_ROWS + 1)):
+        row = i % (_MAX_ROWS + 1)
+        next_row = (row + 1) % (_MAX_ROWS + 1)
+        assert monitor.add_to_monitor(monitor.sub_page, f'line {i}')
+        assert monitor.row == next_row
+        assert _row_pixels(display, row) != marker
+        assert _row_pixels(display, next_row) == marker
+        y = _PAGE_TOP + row * _ROW_H
+        if next_row == 0: # two rectangles at opposite ends of the page
+            assert _dirty_rects(display) == [(0, y, _PAGE_W - 1, y + _ROW_H - 1), (0, _PAGE_TOP, _PAGE_W - 1, _PAGE_TOP + _ROW_H - 1)]
+        else:
+            assert _dirty_rects(display) == [(0, y, _PAGE_W - 1, y + 2 * _ROW_H - 1)]
+        display.draw_screen()
+    assert not monitor.add_to_monitor(monitor.sub_page + 1, 'other sub-page')
+
+def _row_pixels(display, row: int) -> bytes:
+    '''return the pixels of a monitor row in the display buffer; called by test_monitor_wrap_around'''
+    byte_buffer = display.byte_buffer
+    y = _PAGE_TOP + row * _ROW_H
+    return b''.join(byte_buffer[(i := 2 * (y + j) * _DISPLAY_WIDTH):i + 2 * _PAGE_W] for j in range(_ROW_H))
+
+def _dirty_rects(display) -> list:
+    '''return the dirty rectangles as (x0, y0, x1, y1) tuples; called by test_monitor_wrap_around'''
+    dirty = display.dirty
+    return [tuple(dirty[4 * i:4 * i + 4]) for i in range(display.dirty_count)]
+
+if __name__ == '__main__':
+    host.run(globals())